@@ -3,3 +3,6 @@ from django.apps import AppConfig
 
 class BeerfestConfig(AppConfig):
     name = 'beerfest'
+
+    def ready(self):
+        from . import signals  # noqa: F401
@@ -0,0 +1,213 @@
+import bisect
+import copy
+import threading
+
+from django.conf import settings
+
+from .models import Beer
+from .pagination import InvalidToken
+from .versions import catalogue_version, stats_version
+
+
+# An optional in-process copy of the whole catalogue, for serving the beer
+# list without SQL. It is rebuilt with one query whenever the catalogue
+# version changes, or the stats version rolls over, so its stars and
+# ratings are as fresh as the ETags say.
+#
+# Records are shared between requests and threads and must not be modified;
+# RecordList hands out copies.
+
+
+def is_enabled():
+    return getattr(settings, "BEERFEST_IN_PROCESS_CATALOGUE", False)
+
+
+class BarRecord:
+    __slots__ = ("id", "name")
+
+    def __init__(self, id, name):
+        self.id = id
+        self.name = name
+
+    @property
+    def pk(self):
+        return self.id
+
+    def __str__(self):
+        return self.name
+
+
+class BreweryRecord:
+    __slots__ = ("id", "name", "location")
+
+    def __init__(self, id, name, location):
+        self.id = id
+        self.name = name
+        self.location = location
+
+    @property
+    def pk(self):
+        return self.id
+
+    def __str__(self):
+        return self.name
+
+
+class BeerRecord:
+    FIELDS = (
+        "id", "bar_id", "brewery_id", "brewery_name", "name", "number",
+        "reserved", "abv", "tasting_notes", "notes", "num_stars",
+        "num_ratings", "rating_sum",
+    )
+    __slots__ = FIELDS + ("bar", "brewery", "starred", "rating")
+
+    def __init__(self, bar, brewery, *values):
+        for field, value in zip(self.FIELDS, values):
+            setattr(self, field, value)
+        self.bar = bar
+        self.brewery = brewery
+        self.starred = None
+        self.rating = None
+
+    @property
+    def pk(self):
+        return self.id
+
+    def __str__(self):
+        return f"{self.name} by {self.brewery_name}"
+
+    @property
+    def avg_rating(self):
+        # As annotated by BeerQuerySet.with_stats()
+        if self.num_ratings > 0:
+            return self.rating_sum / self.num_ratings
+        return None
+
+    def sort_key(self):
+        return sort_key(
+            self.bar_id, self.brewery_name, self.number, self.name, self.id)
+
+
+# The columns each record is built from, in order
+ROW_FIELDS = (
+    "bar_id", "bar__name", "brewery_id", "brewery__name", "brewery__location",
+) + BeerRecord.FIELDS
+
+
+def sort_key(bar_id, brewery_name, number, name, id):
+    # Beer.Meta.ordering, with the id as a tie-breaker like BEER_KEYSET.
+    # Names compare by code point, which is what SQLite does but may differ
+    # from a PostgreSQL collation.
+    return (
+        bar_id, brewery_name, number is None, number or 0, name, id)
+
+
+class RecordList:
+    """Beer records in keyset order, paginated like a queryset."""
+
+    # Lets Django's generic views name templates and context variables
+    model = Beer
+
+    def __init__(self, records, keys=None):
+        self.records = records
+        if keys is None:
+            keys = [record.sort_key() for record in records]
+        self.keys = keys
+
+    def __len__(self):
+        return len(self.records)
+
+    def __iter__(self):
+        return (copy.copy(record) for record in self.records)
+
+    def filter(self, predicate):
+        matches = [
+            n for n, record in enumerate(self.records) if predicate(record)
+        ]
+        return RecordList(
+            [self.records[n] for n in matches],
+            [self.keys[n] for n in matches],
+        )
+
+    def keyset_paginate(self, keyset, page_size, token=None):
+        position, reverse = None, False
+        if token:
+            position, reverse = keyset.decode(token)
+
+        try:
+            if position is None:
+                start, end = 0, page_size
+            elif reverse:
+                end = bisect.bisect_left(self.keys, sort_key(*position))
+                start = max(end - page_size, 0)
+            else:
+                start = bisect.bisect_right(self.keys, sort_key(*position))
+                end = start + page_size
+        except TypeError:
+            # A position whose values can't be compared with the keys
+            raise InvalidToken(token)
+        rows = [copy.copy(record) for record in self.records[start:end]]
+
+        if reverse:
+            has_next, has_previous = True, start > 0
+        else:
+            has_next = end < len(self.records)
+            has_previous = position is not None
+
+        next_token = previous_token = None
+        if rows and has_next:
+            next_token = keyset.encode(keyset.position(rows[-1]))
+        if rows and has_previous:
+            previous_token = keyset.encode(
+                keyset.position(rows[0]), reverse=True)
+        return rows, next_token, previous_token
+
+
+class Catalogue:
+    def __init__(self, version, beers):
+        self.version = version
+        self.beers = RecordList(sorted(beers, key=BeerRecord.sort_key))
+        self.by_id = {beer.id: beer for beer in beers}
+
+    @classmethod
+    def build(cls, version):
+        rows = Beer.objects.order_by().values_list(*ROW_FIELDS)
+        return cls.from_rows(version, rows)
+
+    @classmethod
+    def from_rows(cls, version, rows):
+        """Build a catalogue from rows of ``ROW_FIELDS``."""
+        bars = {}
+        breweries = {}
+        beers = []
+        for row in rows:
+            bar_id, bar_name, brewery_id, brewery_name, location = row[:5]
+            if bar_id not in bars:
+                bars[bar_id] = BarRecord(bar_id, bar_name)
+            if brewery_id not in breweries:
+                breweries[brewery_id] = BreweryRecord(
+                    brewery_id, brewery_name, location)
+            beers.append(
+                BeerRecord(bars[bar_id], breweries[brewery_id], *row[5:]))
+        return cls(version, beers)
+
+    def get(self, beer_id):
+        """Return a copy of the beer's record, or None."""
+        record = self.by_id.get(beer_id)
+        return None if record is None else copy.copy(record)
+
+
+_lock = threading.Lock()
+_catalogue = None
+
+
+def get_catalogue():
+    global _catalogue
+    version = (catalogue_version(), stats_version())
+    catalogue = _catalogue
+    if catalogue is None or catalogue.version != version:
+        with _lock:
+            if _catalogue is None or _catalogue.version != version:
+                _catalogue = Catalogue.build(version)
+            catalogue = _catalogue
+    return catalogue
@@ -0,0 +1,66 @@
+import csv
+
+from django.core.serializers.json import DjangoJSONEncoder
+
+from .models import Beer, BeerRating
+
+
+class Echo:
+    def write(self, value):
+        return value
+
+
+def beer_rows(chunk_size):
+    rows = Beer.objects.order_by("pk").values_list(
+        "pk", "bar__name", "brewery_name", "name", "number", "reserved",
+        "abv", "tasting_notes", "notes", "num_stars", "num_ratings",
+        "rating_sum",
+    ).iterator(chunk_size=chunk_size)
+    for row in rows:
+        num_ratings, rating_sum = row[-2:]
+        avg_rating = rating_sum / num_ratings if num_ratings else None
+        yield row[:-1] + (avg_rating,)
+
+
+def rating_rows(chunk_size):
+    return BeerRating.objects.order_by("pk").values_list(
+        "beer", "user", "rating"
+    ).iterator(chunk_size=chunk_size)
+
+
+DATASETS = {
+    "beers": (
+        [
+            "id", "bar", "brewery", "name", "number", "reserved", "abv",
+            "tasting_notes", "notes", "num_stars", "num_ratings",
+            "avg_rating",
+        ],
+        beer_rows,
+    ),
+    "ratings": (["beer_id", "user_id", "rating"], rating_rows),
+}
+
+
+def encode_csv(columns, rows):
+    writer = csv.writer(Echo())
+    yield writer.writerow(columns)
+    for row in rows:
+        yield writer.writerow(row)
+
+
+def encode_ndjson(columns, rows):
+    encoder = DjangoJSONEncoder()
+    for row in rows:
+        yield encoder.encode(dict(zip(columns, row))) + "\n"
+
+
+FORMATS = {
+    "csv": ("text/csv", encode_csv),
+    "ndjson": ("application/x-ndjson", encode_ndjson),
+}
+
+
+def export(dataset, fmt, chunk_size=2000):
+    columns, rows = DATASETS[dataset]
+    encode = FORMATS[fmt][1]
+    return encode(columns, rows(chunk_size))
@@ -0,0 +1,280 @@
+from decimal import Decimal
+
+from django.conf import settings
+from django.core.cache import cache
+from django.db.models import Exists, OuterRef, Q
+
+from .models import Beer, StarBeer, is_valid_id
+from .versions import catalogue_version
+
+ABV_BANDS = [
+    # slug, label, lower bound (inclusive), upper bound (exclusive)
+    ("session", "Under 4%", None, Decimal("4.0")),
+    ("standard", "4% to 5.4%", Decimal("4.0"), Decimal("5.5")),
+    ("strong", "5.5% to 7.9%", Decimal("5.5"), Decimal("8.0")),
+    ("extra-strong", "8% and over", Decimal("8.0"), None),
+    ("unknown", "Unknown", None, None),
+]
+
+TRUE_VALUES = {"1", "true", "yes", "on"}
+FALSE_VALUES = {"0", "false", "no", "off"}
+
+
+def abv_band(abv):
+    if abv is None:
+        return "unknown"
+    for slug, _, lower, upper in ABV_BANDS:
+        if (lower is None or abv >= lower) and (upper is None or abv < upper):
+            return slug
+
+
+def parse_bool(value):
+    value = value.lower()
+    if value in TRUE_VALUES:
+        return True
+    if value in FALSE_VALUES:
+        return False
+    raise ValueError(value)
+
+
+def parse_id(value):
+    value = int(value)
+    if not is_valid_id(value):
+        raise ValueError(value)
+    return value
+
+
+def parse_band(value):
+    if value not in {slug for slug, _, _, _ in ABV_BANDS}:
+        raise ValueError(value)
+    return value
+
+
+PARSERS = {
+    "bar": parse_id,
+    "brewery": parse_id,
+    "abv": parse_band,
+    "reserved": parse_bool,
+    "starred": parse_bool,
+}
+
+
+def selected_facets(params, user=None):
+    """Return the facet values selected in ``params`` as sets keyed by facet.
+
+    Values that don't parse are ignored, as is ``starred`` for anonymous
+    users.
+    """
+    selected = {}
+    for name, parse in PARSERS.items():
+        values = set()
+        for value in params.getlist(name):
+            try:
+                values.add(parse(value.strip()))
+            except ValueError:
+                pass
+        if values:
+            selected[name] = values
+    if user is None or not user.is_authenticated:
+        selected.pop("starred", None)
+    return selected
+
+
+def filter_beers(queryset, selected, user=None):
+    if "bar" in selected:
+        queryset = queryset.filter(bar__in=selected["bar"])
+    if "brewery" in selected:
+        queryset = queryset.filter(brewery__in=selected["brewery"])
+    if "abv" in selected:
+        bands = Q(pk__in=[])
+        for slug, _, lower, upper in ABV_BANDS:
+            if slug not in selected["abv"]:
+                continue
+            if slug == "unknown":
+                bands |= Q(abv__isnull=True)
+                continue
+            band = Q()
+            if lower is not None:
+                band &= Q(abv__gte=lower)
+            if upper is not None:
+                band &= Q(abv__lt=upper)
+            bands |= band
+        queryset = queryset.filter(bands)
+    if "reserved" in selected:
+        queryset = queryset.filter(reserved__in=selected["reserved"])
+    if "starred" in selected and len(selected["starred"]) == 1:
+        starred = Exists(
+            StarBeer.objects.filter(user=user.pk, beer=OuterRef("pk")))
+        if True in selected["starred"]:
+            queryset = queryset.filter(starred)
+        else:
+            queryset = queryset.filter(~starred)
+    return queryset
+
+
+def record_filter(selected, starred_ids=frozenset()):
+    """Return a predicate applying ``filter_beers`` to catalogue records.
+
+    ``starred_ids`` are the ids of the beers the user has starred.
+    """
+    def matches(record):
+        if "bar" in selected and record.bar_id not in selected["bar"]:
+            return False
+        if ("brewery" in selected
+                and record.brewery_id not in selected["brewery"]):
+            return False
+        if "abv" in selected and abv_band(record.abv) not in selected["abv"]:
+            return False
+        if ("reserved" in selected
+                and record.reserved not in selected["reserved"]):
+            return False
+        if ("starred" in selected
+                and (record.id in starred_ids) not in selected["starred"]):
+            return False
+        return True
+    return matches
+
+
+def to_bits(positions, size):
+    data = bytearray((size + 7) // 8)
+    for position in positions:
+        data[position >> 3] |= 1 << (position & 7)
+    return int.from_bytes(data, "little")
+
+
+def popcount(bits):
+    return bin(bits).count("1")
+
+
+INDEX_FIELDS = (
+    "pk", "bar_id", "bar__name", "brewery_id", "brewery_name", "abv",
+    "reserved",
+)
+
+
+class FacetIndex:
+    """Bitsets of the beers having each facet value.
+
+    Bit ``n`` stands for the ``n``th beer by primary key, so the number of
+    beers matching any combination of facets is the popcount of ANDing and
+    ORing these together, without going back to the database.
+    """
+
+    def __init__(self, positions, bits, labels):
+        self.positions = positions
+        self.bits = bits
+        self.labels = labels
+        self.all = (1 << len(positions)) - 1
+
+    @classmethod
+    def build(cls):
+        rows = Beer.objects.order_by("pk").values_list(*INDEX_FIELDS)
+        return cls.from_rows(rows)
+
+    @classmethod
+    def from_rows(cls, rows):
+        """Build an index from rows of ``INDEX_FIELDS``, in pk order."""
+        positions = {}
+        members = {name: {} for name in ["bar", "brewery", "abv", "reserved"]}
+        bars = {}
+        breweries = {}
+        for n, row in enumerate(rows):
+            pk, bar, bar_name, brewery, brewery_name, abv, reserved = row
+            positions[pk] = n
+            bars[bar] = bar_name
+            breweries[brewery] = brewery_name
+            members["bar"].setdefault(bar, []).append(n)
+            members["brewery"].setdefault(brewery, []).append(n)
+            members["abv"].setdefault(abv_band(abv), []).append(n)
+            members["reserved"].setdefault(reserved, []).append(n)
+
+        labels = {
+            "bar": dict(sorted(bars.items())),
+            "brewery": dict(
+                sorted(breweries.items(), key=lambda item: item[1])),
+            "abv": {slug: label for slug, label, _, _ in ABV_BANDS},
+            "reserved": {True: "Reserved", False: "Not reserved"},
+            "starred": {True: "Starred", False: "Not starred"},
+        }
+        bits = {
+            name: {
+                value: to_bits(members[name].get(value, []), len(positions))
+                for value in labels[name]
+            }
+            for name in members
+        }
+        return cls(positions, bits, labels)
+
+    def mask(self, pks):
+        return to_bits(
+            [self.positions[pk] for pk in pks if pk in self.positions],
+            len(self.positions),
+        )
+
+    def counts(self, selected, extra=None, base=None):
+        """Count the beers having each facet value.
+
+        Each facet is counted against the selections in every *other* facet,
+        so picking one bar still shows how many beers the other bars have.
+        ``extra`` adds per-request facets and ``base`` limits the beers
+        counted, eg to search results.
+        """
+        bits = dict(self.bits, **(extra or {}))
+        if base is None:
+            base = self.all
+
+        masks = {}
+        for name, values in selected.items():
+            if name in bits:
+                mask = 0
+                for value in values:
+                    mask |= bits[name].get(value, 0)
+                masks[name] = mask
+
+        counts = {}
+        for name, value_bits in bits.items():
+            others = base
+            for other, mask in masks.items():
+                if other != name:
+                    others &= mask
+            counts[name] = [
+                {
+                    "value": value,
+                    "label": self.labels[name][value],
+                    "count": popcount(value_mask & others),
+                    "selected": value in selected.get(name, ()),
+                }
+                for value, value_mask in value_bits.items()
+            ]
+        return counts
+
+
+def get_index():
+    key = f"beerfest:facets:{catalogue_version()}"
+    index = cache.get(key)
+    if index is None:
+        index = FacetIndex.build()
+        timeout = getattr(settings, "BEERFEST_FACET_CACHE_TIMEOUT", 300)
+        cache.set(key, index, timeout)
+    return index
+
+
+def facet_counts(selected, user=None, restrict=None, starred_ids=None,
+                 index=None):
+    """Return the counts for every facet value, given the ``selected`` ones.
+
+    ``restrict`` is an optional iterable of beer ids to count within.
+    ``starred_ids`` are the ids of the user's starred beers, if already
+    known. ``index`` defaults to the cached index of the live catalogue.
+    """
+    if index is None:
+        index = get_index()
+    extra = {}
+    if user is not None and user.is_authenticated:
+        if starred_ids is None:
+            starred_ids = StarBeer.objects.filter(
+                user=user).values_list("beer", flat=True)
+        starred = index.mask(starred_ids)
+        extra["starred"] = {True: starred, False: index.all & ~starred}
+    base = None if restrict is None else index.mask(restrict)
+    return index.counts(selected, extra, base)
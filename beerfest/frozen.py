@@ -0,0 +1,214 @@
+import json
+import mmap
+import os
+import threading
+from decimal import Decimal
+
+from django.conf import settings
+from django.core.exceptions import ImproperlyConfigured
+from django.core.serializers.json import DjangoJSONEncoder
+
+from . import catalogue, facets
+from .models import Beer, BeerRating, StarBeer
+from .pagination import BEER_KEYSET
+from .snapshot import write_file
+
+
+# Once a festival has closed its data stops changing, so a deployment can be
+# frozen with BEERFEST_FROZEN. The write views are turned off and the beer
+# list, detail and profile pages are read from files in BEERFEST_FROZEN_DIR,
+# written beforehand by the freeze_festival command, rather than from the
+# database.
+#
+# Each file is a table of JSON documents, one per line, with an index of
+# their offsets alongside. The files are memory-mapped, so processes share
+# the pages and only the documents actually read are parsed.
+
+BEERS = "beers"
+USERS = "users"
+
+ID = catalogue.ROW_FIELDS.index("id")
+ABV = catalogue.ROW_FIELDS.index("abv")
+
+
+def is_frozen():
+    return getattr(settings, "BEERFEST_FROZEN", False)
+
+
+def get_directory():
+    directory = getattr(settings, "BEERFEST_FROZEN_DIR", None)
+    if not directory:
+        raise ImproperlyConfigured(
+            "BEERFEST_FROZEN_DIR must be set to serve a frozen festival")
+    return directory
+
+
+def table_paths(directory, name):
+    path = os.path.join(directory, name)
+    return path + ".jsonl", path + ".index.json"
+
+
+def write_table(directory, name, documents):
+    """Write ``(key, document)`` pairs to the table ``name``."""
+    keys = []
+    offsets = [0]
+    lines = []
+    for key, document in documents:
+        line = json.dumps(
+            document, cls=DjangoJSONEncoder, separators=(",", ":")
+        ).encode() + b"\n"
+        keys.append(key)
+        lines.append(line)
+        offsets.append(offsets[-1] + len(line))
+
+    data_path, index_path = table_paths(directory, name)
+    write_file(data_path, b"".join(lines))
+    write_file(
+        index_path,
+        json.dumps({"keys": keys, "offsets": offsets}).encode(),
+    )
+
+
+class Table:
+    def __init__(self, directory, name):
+        data_path, index_path = table_paths(directory, name)
+        with open(index_path, "rb") as f:
+            index = json.load(f)
+        self.keys = index["keys"]
+        self.offsets = index["offsets"]
+        self.positions = {key: n for n, key in enumerate(self.keys)}
+        with open(data_path, "rb") as f:
+            self.version = os.fstat(f.fileno()).st_mtime_ns
+            if self.offsets[-1]:
+                self.data = mmap.mmap(
+                    f.fileno(), 0, access=mmap.ACCESS_READ)
+            else:
+                # Empty files can't be mapped
+                self.data = b""
+
+    def __len__(self):
+        return len(self.keys)
+
+    def __iter__(self):
+        return (self.document(n) for n in range(len(self.keys)))
+
+    def document(self, n):
+        return json.loads(self.data[self.offsets[n]:self.offsets[n + 1]])
+
+    def get(self, key):
+        n = self.positions.get(key)
+        return None if n is None else self.document(n)
+
+
+def freeze(directory):
+    """Write the tables a frozen deployment serves from to ``directory``.
+
+    Returns the number of beers and users written.
+    """
+    os.makedirs(directory, exist_ok=True)
+
+    rows = Beer.objects.order_by(
+        *BEER_KEYSET.order_by()
+    ).values_list(*catalogue.ROW_FIELDS)
+    beers = [(row[ID], row) for row in rows]
+
+    states = {}
+    starred = StarBeer.objects.order_by().values_list("user", "beer")
+    for user_id, beer_id in starred:
+        states.setdefault(user_id, {})[beer_id] = [beer_id, True, None]
+    ratings = BeerRating.objects.order_by().values_list(
+        "user", "beer", "rating")
+    for user_id, beer_id, rating in ratings:
+        state = states.setdefault(user_id, {})
+        state.setdefault(beer_id, [beer_id, False, None])[2] = rating
+    users = [
+        (user_id, sorted(state.values()))
+        for user_id, state in sorted(states.items())
+    ]
+
+    # The beers go last: their modification time is the frozen version
+    write_table(directory, USERS, users)
+    write_table(directory, BEERS, beers)
+    return len(beers), len(users)
+
+
+def to_row(document):
+    if document[ABV] is not None:
+        document[ABV] = Decimal(document[ABV])
+    return document
+
+
+class Festival:
+    """The tables of a frozen festival, and what's derived from them."""
+
+    def __init__(self, directory):
+        self.beers = Table(directory, BEERS)
+        self.users = Table(directory, USERS)
+        self.version = self.beers.version
+        self._catalogue = None
+        self._index = None
+
+    def get_beer(self, beer_id):
+        document = self.beers.get(beer_id)
+        if document is None:
+            return None
+        return catalogue.Catalogue.from_rows(
+            self.version, [to_row(document)]).get(beer_id)
+
+    def get_catalogue(self):
+        # Built on first use; the list view needs every beer anyway
+        if self._catalogue is None:
+            self._catalogue = catalogue.Catalogue.from_rows(
+                self.version, map(to_row, self.beers))
+        return self._catalogue
+
+    def get_index(self):
+        if self._index is None:
+            records = sorted(
+                self.get_catalogue().by_id.values(),
+                key=lambda record: record.id,
+            )
+            self._index = facets.FacetIndex.from_rows(
+                (
+                    record.id, record.bar_id, record.bar.name,
+                    record.brewery_id, record.brewery_name, record.abv,
+                    record.reserved,
+                )
+                for record in records
+            )
+        return self._index
+
+    def get_user_state(self, user):
+        """Return the user's stars and ratings like user_state does."""
+        document = self.users.get(user.pk) or []
+        return {
+            beer_id: (starred, rating)
+            for beer_id, starred, rating in document
+        }
+
+    def get_profile_beers(self, user):
+        """Return the beers the user starred or rated, in list order.
+
+        Each has ``starred`` and ``rating`` set.
+        """
+        beers = []
+        for beer_id, (starred, rating) in self.get_user_state(user).items():
+            beer = self.get_beer(beer_id)
+            beer.starred, beer.rating = starred, rating
+            beers.append(beer)
+        return catalogue.RecordList(
+            sorted(beers, key=catalogue.BeerRecord.sort_key))
+
+
+_lock = threading.Lock()
+_festival = None
+
+
+def get_festival():
+    global _festival
+    directory = get_directory()
+    if _festival is None or _festival[0] != directory:
+        with _lock:
+            if _festival is None or _festival[0] != directory:
+                _festival = (directory, Festival(directory))
+    return _festival[1]
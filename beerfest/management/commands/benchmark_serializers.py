@@ -0,0 +1,100 @@
+import time
+
+from django.contrib.auth import get_user_model
+from django.core.management.base import BaseCommand, CommandError
+
+from beerfest.models import Bar, Brewery
+from beerfest.serializers import (
+    BarSerializer, BrewerySerializer, FastBarSerializer,
+    FastBrewerySerializer, FastUserSerializer, UserSerializer, user_rows,
+)
+
+
+User = get_user_model()
+
+# Links are relative without a request
+CONTEXT = {"request": None}
+
+
+def serialize_bars():
+    return BarSerializer(Bar.objects.order_by("pk"), many=True).data
+
+
+def fast_serialize_bars():
+    rows = Bar.objects.order_by("pk").values(*FastBarSerializer.field_names)
+    return FastBarSerializer(rows, many=True).data
+
+
+def serialize_breweries():
+    return BrewerySerializer(Brewery.objects.order_by("pk"), many=True).data
+
+
+def fast_serialize_breweries():
+    rows = Brewery.objects.order_by("pk").values(
+        *FastBrewerySerializer.field_names)
+    return FastBrewerySerializer(rows, many=True).data
+
+
+def serialize_users():
+    users = User.objects.order_by("pk").prefetch_related(
+        "starred_beers", "rated_beers")
+    return UserSerializer(users, many=True, context=CONTEXT).data
+
+
+def fast_serialize_users():
+    rows = user_rows(User.objects.order_by("pk"))
+    return FastUserSerializer(rows, many=True, context=CONTEXT).data
+
+
+BENCHMARKS = {
+    "bars": (serialize_bars, fast_serialize_bars),
+    "breweries": (serialize_breweries, fast_serialize_breweries),
+    "users": (serialize_users, fast_serialize_users),
+}
+
+
+def rows_per_second(serialize, repeat):
+    start = time.perf_counter()
+    for _ in range(repeat):
+        rows = len(serialize())
+    elapsed = time.perf_counter() - start
+    return rows * repeat / elapsed if elapsed else 0
+
+
+class Command(BaseCommand):
+    help = (
+        "Compare the throughput of the model serializers and the fast "
+        "values() serializers on the current data, queries included."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "benchmarks", nargs="*",
+            help="The benchmarks to run: {} (default: all).".format(
+                ", ".join(BENCHMARKS)),
+        )
+        parser.add_argument(
+            "--repeat", type=int, default=20,
+            help="How many times to serialize each dataset.",
+        )
+
+    def handle(self, *args, **options):
+        if options["repeat"] < 1:
+            raise CommandError("--repeat must be at least 1")
+        for name in options["benchmarks"]:
+            if name not in BENCHMARKS:
+                raise CommandError(f"Unknown benchmark: {name}")
+
+        for name in options["benchmarks"] or BENCHMARKS:
+            serialize, fast_serialize = BENCHMARKS[name]
+            if serialize() != fast_serialize():
+                raise CommandError(f"The {name} serializers disagree")
+
+            rows = len(fast_serialize())
+            rate = rows_per_second(serialize, options["repeat"])
+            fast_rate = rows_per_second(fast_serialize, options["repeat"])
+            speedup = f"{fast_rate / rate:.1f}x" if rate else "n/a"
+            self.stdout.write(
+                f"{name}: {rows} rows, {rate:,.0f} rows/s, "
+                f"fast {fast_rate:,.0f} rows/s ({speedup})"
+            )
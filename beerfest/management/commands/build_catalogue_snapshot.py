@@ -0,0 +1,35 @@
+from django.core.management.base import BaseCommand, CommandError
+
+from beerfest import snapshot
+
+
+class Command(BaseCommand):
+    help = (
+        "Write the beer catalogue to a content-hashed JSON file, with gzip "
+        "and (if the brotli package is installed) brotli copies, and point "
+        "the catalogue snapshot endpoint at it."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--directory",
+            help="Where to write snapshots (default BEERFEST_SNAPSHOT_DIR).",
+        )
+        parser.add_argument(
+            "--keep", type=int, default=5,
+            help="Number of snapshots to keep (default 5).",
+        )
+
+    def handle(self, *args, **options):
+        directory = options["directory"] or snapshot.get_directory()
+        if not directory:
+            raise CommandError(
+                "Pass --directory or set BEERFEST_SNAPSHOT_DIR")
+        if options["keep"] < 1:
+            raise CommandError("--keep must be at least 1")
+
+        digest, created = snapshot.build_snapshot(directory, options["keep"])
+        if created:
+            self.stdout.write(self.style.SUCCESS(f"Wrote snapshot {digest}"))
+        else:
+            self.stdout.write(f"Snapshot {digest} is up to date")
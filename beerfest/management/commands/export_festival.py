@@ -0,0 +1,37 @@
+from django.core.management.base import BaseCommand
+
+from beerfest.export import DATASETS, FORMATS, export
+
+
+class Command(BaseCommand):
+    help = (
+        "Stream every beer with its star and rating stats, or every beer "
+        "rating, as CSV or NDJSON."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("dataset", choices=sorted(DATASETS))
+        parser.add_argument(
+            "--format", choices=sorted(FORMATS), default="csv",
+            help="Output format (default csv).",
+        )
+        parser.add_argument(
+            "--output", default="-",
+            help="File to write to, or - for stdout (the default).",
+        )
+        parser.add_argument(
+            "--chunk-size", type=int, default=2000,
+            help="Rows fetched from the database at a time (default 2000).",
+        )
+
+    def handle(self, *args, **options):
+        chunks = export(
+            options["dataset"], options["format"], options["chunk_size"])
+
+        if options["output"] == "-":
+            for chunk in chunks:
+                self.stdout.write(chunk, ending="")
+        else:
+            with open(options["output"], "w", newline="",
+                      encoding="utf-8") as f:
+                f.writelines(chunks)
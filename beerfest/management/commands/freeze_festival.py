@@ -0,0 +1,32 @@
+from django.core.exceptions import ImproperlyConfigured
+from django.core.management.base import BaseCommand, CommandError
+
+from beerfest import frozen
+
+
+class Command(BaseCommand):
+    help = (
+        "Write the beers and every user's stars and ratings to the files a "
+        "frozen deployment (BEERFEST_FROZEN) serves from."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--directory",
+            help="Where to write the files (default BEERFEST_FROZEN_DIR).",
+        )
+
+    def handle(self, *args, **options):
+        directory = options["directory"]
+        if not directory:
+            try:
+                directory = frozen.get_directory()
+            except ImproperlyConfigured:
+                raise CommandError(
+                    "Pass --directory or set BEERFEST_FROZEN_DIR")
+
+        num_beers, num_users = frozen.freeze(directory)
+        self.stdout.write(self.style.SUCCESS(
+            f"Froze {num_beers} beers and {num_users} users' stars and "
+            f"ratings"
+        ))
@@ -0,0 +1,228 @@
+import csv
+import json
+import sys
+import time
+from itertools import islice
+
+from django.core.exceptions import ValidationError
+from django.core.management.base import BaseCommand, CommandError
+from django.db import transaction
+
+from beerfest import snapshot
+from beerfest.models import Bar, Brewery, Beer
+from beerfest.versions import bump_catalogue_version
+
+
+UNIQUE_FIELDS = ["brewery", "name", "bar", "number"]
+UPDATE_FIELDS = ["reserved", "abv", "tasting_notes", "notes"]
+TRUE_VALUES = {"1", "true", "t", "yes", "y"}
+
+
+def read_csv(stream):
+    for row in csv.DictReader(stream):
+        yield row
+
+
+def read_ndjson(stream):
+    # Lines are decoded by clean_row(), which reports the row number of any
+    # that aren't valid JSON
+    for line in stream:
+        line = line.strip()
+        if line:
+            yield line
+
+
+READERS = {
+    "csv": read_csv,
+    "ndjson": read_ndjson,
+}
+
+
+class Command(BaseCommand):
+    help = (
+        "Import the festival beer list from a CSV or NDJSON file with "
+        "bar, brewery, brewery_location, name, number, reserved, abv, "
+        "tasting_notes and notes columns. Breweries and bars are created "
+        "as needed."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "path", help="File to import, or - to read from stdin.")
+        parser.add_argument(
+            "--format", choices=sorted(READERS),
+            help="Input format; defaults to the file extension.",
+        )
+        parser.add_argument(
+            "--batch-size", type=int, default=500,
+            help="Number of beers to insert per query (default 500).",
+        )
+        parser.add_argument(
+            "--update", action="store_true",
+            help="Update existing beers instead of leaving them untouched.",
+        )
+
+    def handle(self, *args, **options):
+        path = options["path"]
+        fmt = options["format"]
+        if fmt is None:
+            fmt = path.rpartition(".")[2].lower()
+            if fmt not in READERS:
+                raise CommandError(
+                    "Cannot tell the format of {}; pass --format".format(path))
+        if options["batch_size"] < 1:
+            raise CommandError("--batch-size must be at least 1")
+
+        self.update = options["update"]
+        self.verbosity = options["verbosity"]
+        self.breweries = dict(Brewery.objects.values_list("name", "id"))
+        self.bars = dict(Bar.objects.values_list("name", "id"))
+        # NULL numbers never conflict in the database, so beers without a
+        # number are matched against the existing rows here instead.
+        self.unnumbered = {
+            (brewery_id, name, bar_id): pk
+            for pk, brewery_id, name, bar_id in Beer.objects.filter(
+                number__isnull=True
+            ).order_by().values_list("pk", "brewery", "name", "bar")
+        }
+
+        if path == "-":
+            self.import_stream(sys.stdin, fmt, options["batch_size"])
+        else:
+            with open(path, newline="", encoding="utf-8") as stream:
+                self.import_stream(stream, fmt, options["batch_size"])
+
+    def import_stream(self, stream, fmt, batch_size):
+        rows = enumerate(READERS[fmt](stream), start=1)
+        total = 0
+        start = time.monotonic()
+
+        try:
+            while True:
+                batch = list(islice(rows, batch_size))
+                if not batch:
+                    break
+                with transaction.atomic():
+                    self.import_batch(batch)
+                total += len(batch)
+                if self.verbosity >= 1:
+                    elapsed = time.monotonic() - start
+                    self.stdout.write(
+                        f"Processed {total} rows in {elapsed:.1f}s")
+        finally:
+            # bulk_create doesn't send post_save, so the catalogue version
+            # and snapshot haven't been updated. Each batch is committed on
+            # its own, so this is done even if a later batch fails. The
+            # command exits too soon for a scheduled build, so the snapshot
+            # is built here.
+            if total:
+                bump_catalogue_version()
+                snapshot.build_now()
+        self.stdout.write(self.style.SUCCESS(f"Imported {total} rows"))
+
+    def import_batch(self, batch):
+        try:
+            cleaned = [self.clean_row(n, row) for n, row in batch]
+        except ValueError as e:
+            raise CommandError(str(e))
+
+        self.resolve(Brewery, self.breweries, {
+            row["brewery"]: {"location": row["brewery_location"]}
+            for row in cleaned
+        })
+        self.resolve(Bar, self.bars, {row["bar"]: {} for row in cleaned})
+
+        # Later rows win over earlier ones with the same key
+        numbered = {}
+        unnumbered = {}
+        for row in cleaned:
+            beer = Beer(
+                bar_id=self.bars[row["bar"]],
+                brewery_id=self.breweries[row["brewery"]],
+                brewery_name=row["brewery"],
+                name=row["name"],
+                number=row["number"],
+                reserved=row["reserved"],
+                abv=row["abv"],
+                tasting_notes=row["tasting_notes"],
+                notes=row["notes"],
+            )
+            if beer.number is None:
+                unnumbered[beer.brewery_id, beer.name, beer.bar_id] = beer
+            else:
+                key = (beer.brewery_id, beer.name, beer.bar_id, beer.number)
+                numbered[key] = beer
+
+        if self.update:
+            Beer.objects.bulk_create(
+                numbered.values(),
+                update_conflicts=True,
+                unique_fields=UNIQUE_FIELDS,
+                update_fields=UPDATE_FIELDS,
+            )
+        else:
+            Beer.objects.bulk_create(numbered.values(), ignore_conflicts=True)
+
+        new = []
+        existing = []
+        for key, beer in unnumbered.items():
+            if key not in self.unnumbered:
+                new.append(beer)
+            elif self.update:
+                beer.pk = self.unnumbered[key]
+                existing.append(beer)
+        for beer in Beer.objects.bulk_create(new):
+            self.unnumbered[beer.brewery_id, beer.name, beer.bar_id] = beer.pk
+        if existing:
+            Beer.objects.bulk_update(existing, UPDATE_FIELDS)
+
+    def resolve(self, model, ids, rows):
+        new = {
+            name: fields for name, fields in rows.items() if name not in ids
+        }
+        if not new:
+            return
+        model.objects.bulk_create(
+            [model(name=name, **fields) for name, fields in new.items()],
+            ignore_conflicts=True,
+        )
+        ids.update(
+            model.objects.filter(name__in=new).values_list("name", "id"))
+
+    def clean_row(self, n, row):
+        if isinstance(row, str):
+            try:
+                row = json.loads(row)
+            except ValueError as e:
+                raise ValueError(f"Row {n}: invalid JSON: {e}")
+        if not isinstance(row, dict):
+            raise ValueError(f"Row {n}: expected an object")
+        cleaned = {}
+        for field in ["bar", "brewery", "name"]:
+            value = str(row.get(field) or "").strip()
+            if not value:
+                raise ValueError(f"Row {n}: {field} is required")
+            cleaned[field] = value
+        for field in ["brewery_location", "tasting_notes", "notes"]:
+            cleaned[field] = str(row.get(field) or "").strip()
+
+        reserved = row.get("reserved")
+        if isinstance(reserved, str):
+            reserved = reserved.strip().lower() in TRUE_VALUES
+        cleaned["reserved"] = bool(reserved)
+
+        for field in ["number", "abv"]:
+            # JSON numbers go through str() so 4.2 doesn't become a float
+            value = row.get(field)
+            value = "" if value is None else str(value).strip()
+            if not value:
+                cleaned[field] = None
+                continue
+            try:
+                cleaned[field] = Beer._meta.get_field(field).clean(
+                    value, None)
+            except ValidationError as e:
+                raise ValueError(
+                    "Row {}: invalid {} {!r}: {}".format(
+                        n, field, value, " ".join(e.messages)))
+        return cleaned
@@ -0,0 +1,28 @@
+from django.core.management.base import BaseCommand
+
+from beerfest import page_cache
+
+
+PAGES = ["list", "detail"]
+
+
+class Command(BaseCommand):
+    help = "Show hit and miss counts for the anonymous page cache."
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--reset", action="store_true",
+            help="Reset the counters after showing them.",
+        )
+
+    def handle(self, *args, **options):
+        for name, counts in page_cache.counters(PAGES).items():
+            total = counts["hits"] + counts["misses"]
+            ratio = f"{counts['hits'] / total:.1%}" if total else "n/a"
+            self.stdout.write(
+                f"{name}: {counts['hits']} hits, {counts['misses']} misses "
+                f"(hit ratio {ratio})"
+            )
+        if options["reset"]:
+            page_cache.reset_counters(PAGES)
+            self.stdout.write("Counters reset")
@@ -0,0 +1,50 @@
+from django.core.management.base import BaseCommand, CommandError
+from django.db import transaction
+
+from beerfest.models import Beer
+from beerfest.versions import bump_beer_version
+
+
+class Command(BaseCommand):
+    help = (
+        "Recount the denormalised star and rating stats on each beer from "
+        "the StarBeer and BeerRating tables, reporting any drift."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--check", action="store_true",
+            help="Report drift without fixing it; exit non-zero if found.",
+        )
+
+    def handle(self, *args, **options):
+        with transaction.atomic():
+            drifted = list(
+                Beer.objects.with_drifted_stats().order_by("pk").values_list(
+                    "pk", "num_stars", "counted_num_stars",
+                    "num_ratings", "counted_num_ratings",
+                    "rating_sum", "counted_rating_sum",
+                )
+            )
+            for row in drifted:
+                self.stdout.write(
+                    "Beer {}: stars {} != {}, ratings {} != {}, "
+                    "rating sum {} != {}".format(*row)
+                )
+
+            if options["check"]:
+                if drifted:
+                    raise CommandError(
+                        f"{len(drifted)} beer(s) have drifted stats")
+            elif drifted:
+                Beer.objects.filter(
+                    pk__in=[row[0] for row in drifted]
+                ).recount_stats()
+                transaction.on_commit(lambda: bump_beer_version(
+                    *(row[0] for row in drifted)))
+
+        if not drifted:
+            self.stdout.write("No drift found")
+        elif not options["check"]:
+            self.stdout.write(
+                self.style.SUCCESS(f"Recounted {len(drifted)} beer(s)"))
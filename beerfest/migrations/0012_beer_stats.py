@@ -0,0 +1,51 @@
+# Generated by Django 5.2.18 on 2026-10-17 02:09
+
+from django.db import migrations, models
+from django.db.models import Count, OuterRef, Subquery, Sum
+from django.db.models.functions import Coalesce
+
+
+def count_stats(apps, schema_editor):
+    Beer = apps.get_model("beerfest", "Beer")
+    StarBeer = apps.get_model("beerfest", "StarBeer")
+    BeerRating = apps.get_model("beerfest", "BeerRating")
+
+    stars = StarBeer.objects.filter(
+        beer=OuterRef("pk")
+    ).order_by().values("beer").annotate(count=Count("pk"))
+    ratings = BeerRating.objects.filter(
+        beer=OuterRef("pk")
+    ).order_by().values("beer").annotate(
+        count=Count("pk"), total=Sum("rating")
+    )
+    Beer.objects.update(
+        num_stars=Coalesce(Subquery(stars.values("count")), 0),
+        num_ratings=Coalesce(Subquery(ratings.values("count")), 0),
+        rating_sum=Coalesce(Subquery(ratings.values("total")), 0),
+    )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('beerfest', '0011_auto_20191010_0008'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='beer',
+            name='num_ratings',
+            field=models.PositiveIntegerField(default=0, editable=False),
+        ),
+        migrations.AddField(
+            model_name='beer',
+            name='num_stars',
+            field=models.PositiveIntegerField(default=0, editable=False),
+        ),
+        migrations.AddField(
+            model_name='beer',
+            name='rating_sum',
+            field=models.PositiveIntegerField(default=0, editable=False),
+        ),
+        migrations.RunPython(count_stats, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,19 @@
+# Generated by Django 5.2.18 on 2026-10-17 02:17
+
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('beerfest', '0012_beer_stats'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='beerrating',
+            index=models.Index(fields=['beer', 'rating'], name='beerrating_beer_rating_idx'),
+        ),
+    ]
@@ -0,0 +1,146 @@
+from django.db import migrations
+
+
+# SQLite: an FTS5 table keyed by beer id, kept in sync by triggers on the
+# beer and brewery tables.
+SQLITE_FORWARDS = [
+    """
+    CREATE VIRTUAL TABLE beerfest_beer_fts USING fts5(
+        name, brewery, tasting_notes, notes,
+        tokenize = 'porter unicode61'
+    )
+    """,
+    """
+    INSERT INTO beerfest_beer_fts (rowid, name, brewery, tasting_notes, notes)
+    SELECT beer.id, beer.name, brewery.name, beer.tasting_notes, beer.notes
+    FROM beerfest_beer beer
+    INNER JOIN beerfest_brewery brewery ON brewery.id = beer.brewery_id
+    """,
+    """
+    CREATE TRIGGER beerfest_beer_fts_insert AFTER INSERT ON beerfest_beer
+    BEGIN
+        INSERT INTO beerfest_beer_fts (
+            rowid, name, brewery, tasting_notes, notes
+        ) VALUES (
+            new.id, new.name,
+            (SELECT name FROM beerfest_brewery WHERE id = new.brewery_id),
+            new.tasting_notes, new.notes
+        );
+    END
+    """,
+    """
+    CREATE TRIGGER beerfest_beer_fts_update
+    AFTER UPDATE OF name, brewery_id, tasting_notes, notes ON beerfest_beer
+    BEGIN
+        UPDATE beerfest_beer_fts SET
+            name = new.name,
+            brewery = (
+                SELECT name FROM beerfest_brewery WHERE id = new.brewery_id
+            ),
+            tasting_notes = new.tasting_notes,
+            notes = new.notes
+        WHERE rowid = old.id;
+    END
+    """,
+    """
+    CREATE TRIGGER beerfest_beer_fts_delete AFTER DELETE ON beerfest_beer
+    BEGIN
+        DELETE FROM beerfest_beer_fts WHERE rowid = old.id;
+    END
+    """,
+    """
+    CREATE TRIGGER beerfest_brewery_fts_update
+    AFTER UPDATE OF name ON beerfest_brewery
+    BEGIN
+        UPDATE beerfest_beer_fts SET brewery = new.name
+        WHERE rowid IN (
+            SELECT id FROM beerfest_beer WHERE brewery_id = new.id
+        );
+    END
+    """,
+]
+
+SQLITE_BACKWARDS = [
+    "DROP TRIGGER beerfest_brewery_fts_update",
+    "DROP TRIGGER beerfest_beer_fts_delete",
+    "DROP TRIGGER beerfest_beer_fts_update",
+    "DROP TRIGGER beerfest_beer_fts_insert",
+    "DROP TABLE beerfest_beer_fts",
+]
+
+# PostgreSQL: a weighted tsvector column with a GIN index, maintained by
+# triggers so it can include the brewery name.
+POSTGRES_FORWARDS = [
+    "ALTER TABLE beerfest_beer ADD COLUMN search_vector tsvector",
+    """
+    CREATE FUNCTION beerfest_beer_search_vector() RETURNS trigger AS $$
+    BEGIN
+        NEW.search_vector :=
+            setweight(to_tsvector('english', NEW.name), 'A') ||
+            setweight(to_tsvector('english', coalesce((
+                SELECT name FROM beerfest_brewery WHERE id = NEW.brewery_id
+            ), '')), 'A') ||
+            setweight(to_tsvector('english', NEW.tasting_notes), 'B') ||
+            setweight(to_tsvector('english', NEW.notes), 'C');
+        RETURN NEW;
+    END
+    $$ LANGUAGE plpgsql
+    """,
+    """
+    CREATE TRIGGER beerfest_beer_search_vector
+    BEFORE INSERT OR UPDATE OF name, brewery_id, tasting_notes, notes
+    ON beerfest_beer
+    FOR EACH ROW EXECUTE PROCEDURE beerfest_beer_search_vector()
+    """,
+    """
+    CREATE FUNCTION beerfest_brewery_search_vector() RETURNS trigger AS $$
+    BEGIN
+        UPDATE beerfest_beer SET name = name WHERE brewery_id = NEW.id;
+        RETURN NULL;
+    END
+    $$ LANGUAGE plpgsql
+    """,
+    """
+    CREATE TRIGGER beerfest_brewery_search_vector
+    AFTER UPDATE OF name ON beerfest_brewery
+    FOR EACH ROW EXECUTE PROCEDURE beerfest_brewery_search_vector()
+    """,
+    "UPDATE beerfest_beer SET name = name",
+    """
+    CREATE INDEX beerfest_beer_search_vector_idx
+    ON beerfest_beer USING GIN (search_vector)
+    """,
+]
+
+POSTGRES_BACKWARDS = [
+    "DROP TRIGGER beerfest_brewery_search_vector ON beerfest_brewery",
+    "DROP FUNCTION beerfest_brewery_search_vector()",
+    "DROP TRIGGER beerfest_beer_search_vector ON beerfest_beer",
+    "DROP FUNCTION beerfest_beer_search_vector()",
+    "ALTER TABLE beerfest_beer DROP COLUMN search_vector",
+]
+
+STATEMENTS = {
+    "sqlite": (SQLITE_FORWARDS, SQLITE_BACKWARDS),
+    "postgresql": (POSTGRES_FORWARDS, POSTGRES_BACKWARDS),
+}
+
+
+def run_statements(direction):
+    def run(apps, schema_editor):
+        vendor = schema_editor.connection.vendor
+        if vendor in STATEMENTS:
+            for sql in STATEMENTS[vendor][direction]:
+                schema_editor.execute(sql)
+    return run
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('beerfest', '0013_beerrating_beer_rating_idx'),
+    ]
+
+    operations = [
+        migrations.RunPython(run_statements(0), run_statements(1)),
+    ]
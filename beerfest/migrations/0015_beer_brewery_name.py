@@ -0,0 +1,109 @@
+# Generated by Django 5.2.18 on 2026-10-17 09:12
+
+import django.db.models.expressions
+from django.db import migrations, models
+from django.db.models import OuterRef, Subquery
+
+
+# SQLite adds the column by rebuilding the beer table, which drops the
+# search triggers from 0014 on it and fails on the brewery one, so they are
+# dropped first and created again afterwards.
+SQLITE_TRIGGERS = [
+    """
+    CREATE TRIGGER beerfest_beer_fts_insert AFTER INSERT ON beerfest_beer
+    BEGIN
+        INSERT INTO beerfest_beer_fts (
+            rowid, name, brewery, tasting_notes, notes
+        ) VALUES (
+            new.id, new.name,
+            (SELECT name FROM beerfest_brewery WHERE id = new.brewery_id),
+            new.tasting_notes, new.notes
+        );
+    END
+    """,
+    """
+    CREATE TRIGGER beerfest_beer_fts_update
+    AFTER UPDATE OF name, brewery_id, tasting_notes, notes ON beerfest_beer
+    BEGIN
+        UPDATE beerfest_beer_fts SET
+            name = new.name,
+            brewery = (
+                SELECT name FROM beerfest_brewery WHERE id = new.brewery_id
+            ),
+            tasting_notes = new.tasting_notes,
+            notes = new.notes
+        WHERE rowid = old.id;
+    END
+    """,
+    """
+    CREATE TRIGGER beerfest_beer_fts_delete AFTER DELETE ON beerfest_beer
+    BEGIN
+        DELETE FROM beerfest_beer_fts WHERE rowid = old.id;
+    END
+    """,
+    """
+    CREATE TRIGGER beerfest_brewery_fts_update
+    AFTER UPDATE OF name ON beerfest_brewery
+    BEGIN
+        UPDATE beerfest_beer_fts SET brewery = new.name
+        WHERE rowid IN (
+            SELECT id FROM beerfest_beer WHERE brewery_id = new.id
+        );
+    END
+    """,
+]
+
+SQLITE_TRIGGER_NAMES = [
+    "beerfest_brewery_fts_update",
+    "beerfest_beer_fts_delete",
+    "beerfest_beer_fts_update",
+    "beerfest_beer_fts_insert",
+]
+
+
+def drop_sqlite_triggers(apps, schema_editor):
+    if schema_editor.connection.vendor == "sqlite":
+        for name in SQLITE_TRIGGER_NAMES:
+            schema_editor.execute(f"DROP TRIGGER IF EXISTS {name}")
+
+
+def create_sqlite_triggers(apps, schema_editor):
+    if schema_editor.connection.vendor == "sqlite":
+        for sql in SQLITE_TRIGGERS:
+            schema_editor.execute(sql)
+
+
+def set_brewery_names(apps, schema_editor):
+    Beer = apps.get_model("beerfest", "Beer")
+    Brewery = apps.get_model("beerfest", "Brewery")
+
+    Beer.objects.update(brewery_name=Subquery(
+        Brewery.objects.filter(pk=OuterRef("brewery")).values("name")
+    ))
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('beerfest', '0014_beer_search'),
+    ]
+
+    operations = [
+        migrations.RunPython(drop_sqlite_triggers, create_sqlite_triggers),
+        migrations.AddField(
+            model_name='beer',
+            name='brewery_name',
+            field=models.CharField(default='', editable=False, max_length=200),
+            preserve_default=False,
+        ),
+        migrations.RunPython(set_brewery_names, migrations.RunPython.noop),
+        migrations.AlterModelOptions(
+            name='beer',
+            options={'ordering': ['bar', 'brewery_name', django.db.models.expressions.OrderBy(django.db.models.expressions.F('number'), nulls_last=True), 'name']},
+        ),
+        migrations.AddIndex(
+            model_name='beer',
+            index=models.Index(fields=['bar', 'brewery_name', 'number', 'name', 'id'], name='beer_ordering_idx'),
+        ),
+        migrations.RunPython(create_sqlite_triggers, drop_sqlite_triggers),
+    ]
@@ -1,7 +1,23 @@
-from django.db import models
+from django.db import connections, models, router, transaction
+from django.db.models import (
+    Case, Count, Exists, F, FloatField, OuterRef, Q, Subquery, Sum, When
+)
+from django.db.models.functions import Cast, Coalesce
 from django.conf import settings
 from django.core.validators import MinValueValidator, MaxValueValidator
 
+# Primary keys are AutoFields, which the database stores as 32-bit integers;
+# looking up an id outside this range raises OverflowError on some backends.
+MAX_ID = 2 ** 31 - 1
+
+
+def is_valid_id(value):
+    """Return whether ``value`` could be the primary key of a row."""
+    return (
+        isinstance(value, int) and not isinstance(value, bool)
+        and 0 < value <= MAX_ID
+    )
+
 
 class Brewery(models.Model):
     name = models.CharField(max_length=200, unique=True)
@@ -10,6 +26,15 @@ class Brewery(models.Model):
     def __str__(self):
         return self.name
 
+    def save(self, *args, **kwargs):
+        adding = self._state.adding
+        super().save(*args, **kwargs)
+        if not adding:
+            # One UPDATE for all of a renamed brewery's beers
+            Beer.objects.filter(brewery=self).exclude(
+                brewery_name=self.name
+            ).update(brewery_name=self.name)
+
     class Meta:
         ordering = ["name"]
 
@@ -24,6 +49,82 @@ class Bar(models.Model):
         ordering = ["id"]
 
 
+def counted_stats():
+    stars = StarBeer.objects.filter(
+        beer=OuterRef("pk")
+    ).order_by().values("beer").annotate(count=Count("pk"))
+    ratings = BeerRating.objects.filter(
+        beer=OuterRef("pk")
+    ).order_by().values("beer").annotate(
+        count=Count("pk"), total=Sum("rating")
+    )
+    return {
+        "num_stars": Coalesce(Subquery(stars.values("count")), 0),
+        "num_ratings": Coalesce(Subquery(ratings.values("count")), 0),
+        "rating_sum": Coalesce(Subquery(ratings.values("total")), 0),
+    }
+
+
+class BeerQuerySet(models.QuerySet):
+    def with_counted_stats(self):
+        return self.annotate(**{
+            f"counted_{name}": expression
+            for name, expression in counted_stats().items()
+        })
+
+    def with_drifted_stats(self):
+        return self.with_counted_stats().exclude(
+            num_stars=models.F("counted_num_stars"),
+            num_ratings=models.F("counted_num_ratings"),
+            rating_sum=models.F("counted_rating_sum"),
+        )
+
+    def recount_stats(self):
+        return self.update(**counted_stats())
+
+    def with_stats(self):
+        """Annotate ``avg_rating``, or None for unrated beers.
+
+        ``num_stars`` and ``num_ratings`` are columns already.
+        """
+        return self.annotate(avg_rating=Case(
+            When(
+                num_ratings__gt=0,
+                then=Cast("rating_sum", FloatField()) / F("num_ratings"),
+            ),
+            default=None,
+            output_field=FloatField(),
+        ))
+
+    def starred_or_rated_by(self, user):
+        """Filter to the beers ``user`` has starred or rated.
+
+        The (user, beer) unique indexes on StarBeer and BeerRating find
+        them, and unlike a join there are no duplicates to remove.
+        """
+        return self.filter(
+            Q(pk__in=StarBeer.objects.filter(user=user.pk).values("beer"))
+            | Q(pk__in=BeerRating.objects.filter(user=user.pk).values("beer"))
+        )
+
+    def with_user_state(self, user):
+        """Annotate each beer with ``user``'s ``starred`` and ``rating``.
+
+        Both are subqueries of the same query. Anonymous users have no
+        state, so nothing is annotated for them.
+        """
+        if not user.is_authenticated:
+            return self
+        starred = StarBeer.objects.filter(user=user.pk, beer=OuterRef("pk"))
+        rating = BeerRating.objects.filter(
+            user=user.pk, beer=OuterRef("pk")
+        ).order_by().values("rating")
+        return self.annotate(
+            starred=Exists(starred),
+            rating=Subquery(rating),
+        )
+
+
 class Beer(models.Model):
     bar = models.ForeignKey(Bar, on_delete=models.CASCADE)
     brewery = models.ForeignKey(Brewery, on_delete=models.CASCADE)
@@ -35,6 +136,17 @@ class Beer(models.Model):
     tasting_notes = models.TextField(blank=True)
     notes = models.TextField(blank=True)
 
+    # Denormalised from Brewery, so the default ordering doesn't need a join;
+    # set on save and kept up to date by Brewery.save(). Anything writing
+    # Beer rows in bulk has to set it itself.
+    brewery_name = models.CharField(max_length=200, editable=False)
+
+    # Denormalised from StarBeer and BeerRating; kept up to date by the
+    # star/rating views and checked by the recount_beer_stats command.
+    num_stars = models.PositiveIntegerField(default=0, editable=False)
+    num_ratings = models.PositiveIntegerField(default=0, editable=False)
+    rating_sum = models.PositiveIntegerField(default=0, editable=False)
+
     starred_by = models.ManyToManyField(
         settings.AUTH_USER_MODEL,
         through="StarBeer", related_name="starred_beers"
@@ -44,17 +156,100 @@ class Beer(models.Model):
         through="BeerRating", related_name="rated_beers"
     )
 
+    objects = BeerQuerySet.as_manager()
+
     def __str__(self):
-        return f"{self.name} by {self.brewery.name}"
+        return f"{self.name} by {self.brewery_name}"
+
+    def save(self, *args, **kwargs):
+        if self.brewery_id is not None:
+            self.brewery_name = self.brewery.name
+        super().save(*args, **kwargs)
 
     class Meta:
         ordering = [
             "bar",
-            "brewery__name",
+            "brewery_name",
             models.F("number").asc(nulls_last=True),
             "name",
         ]
         unique_together = ["brewery", "name", "bar", "number"]
+        indexes = [
+            # The default ordering, then the pk for keyset pagination.
+            # PostgreSQL sorts NULLs last in ascending indexes, so it covers
+            # the whole sort there.
+            models.Index(
+                fields=["bar", "brewery_name", "number", "name", "id"],
+                name="beer_ordering_idx",
+            ),
+        ]
+
+
+# Every write of a beer's StarBeer or BeerRating rows first locks the beer's
+# row with SELECT ... FOR UPDATE, which doubles as the check that it exists.
+# Concurrent taps on a beer then take turns, and as each later statement
+# reads the link table afresh (even under PostgreSQL's READ COMMITTED, where
+# an UPDATE that waited on the row lock would otherwise still judge its
+# subqueries by its original snapshot), the guarded UPDATE of the
+# denormalised stats sees whatever an earlier tap committed. The link row is
+# then written with a single INSERT ... ON CONFLICT or DELETE, so a tap
+# never races against the unique_together constraint.
+#
+# SQLite has no row locks and ignores FOR UPDATE. A transaction there that
+# reads before it writes is refused with "database is locked", without
+# waiting out the busy timeout, if another connection is writing. So on
+# SQLite a tap starts with the guarded UPDATE, whose rowcount is the check
+# that the beer exists, and a batch with a no-op UPDATE of its beers. Either
+# takes the database's write lock, which serialises writers just the same.
+
+def can_lock_rows(using):
+    return connections[using].features.has_select_for_update
+
+
+def lock_beers(beer_ids, using=None):
+    """Lock the rows of the beers with ``beer_ids``; return the ids found.
+
+    Must be called in a transaction, before it reads anything. Rows are
+    locked in id order, so overlapping writes can't deadlock.
+    """
+    using = using or router.db_for_write(Beer)
+    beers = Beer.objects.using(using).filter(pk__in=beer_ids)
+    if can_lock_rows(using):
+        beers = beers.select_for_update()
+    else:
+        beers.update(num_stars=F("num_stars"))
+    return set(beers.order_by("pk").values_list("pk", flat=True))
+
+
+class StarBeerManager(models.Manager):
+    def star(self, user, beer_id):
+        starred = self.filter(user=user, beer=OuterRef("pk"))
+        with transaction.atomic(using=self.db, savepoint=False):
+            if can_lock_rows(self.db):
+                lock_beers([beer_id], using=self.db)
+            if not Beer.objects.filter(pk=beer_id).update(
+                num_stars=F("num_stars") + Case(
+                    When(Exists(starred), then=0), default=1)
+            ):
+                return False
+            self.bulk_create(
+                [self.model(user=user, beer_id=beer_id)],
+                ignore_conflicts=True,
+            )
+        return True
+
+    def unstar(self, user, beer_id):
+        starred = self.filter(user=user, beer=OuterRef("pk"))
+        with transaction.atomic(using=self.db, savepoint=False):
+            if can_lock_rows(self.db):
+                lock_beers([beer_id], using=self.db)
+            if not Beer.objects.filter(pk=beer_id).update(
+                num_stars=F("num_stars") - Case(
+                    When(Exists(starred), then=1), default=0)
+            ):
+                return False
+            self.filter(user=user, beer=beer_id).delete()
+        return True
 
 
 class StarBeer(models.Model):
@@ -64,6 +259,8 @@ class StarBeer(models.Model):
     beer = models.ForeignKey(Beer, on_delete=models.CASCADE,
                              related_name="starbeer")
 
+    objects = StarBeerManager()
+
     def __str__(self):
         return f"{self.user.username} starred {self.beer.name}"
 
@@ -72,6 +269,43 @@ class StarBeer(models.Model):
         unique_together = ["user", "beer"]
 
 
+class BeerRatingManager(models.Manager):
+    def rate(self, user, beer_id, rating):
+        current = self.filter(user=user, beer=OuterRef("pk")).order_by()
+        with transaction.atomic(using=self.db, savepoint=False):
+            if can_lock_rows(self.db):
+                lock_beers([beer_id], using=self.db)
+            if not Beer.objects.filter(pk=beer_id).update(
+                num_ratings=F("num_ratings") + Case(
+                    When(Exists(current), then=0), default=1),
+                rating_sum=F("rating_sum") + rating - Coalesce(
+                    Subquery(current.values("rating")), 0),
+            ):
+                return False
+            self.bulk_create(
+                [self.model(user=user, beer_id=beer_id, rating=rating)],
+                update_conflicts=True,
+                unique_fields=["user", "beer"],
+                update_fields=["rating"],
+            )
+        return True
+
+    def unrate(self, user, beer_id):
+        current = self.filter(user=user, beer=OuterRef("pk")).order_by()
+        with transaction.atomic(using=self.db, savepoint=False):
+            if can_lock_rows(self.db):
+                lock_beers([beer_id], using=self.db)
+            if not Beer.objects.filter(pk=beer_id).update(
+                num_ratings=F("num_ratings") - Case(
+                    When(Exists(current), then=1), default=0),
+                rating_sum=F("rating_sum") - Coalesce(
+                    Subquery(current.values("rating")), 0),
+            ):
+                return False
+            self.filter(user=user, beer=beer_id).delete()
+        return True
+
+
 class BeerRating(models.Model):
     user = models.ForeignKey(settings.AUTH_USER_MODEL,
                              on_delete=models.CASCADE,
@@ -82,9 +316,16 @@ class BeerRating(models.Model):
         validators=[MinValueValidator(1), MaxValueValidator(5)]
     )
 
+    objects = BeerRatingManager()
+
     def __str__(self):
         return f"{self.user.username} rated {self.beer.name} {self.rating}"
 
     class Meta:
         ordering = ["id"]
         unique_together = ["user", "beer"]
+        indexes = [
+            # Covers the per-beer rating aggregates
+            models.Index(
+                fields=["beer", "rating"], name="beerrating_beer_rating_idx"),
+        ]
@@ -0,0 +1,92 @@
+import hashlib
+
+from django.conf import settings
+from django.core.cache import cache
+from django.http import HttpResponse
+from django.utils.cache import has_vary_header
+
+from .versions import beer_version, catalogue_version, stats_version
+
+
+# Whole pages rendered for anonymous users, cached under keys that include
+# the versions of everything they show. Nothing is ever deleted: a change
+# bumps a version and the stale pages are simply never asked for again.
+
+COUNTER_KEY = "beerfest:page_cache:{}:{}"
+OUTCOMES = ["hits", "misses"]
+
+
+def is_enabled():
+    return getattr(settings, "BEERFEST_ANONYMOUS_PAGE_CACHE", False)
+
+
+def get_timeout():
+    return getattr(settings, "BEERFEST_PAGE_CACHE_TIMEOUT", 300)
+
+
+def list_key(request):
+    # The list shows beer stats, which only have a time-bucketed version
+    path = hashlib.md5(request.get_full_path().encode()).hexdigest()
+    return "beerfest:page:list:{}:{}:{}".format(
+        catalogue_version(), stats_version(), path)
+
+
+def detail_key(beer_id):
+    return "beerfest:page:detail:{}:{}:{}".format(
+        beer_id, catalogue_version(), beer_version(beer_id))
+
+
+def get_page(key):
+    page = cache.get(key)
+    if page is None:
+        return None
+    content, content_type = page
+    return HttpResponse(content, content_type=content_type)
+
+
+def is_shareable(request, response):
+    """Whether ``response`` can be served to other anonymous visitors.
+
+    CsrfViewMiddleware only sets the CSRF cookie after the view has run, so
+    a page that used a CSRF token is recognised by the request being marked
+    as needing the cookie, not by the response's cookies.
+    """
+    return (
+        response.status_code == 200
+        and not response.cookies
+        and not request.META.get("CSRF_COOKIE_NEEDS_UPDATE")
+        and not has_vary_header(response, "Cookie")
+    )
+
+
+def set_page(key, response):
+    cache.set(
+        key, (response.content, response["Content-Type"]), get_timeout())
+
+
+def count(name, outcome):
+    key = COUNTER_KEY.format(name, outcome)
+    cache.add(key, 0, None)
+    try:
+        cache.incr(key)
+    except ValueError:
+        pass
+
+
+def counters(names):
+    keys = {
+        COUNTER_KEY.format(name, outcome): (name, outcome)
+        for name in names for outcome in OUTCOMES
+    }
+    values = cache.get_many(keys)
+    result = {name: dict.fromkeys(OUTCOMES, 0) for name in names}
+    for key, (name, outcome) in keys.items():
+        result[name][outcome] = values.get(key, 0)
+    return result
+
+
+def reset_counters(names):
+    cache.delete_many([
+        COUNTER_KEY.format(name, outcome)
+        for name in names for outcome in OUTCOMES
+    ])
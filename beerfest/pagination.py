@@ -0,0 +1,247 @@
+import base64
+import binascii
+import json
+from collections import OrderedDict
+
+from django.core.exceptions import ValidationError
+from django.db.models import F, IntegerField, Q
+
+from rest_framework.exceptions import NotFound
+from rest_framework.pagination import BasePagination
+from rest_framework.response import Response
+from rest_framework.utils.urls import replace_query_param
+
+from .models import MAX_ID, Beer, is_valid_id
+
+
+class InvalidToken(ValueError):
+    pass
+
+
+class Keyset:
+    """A total ordering that can be resumed from the last row seen.
+
+    ``fields`` are ``(lookup, nullable)`` pairs; nullable fields sort with
+    NULLs last, as in ``Beer.Meta.ordering``. The final field must be unique
+    so that every row has a distinct position. Positions decoded from tokens
+    are checked against the fields of ``model``.
+    """
+
+    def __init__(self, *fields, model=None):
+        self.fields = fields
+        self.model = model
+
+    def model_field(self, lookup):
+        opts = self.model._meta
+        *relations, name = lookup.split("__")
+        for relation in relations:
+            opts = opts.get_field(relation).related_model._meta
+        field = opts.get_field(name)
+        return field.target_field if field.is_relation else field
+
+    def clean(self, position):
+        """Convert a decoded position's values to their fields' types.
+
+        Raises ValidationError if a value isn't valid for its field, so it
+        can't make a query fail.
+        """
+        values = []
+        for (lookup, nullable), value in zip(self.fields, position):
+            if value is None:
+                if not nullable:
+                    raise ValidationError("Missing value for %s" % lookup)
+            elif self.model is not None:
+                field = self.model_field(lookup)
+                value = field.to_python(value)
+                field.run_validators(value)
+                # Not every backend gives integer fields range validators,
+                # and some can't compare a column with a larger integer
+                if field.primary_key:
+                    valid = is_valid_id(value)
+                else:
+                    valid = (
+                        not isinstance(field, IntegerField)
+                        or -MAX_ID <= value <= MAX_ID
+                    )
+                if not valid:
+                    raise ValidationError(
+                        "%s out of range for %s" % (value, lookup))
+            values.append(value)
+        return values
+
+    def order_by(self, reverse=False):
+        ordering = []
+        for lookup, nullable in self.fields:
+            if reverse:
+                ordering.append(F(lookup).desc(nulls_first=nullable or None))
+            else:
+                ordering.append(F(lookup).asc(nulls_last=nullable or None))
+        return ordering
+
+    def position(self, obj):
+        values = []
+        for lookup, _ in self.fields:
+            value = obj
+            for attr in lookup.split("__"):
+                value = getattr(value, attr)
+            values.append(value)
+        return values
+
+    def after(self, position, reverse=False):
+        """Return a Q matching rows after ``position`` in this ordering.
+
+        With ``reverse`` the rows before ``position`` are matched instead.
+        """
+        seek = Q(pk__in=[])
+        equal = Q()
+        for (lookup, nullable), value in zip(self.fields, position):
+            if reverse:
+                if value is None:
+                    beyond = Q(**{f"{lookup}__isnull": False})
+                else:
+                    beyond = Q(**{f"{lookup}__lt": value})
+            elif value is None:
+                beyond = None
+            else:
+                beyond = Q(**{f"{lookup}__gt": value})
+                if nullable:
+                    beyond |= Q(**{f"{lookup}__isnull": True})
+
+            if beyond is not None:
+                seek |= equal & beyond
+            if value is None:
+                equal &= Q(**{f"{lookup}__isnull": True})
+            else:
+                equal &= Q(**{lookup: value})
+        return seek
+
+    def encode(self, position, reverse=False):
+        data = json.dumps([int(reverse), position], separators=(",", ":"))
+        return base64.urlsafe_b64encode(data.encode()).decode().rstrip("=")
+
+    def decode(self, token):
+        try:
+            data = base64.urlsafe_b64decode(token + "=" * (-len(token) % 4))
+            reverse, position = json.loads(data)
+        except (binascii.Error, UnicodeDecodeError, ValueError, TypeError):
+            raise InvalidToken(token)
+        if not isinstance(position, list):
+            raise InvalidToken(token)
+        if len(position) != len(self.fields):
+            raise InvalidToken(token)
+        try:
+            position = self.clean(position)
+        except ValidationError:
+            raise InvalidToken(token)
+        return position, bool(reverse)
+
+    def paginate(self, queryset, page_size, token=None):
+        """Return ``(rows, next_token, previous_token)`` for one page.
+
+        Objects other than querysets can paginate themselves by providing
+        ``keyset_paginate(keyset, page_size, token)``.
+        """
+        if hasattr(queryset, "keyset_paginate"):
+            return queryset.keyset_paginate(self, page_size, token)
+
+        position, reverse = None, False
+        if token:
+            position, reverse = self.decode(token)
+
+        queryset = queryset.order_by(*self.order_by(reverse))
+        if position is not None:
+            queryset = queryset.filter(self.after(position, reverse))
+        rows = list(queryset[:page_size + 1])
+        has_more = len(rows) > page_size
+        del rows[page_size:]
+        if reverse:
+            rows.reverse()
+            has_next, has_previous = position is not None, has_more
+        else:
+            has_next, has_previous = has_more, position is not None
+
+        next_token = previous_token = None
+        if rows and has_next:
+            next_token = self.encode(self.position(rows[-1]))
+        if rows and has_previous:
+            previous_token = self.encode(self.position(rows[0]), reverse=True)
+        return rows, next_token, previous_token
+
+
+class KeysetPage:
+    def __init__(self, object_list, next_token, previous_token):
+        self.object_list = object_list
+        self.next_token = next_token
+        self.previous_token = previous_token
+
+    def __len__(self):
+        return len(self.object_list)
+
+    def __iter__(self):
+        return iter(self.object_list)
+
+    def __getitem__(self, index):
+        return self.object_list[index]
+
+    def has_next(self):
+        return self.next_token is not None
+
+    def has_previous(self):
+        return self.previous_token is not None
+
+    def has_other_pages(self):
+        return self.has_next() or self.has_previous()
+
+
+BEER_KEYSET = Keyset(
+    ("bar_id", False),
+    ("brewery_name", False),
+    ("number", True),
+    ("name", False),
+    ("id", False),
+    model=Beer,
+)
+
+
+class KeysetCursorPagination(BasePagination):
+    keyset = None
+    page_size = 50
+    max_page_size = 500
+    cursor_query_param = "cursor"
+    page_size_query_param = "page_size"
+
+    def paginate_queryset(self, queryset, request, view=None):
+        self.request = request
+        try:
+            rows, self.next_token, self.previous_token = self.keyset.paginate(
+                queryset,
+                self.get_page_size(request),
+                request.query_params.get(self.cursor_query_param),
+            )
+        except InvalidToken:
+            raise NotFound("Invalid cursor")
+        return rows
+
+    def get_page_size(self, request):
+        try:
+            page_size = int(request.query_params[self.page_size_query_param])
+        except (KeyError, ValueError):
+            return self.page_size
+        return min(max(page_size, 1), self.max_page_size)
+
+    def get_link(self, token):
+        if token is None:
+            return None
+        url = self.request.build_absolute_uri()
+        return replace_query_param(url, self.cursor_query_param, token)
+
+    def get_paginated_response(self, data):
+        return Response(OrderedDict([
+            ("next", self.get_link(self.next_token)),
+            ("previous", self.get_link(self.previous_token)),
+            ("results", data),
+        ]))
+
+
+class BeerCursorPagination(KeysetCursorPagination):
+    keyset = BEER_KEYSET
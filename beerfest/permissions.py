@@ -0,0 +1,10 @@
+from rest_framework.permissions import SAFE_METHODS, BasePermission
+
+from . import frozen
+
+
+class ReadOnlyWhenFrozen(BasePermission):
+    message = "The festival is closed."
+
+    def has_permission(self, request, view):
+        return request.method in SAFE_METHODS or not frozen.is_frozen()
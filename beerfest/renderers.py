@@ -0,0 +1,55 @@
+from rest_framework.renderers import BaseRenderer, JSONRenderer
+from rest_framework.utils.encoders import JSONEncoder
+
+try:
+    import msgpack
+except ImportError:
+    msgpack = None
+
+
+# Compact encodings of the REST API's responses for clients on slow
+# connections, picked with ?format= or the Accept header. MessagePack is
+# only offered if the msgpack package is installed.
+
+
+def to_columns(items):
+    columns = list(items[0]) if items else []
+    return {
+        "columns": columns,
+        "rows": [[item[column] for column in columns] for item in items],
+    }
+
+
+class ColumnarJSONRenderer(JSONRenderer):
+    """JSON with lists of objects sent as column names and rows of values.
+
+    Lists nested in a response, like the ``results`` of a page, are
+    converted; single objects are sent as they are.
+    """
+    media_type = "application/vnd.beerfest.columns+json"
+    format = "columns"
+
+    def render(self, data, accepted_media_type=None, renderer_context=None):
+        if isinstance(data, list):
+            data = to_columns(data)
+        elif isinstance(data, dict) and isinstance(data.get("results"), list):
+            data = dict(data, results=to_columns(data["results"]))
+        return super().render(data, accepted_media_type, renderer_context)
+
+
+class MessagePackRenderer(BaseRenderer):
+    media_type = "application/x-msgpack"
+    format = "msgpack"
+    charset = None
+    render_style = "binary"
+
+    def render(self, data, accepted_media_type=None, renderer_context=None):
+        if data is None:
+            return b""
+        return msgpack.packb(data, default=JSONEncoder().default)
+
+
+def compact_renderer_classes():
+    if msgpack is None:
+        return [ColumnarJSONRenderer]
+    return [ColumnarJSONRenderer, MessagePackRenderer]
@@ -0,0 +1,98 @@
+import re
+
+from django.db import connections
+from django.db.models import FloatField, Q, Value
+from django.db.models.expressions import RawSQL
+
+
+# Beers are indexed by name, brewery name, tasting notes and notes. The
+# index itself lives outside the models: migration 0014 creates an FTS5 table
+# on SQLite and a search_vector column on PostgreSQL, both kept in sync by
+# triggers.
+
+MAX_TERMS = 10
+
+# The FTS table is joined to the beers, so the match runs once and bm25() is
+# computed once per matching beer. bm25() is lower for better matches; name
+# and brewery weigh the most.
+FTS_TABLE = "beerfest_beer_fts"
+FTS_WHERE = [
+    "beerfest_beer_fts MATCH %s",
+    "beerfest_beer_fts.rowid = beerfest_beer.id",
+]
+FTS_RANK = "-bm25(beerfest_beer_fts, 10.0, 10.0, 2.0, 1.0)"
+
+
+def terms(query):
+    return re.findall(r"\w+", query.lower())[:MAX_TERMS]
+
+
+def search(queryset, query):
+    """Filter ``queryset`` to beers matching every term in ``query``.
+
+    Each term matches as a prefix, so results can be shown as the user
+    types. Beers are annotated with ``search_rank`` and ordered by it, best
+    match first.
+    """
+    words = terms(query)
+    if not words:
+        return queryset.none()
+
+    vendor = connections[queryset.db].vendor
+    if vendor == "sqlite":
+        match = " ".join(f'"{word}"*' for word in words)
+        queryset = queryset.extra(
+            select={"search_rank": FTS_RANK},
+            tables=[FTS_TABLE],
+            where=FTS_WHERE,
+            params=[match],
+        )
+    elif vendor == "postgresql":
+        from django.contrib.postgres.search import (
+            SearchQuery, SearchRank, SearchVectorField
+        )
+        search_query = SearchQuery(
+            " & ".join(f"{word}:*" for word in words),
+            config="english", search_type="raw",
+        )
+        queryset = queryset.alias(search_vector=RawSQL(
+            "beerfest_beer.search_vector", [],
+            output_field=SearchVectorField(),
+        )).filter(search_vector=search_query)
+        queryset = queryset.annotate(
+            search_rank=SearchRank("search_vector", search_query))
+    else:
+        for word in words:
+            queryset = queryset.filter(
+                Q(name__icontains=word)
+                | Q(brewery_name__icontains=word)
+                | Q(tasting_notes__icontains=word)
+                | Q(notes__icontains=word)
+            )
+        queryset = queryset.annotate(
+            search_rank=Value(0.0, output_field=FloatField()))
+
+    return queryset.order_by("-search_rank", "name", "pk")
+
+
+def search_records(records, query):
+    """Filter catalogue ``records`` to beers matching every term in ``query``.
+
+    Terms match the start of words, as in ``search``, but results are only
+    ordered by name.
+    """
+    words = terms(query)
+    if not words:
+        return []
+
+    def matches(record):
+        text = " ".join(filter(None, [
+            record.name, record.brewery_name, record.tasting_notes,
+            record.notes,
+        ]))
+        found = set(re.findall(r"\w+", text.lower()))
+        return all(
+            any(word.startswith(term) for word in found) for term in words)
+
+    return sorted(
+        records.filter(matches), key=lambda record: (record.name, record.id))
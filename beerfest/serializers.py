@@ -1,26 +1,104 @@
 from django.contrib.auth import get_user_model
+from django.utils.functional import cached_property
 
 from rest_framework import serializers
+from rest_framework.permissions import SAFE_METHODS
+from rest_framework.reverse import reverse
 
-from .models import Bar, Brewery
+from .models import Bar, Brewery, Beer
 
 
 User = get_user_model()
 
 
-class BarSerializer(serializers.ModelSerializer):
+def split_names(value):
+    return {name.strip() for name in value.split(",")} if value else set()
+
+
+def requested_fields(request, field_names):
+    """Return the ``field_names`` a read asked for, in order.
+
+    Clients pick fields with ``?fields=`` and drop them with ``?exclude=``,
+    both comma-separated. Unknown names are ignored.
+    """
+    if request is None or request.method not in SAFE_METHODS:
+        return list(field_names)
+    include = split_names(request.query_params.get("fields"))
+    exclude = split_names(request.query_params.get("exclude"))
+    return [
+        name for name in field_names
+        if (not include or name in include) and name not in exclude
+    ]
+
+
+class SparseFieldsetMixin:
+    """Leaves out the fields the request didn't ask for.
+
+    Only the top-level serializer is trimmed; nested ones are left whole.
+    """
+
+    def get_fields(self):
+        fields = super().get_fields()
+        parent = self.parent
+        if isinstance(parent, serializers.ListSerializer):
+            parent = parent.parent
+        if parent is not None:
+            return fields
+        names = requested_fields(self.context.get("request"), fields)
+        return {name: fields[name] for name in names}
+
+
+class BarSerializer(SparseFieldsetMixin, serializers.ModelSerializer):
     class Meta:
         model = Bar
         fields = ["id", "name"]
 
 
-class BrewerySerializer(serializers.ModelSerializer):
+class BrewerySerializer(SparseFieldsetMixin, serializers.ModelSerializer):
     class Meta:
         model = Brewery
         fields = ["id", "name", "location"]
 
 
-class UserSerializer(serializers.ModelSerializer):
+class BeerSerializer(SparseFieldsetMixin, serializers.ModelSerializer):
+    bar = BarSerializer(read_only=True)
+    brewery = BrewerySerializer(read_only=True)
+    bar_id = serializers.PrimaryKeyRelatedField(
+        source="bar", queryset=Bar.objects.all(), write_only=True
+    )
+    brewery_id = serializers.PrimaryKeyRelatedField(
+        source="brewery", queryset=Brewery.objects.all(), write_only=True
+    )
+    avg_rating = serializers.SerializerMethodField()
+    starred = serializers.SerializerMethodField()
+    rating = serializers.SerializerMethodField()
+
+    class Meta:
+        model = Beer
+        fields = [
+            "id", "bar", "brewery", "bar_id", "brewery_id", "name", "number",
+            "reserved", "abv", "tasting_notes", "notes", "num_stars",
+            "num_ratings", "avg_rating", "starred", "rating",
+        ]
+        read_only_fields = ["num_stars", "num_ratings"]
+
+    def get_avg_rating(self, beer):
+        # Annotated by with_stats(), except on beers that were just saved
+        if hasattr(beer, "avg_rating"):
+            return beer.avg_rating
+        if beer.num_ratings > 0:
+            return beer.rating_sum / beer.num_ratings
+        return None
+
+    # starred and rating are only annotated for authenticated users
+    def get_starred(self, beer):
+        return getattr(beer, "starred", None)
+
+    def get_rating(self, beer):
+        return getattr(beer, "rating", None)
+
+
+class UserSerializer(SparseFieldsetMixin, serializers.ModelSerializer):
     starred_beers = serializers.HyperlinkedRelatedField(
         many=True,
         read_only=True,
@@ -37,3 +115,84 @@ class UserSerializer(serializers.ModelSerializer):
         fields = [
             "id", "username", "email", "starred_beers", "rated_beers"
         ]
+
+
+# Read-only serializers for rows from values(), for the list and detail
+# endpoints. They skip the per-field objects a ModelSerializer builds and
+# runs for every instance, and build hyperlinks from a URL reversed once per
+# serializer rather than once per link. Their output matches the
+# ModelSerializers above.
+
+class ValuesSerializer(serializers.BaseSerializer):
+    field_names = ()
+
+    @cached_property
+    def requested_field_names(self):
+        return requested_fields(self.context.get("request"), self.field_names)
+
+    def to_representation(self, row):
+        return {field: row[field] for field in self.requested_field_names}
+
+
+class FastBarSerializer(ValuesSerializer):
+    field_names = ("id", "name")
+
+
+class FastBrewerySerializer(ValuesSerializer):
+    field_names = ("id", "name", "location")
+
+
+# A beer id that can't appear anywhere else in a beer's URL
+URL_PLACEHOLDER = 987654321987654321
+
+
+class FastUserSerializer(ValuesSerializer):
+    """Serializes rows from ``user_rows()``."""
+
+    field_names = (
+        "id", "username", "email", "starred_beers", "rated_beers")
+
+    def beer_url(self):
+        if not hasattr(self, "_beer_url"):
+            url = reverse(
+                "beer-detail",
+                kwargs={"pk": URL_PLACEHOLDER},
+                request=self.context.get("request"),
+                format=self.context.get("format"),
+            )
+            prefix, _, suffix = url.rpartition(str(URL_PLACEHOLDER))
+            self._beer_url = prefix + "{}" + suffix
+        return self._beer_url
+
+    def to_representation(self, row):
+        data = super().to_representation(row)
+        url = self.beer_url()
+        for field in ["starred_beers", "rated_beers"]:
+            if field in data:
+                data[field] = [url.format(beer_id) for beer_id in data[field]]
+        return data
+
+
+def user_rows(users):
+    """Return a row for ``FastUserSerializer`` for each of ``users``.
+
+    Makes two queries however many users there are. Beers are listed in
+    their default ordering, like the ``starred_beers`` and ``rated_beers``
+    managers.
+    """
+    rows = {
+        user.pk: {
+            "id": user.pk, "username": user.username, "email": user.email,
+            "starred_beers": [], "rated_beers": [],
+        }
+        for user in users
+    }
+    for field, relation in [
+        ("starred_beers", "starred_by"), ("rated_beers", "rated_by")
+    ]:
+        beers = Beer.objects.filter(
+            **{f"{relation}__in": list(rows)}
+        ).values_list(relation, "pk")
+        for user_id, beer_id in beers:
+            rows[user_id][field].append(beer_id)
+    return list(rows.values())
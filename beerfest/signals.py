@@ -0,0 +1,35 @@
+from django.db import transaction
+from django.db.models.signals import post_delete, post_save
+from django.dispatch import receiver
+
+from . import snapshot
+from .models import Bar, Beer, BeerRating, Brewery, StarBeer
+from .user_state import bump_user_state_version
+from .versions import bump_catalogue_version
+
+
+@receiver(post_save, sender=Beer)
+@receiver(post_delete, sender=Beer)
+@receiver(post_save, sender=Bar)
+@receiver(post_delete, sender=Bar)
+@receiver(post_save, sender=Brewery)
+@receiver(post_delete, sender=Brewery)
+def catalogue_changed(sender, **kwargs):
+    # Once now and again on commit, so nothing cached from a read made before
+    # the change was visible outlives it
+    bump_catalogue_version()
+    transaction.on_commit(bump_catalogue_version)
+    transaction.on_commit(snapshot.schedule_build)
+
+
+@receiver(post_save, sender=StarBeer)
+@receiver(post_delete, sender=StarBeer)
+@receiver(post_save, sender=BeerRating)
+@receiver(post_delete, sender=BeerRating)
+def user_state_changed(sender, instance, **kwargs):
+    # Stars and ratings edited in the admin or a shell. Taps write with
+    # bulk_create(), which sends no post_save, so the views bump the
+    # version themselves with user_state.user_state_changed().
+    user_id = instance.user_id
+    bump_user_state_version(user_id)
+    transaction.on_commit(lambda: bump_user_state_version(user_id))
@@ -0,0 +1,196 @@
+import atexit
+import gzip
+import hashlib
+import json
+import os
+import tempfile
+import threading
+
+from django.conf import settings
+from django.core.serializers.json import DjangoJSONEncoder
+from django.db import connection
+
+from . import export
+
+try:
+    import brotli
+except ImportError:
+    brotli = None
+
+
+# The whole catalogue written out as a static JSON file named after a hash
+# of its contents, alongside .gz and .br copies, so a front proxy can serve
+# it (eg with nginx's gzip_static/brotli_static) without touching Django.
+# POINTER_NAME names the current snapshot; old ones are kept for a while for
+# clients that fetched the pointer just before a rebuild.
+
+POINTER_NAME = "catalogue.current.json"
+SNAPSHOT_PREFIX = "catalogue."
+SNAPSHOT_SUFFIX = ".json"
+
+
+def get_directory():
+    return getattr(settings, "BEERFEST_SNAPSHOT_DIR", None)
+
+
+def is_auto_build_enabled():
+    return bool(get_directory()) and getattr(
+        settings, "BEERFEST_SNAPSHOT_AUTO_BUILD", False)
+
+
+def get_url(name):
+    return getattr(settings, "BEERFEST_SNAPSHOT_URL", "/snapshots/") + name
+
+
+def render_catalogue(chunk_size=2000):
+    columns, rows = export.DATASETS["beers"]
+    beers = [dict(zip(columns, row)) for row in rows(chunk_size)]
+    return json.dumps(
+        {"beers": beers}, cls=DjangoJSONEncoder, separators=(",", ":"),
+        sort_keys=True,
+    ).encode()
+
+
+def write_file(path, content):
+    # Written under a temporary name and renamed into place, so the proxy
+    # never serves a partial file
+    directory = os.path.dirname(path)
+    fd, tmp_path = tempfile.mkstemp(dir=directory, prefix=".tmp-")
+    try:
+        with os.fdopen(fd, "wb") as f:
+            f.write(content)
+        os.chmod(tmp_path, 0o644)
+        os.replace(tmp_path, path)
+    except BaseException:
+        os.unlink(tmp_path)
+        raise
+
+
+def build_snapshot(directory, keep=5):
+    """Write the current catalogue snapshot to ``directory``.
+
+    Returns ``(digest, created)``; ``created`` is False when a snapshot with
+    the same contents already existed. Only the ``keep`` most recent
+    snapshots are kept.
+    """
+    os.makedirs(directory, exist_ok=True)
+    content = render_catalogue()
+    digest = hashlib.sha256(content).hexdigest()[:20]
+    name = f"{SNAPSHOT_PREFIX}{digest}{SNAPSHOT_SUFFIX}"
+    path = os.path.join(directory, name)
+
+    created = not os.path.exists(path)
+    if created:
+        # mtime=0 keeps the gzip output the same for the same content
+        write_file(path + ".gz", gzip.compress(content, 9, mtime=0))
+        if brotli is not None:
+            write_file(path + ".br", brotli.compress(content))
+        write_file(path, content)
+    else:
+        # Refresh the mtime so pruning keeps it
+        os.utime(path)
+
+    write_file(
+        os.path.join(directory, POINTER_NAME),
+        json.dumps({"hash": digest, "name": name}).encode(),
+    )
+    prune(directory, keep)
+    return digest, created
+
+
+def snapshot_names(directory):
+    names = [
+        name for name in os.listdir(directory)
+        if name.startswith(SNAPSHOT_PREFIX)
+        and name.endswith(SNAPSHOT_SUFFIX)
+        and name != POINTER_NAME
+    ]
+    return sorted(
+        names,
+        key=lambda name: os.path.getmtime(os.path.join(directory, name)),
+        reverse=True,
+    )
+
+
+def prune(directory, keep):
+    for name in snapshot_names(directory)[keep:]:
+        for suffix in ["", ".gz", ".br"]:
+            try:
+                os.unlink(os.path.join(directory, name + suffix))
+            except FileNotFoundError:
+                pass
+
+
+def current_snapshot(directory):
+    try:
+        with open(os.path.join(directory, POINTER_NAME), "rb") as f:
+            return json.load(f)
+    except FileNotFoundError:
+        return None
+
+
+_lock = threading.Lock()
+_timer = None
+
+
+def run_scheduled_build():
+    global _timer
+    with _lock:
+        _timer = None
+    try:
+        build_snapshot(get_directory())
+    finally:
+        connection.close()
+
+
+def schedule_build():
+    """Rebuild the snapshot in the background after a catalogue change.
+
+    Only does anything if BEERFEST_SNAPSHOT_DIR is set and
+    BEERFEST_SNAPSHOT_AUTO_BUILD is on. Builds are delayed by
+    BEERFEST_SNAPSHOT_DELAY seconds so a burst of changes, like an import,
+    costs one build. A process that exits before the timer fires, like a
+    shell, runs the build on its way out.
+    """
+    global _timer
+    if not is_auto_build_enabled():
+        return
+    with _lock:
+        if _timer is not None:
+            return
+        _timer = threading.Timer(
+            getattr(settings, "BEERFEST_SNAPSHOT_DELAY", 10),
+            run_scheduled_build,
+        )
+        _timer.daemon = True
+        _timer.start()
+
+
+def cancel_scheduled_build():
+    """Cancel a scheduled build; return whether one was waiting."""
+    global _timer
+    with _lock:
+        timer, _timer = _timer, None
+    if timer is None:
+        return False
+    timer.cancel()
+    return True
+
+
+def build_now():
+    """Rebuild the snapshot in this thread, replacing any scheduled build.
+
+    For management commands, which exit long before a scheduled build would
+    run. Only does anything if auto-building is on, as for schedule_build().
+    """
+    if not is_auto_build_enabled():
+        return
+    cancel_scheduled_build()
+    build_snapshot(get_directory())
+
+
+@atexit.register
+def flush_scheduled_build():
+    # The timer's thread is a daemon, so it would be killed at exit
+    if cancel_scheduled_build():
+        build_snapshot(get_directory())
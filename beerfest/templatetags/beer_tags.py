@@ -1,6 +1,16 @@
+import copy
+import hashlib
+
 from django import template
+from django.conf import settings
+from django.contrib.auth.models import AnonymousUser
+from django.core.cache import cache
+from django.template.loader import render_to_string
+from django.utils.safestring import mark_safe
 
 from beerfest.models import StarBeer
+from beerfest.user_state import get_user_state
+from beerfest.versions import catalogue_version
 
 
 register = template.Library()
@@ -22,11 +32,25 @@ def abv(value):
     return f"{value:.1f}%"
 
 
-@register.simple_tag
-def user_starred_beer(user_id, beer_id):
-    return StarBeer.objects.filter(
-        user__id=user_id, beer__id=beer_id
-    ).exists()
+def starred_beer_ids(context, user_id):
+    # Loaded once per template render, so a table of beers checks a set
+    # rather than running a query per row
+    key = ("beerfest:starred_beer_ids", user_id)
+    if key not in context.render_context:
+        context.render_context[key] = set(
+            StarBeer.objects.filter(
+                user__id=user_id
+            ).values_list("beer_id", flat=True)
+        )
+    return context.render_context[key]
+
+
+@register.simple_tag(takes_context=True)
+def user_starred_beer(context, user_id, beer_id):
+    # An anonymous user's id is None, or "" when looked up in a template
+    if not user_id:
+        return False
+    return beer_id in starred_beer_ids(context, user_id)
 
 
 @register.inclusion_tag("beerfest/beer_list_table.html")
@@ -57,3 +81,57 @@ def display_beer_table_with_stars_and_ratings(beer_list, user):
         "show_stars": True,
         "show_ratings": True,
     }
+
+
+def without_user_state(beer):
+    beer = copy.copy(beer)
+    beer.starred = None
+    beer.rating = None
+    return beer
+
+
+@register.simple_tag
+def shared_beer_table(beer_list, show_stars=False, show_ratings=False):
+    """Render beer_list_table.html without any user's stars or ratings.
+
+    The HTML is cached per catalogue version and shared by every user, who
+    gets their own state from ``user_beer_state`` instead. Stats that change
+    without a catalogue change, like ``num_stars``, can be up to
+    BEERFEST_BEER_TABLE_TIMEOUT seconds old.
+    """
+    beers = list(beer_list)
+    ids = ",".join(str(beer.pk) for beer in beers)
+    key = "beerfest:beer_table:{}:{:d}{:d}:{}".format(
+        catalogue_version(), show_stars, show_ratings,
+        hashlib.md5(ids.encode()).hexdigest(),
+    )
+    html = cache.get(key)
+    if html is None:
+        html = render_to_string("beerfest/beer_list_table.html", {
+            "beer_list": [without_user_state(beer) for beer in beers],
+            "user": AnonymousUser(),
+            "show_stars": show_stars,
+            "show_ratings": show_ratings,
+        })
+        timeout = getattr(settings, "BEERFEST_BEER_TABLE_TIMEOUT", 60)
+        cache.set(key, html, timeout)
+    return mark_safe(html)
+
+
+@register.simple_tag
+def user_beer_state(beer_list, user):
+    """Return the user's stars and ratings for the beers in ``beer_list``.
+
+    Only beers the user has starred or rated are included, as
+    ``{beer_id: {"starred": ..., "rating": ...}}``, ready for ``json_script``
+    to overlay on a ``shared_beer_table``.
+    """
+    if user is None or not user.is_authenticated:
+        return {}
+    state = get_user_state(user)
+    overlay = {}
+    for beer in beer_list:
+        if beer.pk in state:
+            starred, rating = state[beer.pk]
+            overlay[beer.pk] = {"starred": starred, "rating": rating}
+    return overlay
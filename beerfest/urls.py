@@ -7,16 +7,26 @@ import beerfest.views
 router = routers.SimpleRouter()
 router.register("bars", beerfest.views.BarViewSet)
 router.register("breweries", beerfest.views.BreweryViewSet)
+# beer-list and beer-detail are taken by the HTML views
+router.register(
+    "api/beers", beerfest.views.BeerViewSet, basename="api-beer")
 
 urlpatterns = [
     path('', beerfest.views.IndexView.as_view(), name='index'),
     path('beers/', beerfest.views.BeerListView.as_view(), name='beer-list'),
+    path('beers/batch/',
+         beerfest.views.BeerBatchView.as_view(), name='beer-batch'),
     path('beers/<int:pk>/',
          beerfest.views.BeerDetailView.as_view(), name='beer-detail'),
     path('beers/<int:pk>/star/',
          beerfest.views.StarBeerView.as_view(), name='beer-star'),
     path('beers/<int:pk>/rating/',
          beerfest.views.BeerRatingView.as_view(), name='beer-rating'),
+    path('export/<slug:dataset>.<slug:format>',
+         beerfest.views.ExportView.as_view(), name='export'),
+    path('catalogue/snapshot/',
+         beerfest.views.CatalogueSnapshotView.as_view(),
+         name='catalogue-snapshot'),
 ]
 
 urlpatterns += router.urls
@@ -0,0 +1,93 @@
+from django.conf import settings
+from django.core.cache import cache
+from django.db import transaction
+
+from .models import BeerRating, StarBeer
+from .versions import bump_version, get_version
+
+
+# Each user's stars and ratings are cached as {beer_id: (starred, rating)}
+# so the beer list and detail pages don't have to join against StarBeer and
+# BeerRating on every request.
+#
+# Each user also has a version, kept under its own key and bumped with an
+# atomic increment, which the star, rating and batch views do through
+# user_state_changed(). The state is cached along with the version it was
+# loaded under and reloaded once the version moves on, so the cache is never
+# patched in place: concurrent writes can't lose each other's changes, and
+# a state loaded while a write was committing is never used after the
+# write's bump. Every version is only ever issued for one state, so it can
+# go into ETags. Anything else that writes StarBeer or BeerRating rows (the
+# admin, the shell) is only picked up once the entry expires after
+# BEERFEST_USER_STATE_TIMEOUT seconds.
+
+NOT_STARRED_OR_RATED = (False, None)
+
+
+def cache_key(user_id):
+    return f"beerfest:user_state:{user_id}"
+
+
+def version_key(user_id):
+    return f"beerfest:user_state_version:{user_id}"
+
+
+def get_timeout():
+    return getattr(settings, "BEERFEST_USER_STATE_TIMEOUT", 3600)
+
+
+def load_user_state(user_id):
+    state = {}
+    starred = StarBeer.objects.filter(
+        user=user_id
+    ).order_by().values_list("beer", flat=True)
+    for beer_id in starred:
+        state[beer_id] = (True, None)
+    ratings = BeerRating.objects.filter(
+        user=user_id
+    ).order_by().values_list("beer", "rating")
+    for beer_id, rating in ratings:
+        state[beer_id] = (beer_id in state, rating)
+    return state
+
+
+def user_state_version(user):
+    return get_version(version_key(user.pk))
+
+
+def get_user_state(user):
+    # The version is read before the state is loaded, so a write that
+    # commits in between leaves this copy behind an older version
+    version = user_state_version(user)
+    versioned = cache.get(cache_key(user.pk))
+    if versioned is None or versioned[0] != version:
+        versioned = (version, load_user_state(user.pk))
+        cache.set(cache_key(user.pk), versioned, get_timeout())
+    return versioned[1]
+
+
+def bump_user_state_version(user_id):
+    bump_version(version_key(user_id))
+
+
+def user_state_changed(user):
+    """Mark the user's cached state as stale after they star or rate beers.
+
+    Bumps the version now and again on commit, like
+    signals.catalogue_changed, so a state loaded before the write was
+    visible isn't used after it.
+    """
+    user_id = user.pk
+    bump_user_state_version(user_id)
+    transaction.on_commit(lambda: bump_user_state_version(user_id))
+
+
+def starred_beer_ids(state):
+    return {beer_id for beer_id, (starred, _) in state.items() if starred}
+
+
+def apply_user_state(beers, state):
+    """Set ``starred`` and ``rating`` on each of ``beers`` from ``state``."""
+    for beer in beers:
+        beer.starred, beer.rating = state.get(beer.pk, NOT_STARRED_OR_RATED)
+    return beers
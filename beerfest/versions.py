@@ -0,0 +1,64 @@
+import time
+
+from django.conf import settings
+from django.core.cache import cache
+
+
+# The catalogue version changes whenever a bar, brewery or beer does, so
+# anything derived from the catalogue can be cached under a key that includes
+# it and never needs invalidating. Versions start from the clock so that one
+# evicted from the cache isn't reissued for different data.
+
+CATALOGUE_VERSION_KEY = "beerfest:catalogue_version"
+
+
+def initial_version():
+    return time.time_ns() // 1000
+
+
+def get_version(key, timeout=None):
+    version = cache.get(key)
+    if version is None:
+        cache.add(key, initial_version(), timeout)
+        version = cache.get(key)
+    return version
+
+
+def bump_version(key, timeout=None):
+    try:
+        return cache.incr(key)
+    except ValueError:
+        version = initial_version()
+        cache.set(key, version, timeout)
+        return version
+
+
+def catalogue_version():
+    return get_version(CATALOGUE_VERSION_KEY)
+
+
+def bump_catalogue_version():
+    return bump_version(CATALOGUE_VERSION_KEY)
+
+
+def beer_version_key(beer_id):
+    return f"beerfest:beer_version:{beer_id}"
+
+
+def beer_version(beer_id):
+    """Return a version for one beer's stars and ratings."""
+    return get_version(beer_version_key(beer_id))
+
+
+def bump_beer_version(*beer_ids):
+    for beer_id in beer_ids:
+        bump_version(beer_version_key(beer_id))
+
+
+def stats_version():
+    """Return a version that changes every BEERFEST_STATS_MAX_AGE seconds.
+
+    Beer stats change with every star and rating, far too often to version,
+    so anything showing them is allowed to be this old.
+    """
+    return int(time.time() // getattr(settings, "BEERFEST_STATS_MAX_AGE", 60))
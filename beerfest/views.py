@@ -1,160 +1,633 @@
 import json
 
 from django.contrib.auth import get_user_model
-from django.contrib.auth.mixins import LoginRequiredMixin
+from django.contrib.auth.models import AnonymousUser
+from django.contrib.auth.mixins import LoginRequiredMixin, UserPassesTestMixin
+from django.core.exceptions import PermissionDenied
 from django.forms import ModelForm
-from django.http import HttpResponse
-from django.db.models.expressions import Exists, OuterRef, Subquery
+from django.http import (
+    Http404, HttpResponse, JsonResponse, StreamingHttpResponse
+)
+from django.db import router, transaction
+from django.db.models import Case, When
+from django.db.models.expressions import F
+from django.utils.cache import get_conditional_response
+from django.utils.http import quote_etag
 from django.views.generic import RedirectView, DetailView, ListView, View
-from django.views.generic.detail import SingleObjectMixin
 
 from rest_framework import viewsets
+from rest_framework.decorators import action
+from rest_framework.exceptions import NotAcceptable
 from rest_framework.generics import RetrieveAPIView
 from rest_framework.permissions import (
-    DjangoModelPermissionsOrAnonReadOnly, IsAuthenticated
+    SAFE_METHODS, DjangoModelPermissionsOrAnonReadOnly, IsAuthenticated
 )
+from rest_framework.response import Response
+from rest_framework.views import APIView
 
-from .models import Bar, Brewery, Beer, StarBeer, BeerRating
-from .serializers import BarSerializer, BrewerySerializer, UserSerializer
+from . import catalogue, export, facets, frozen, page_cache, snapshot
+from .models import (
+    Bar, Brewery, Beer, StarBeer, BeerRating, is_valid_id, lock_beers
+)
+from .pagination import (
+    BEER_KEYSET, BeerCursorPagination, InvalidToken, KeysetPage
+)
+from .permissions import ReadOnlyWhenFrozen
+from .renderers import compact_renderer_classes
+from .search import search as search_beers, search_records
+from .user_state import (
+    apply_user_state, get_user_state, starred_beer_ids, user_state_changed,
+    user_state_version,
+)
+from .serializers import (
+    BarSerializer, BrewerySerializer, BeerSerializer, FastBarSerializer,
+    FastBrewerySerializer, FastUserSerializer, requested_fields, user_rows,
+)
+from .versions import bump_beer_version, catalogue_version, stats_version
 
 
 User = get_user_model()
 
 
-class IndexView(RedirectView):
-    pattern_name = "beer-list"
+# While the festival is frozen, beers and users' stars and ratings are read
+# from the frozen festival's files rather than the database
 
+def get_beer_records():
+    if frozen.is_frozen():
+        return frozen.get_festival().get_catalogue().beers
+    return catalogue.get_catalogue().beers
 
-class NewUserProfileView(LoginRequiredMixin, RetrieveAPIView):
-    serializer_class = UserSerializer
-    permission_classes = [IsAuthenticated]
 
-    def get_object(self):
-        return self.request.user
+def read_user_state(user):
+    if frozen.is_frozen():
+        return frozen.get_festival().get_user_state(user)
+    return get_user_state(user)
+
+
+def get_facet_index():
+    if frozen.is_frozen():
+        return frozen.get_festival().get_index()
+    return None
+
+
+def get_profile_beers(user):
+    """The beers ``user`` has starred or rated, with their state."""
+    if frozen.is_frozen():
+        return frozen.get_festival().get_profile_beers(user)
+    return Beer.objects.starred_or_rated_by(user).select_related(
+        "bar", "brewery"
+    ).with_user_state(user)
+
+
+def get_frozen_beer(pk):
+    try:
+        beer = frozen.get_festival().get_beer(int(pk))
+    except ValueError:
+        beer = None
+    if beer is None:
+        raise Http404
+    return beer
+
+
+class IndexView(RedirectView):
+    pattern_name = "beer-list"
 
 
 class UserProfileView(LoginRequiredMixin, DetailView):
     model = User
     context_object_name = "user"
     template_name = "beerfest/user_profile.html"
+    paginate_by = 100
+    page_kwarg = "cursor"
+    keyset = BEER_KEYSET
 
     def get_object(self):
         return self.request.user
 
+    def get_beers(self):
+        return get_profile_beers(self.request.user)
+
     def get_context_data(self, **kwargs):
         context_data = super().get_context_data(**kwargs)
 
-        starred_beers = Beer.objects.filter(
-            starbeer__user=self.request.user
-        ).distinct().select_related("bar", "brewery")
-        context_data["starred_beers"] = starred_beers
+        # The user's starred and rated beers come from one query, a page
+        # at a time, like BeerListView's
+        token = self.request.GET.get(self.page_kwarg)
+        try:
+            beers, next_token, previous_token = self.keyset.paginate(
+                self.get_beers(), self.paginate_by, token)
+        except InvalidToken:
+            raise Http404("Invalid cursor")
+        page = KeysetPage(beers, next_token, previous_token)
+
+        context_data["beer_list"] = beers
+        context_data["page_obj"] = page
+        context_data["is_paginated"] = page.has_other_pages()
+        context_data["starred_beers"] = [
+            beer for beer in beers if beer.starred
+        ]
+        context_data["rated_beers"] = [
+            beer for beer in beers if beer.rating is not None
+        ]
+        return context_data
+
 
-        rating = BeerRating.objects.filter(
-            user=self.request.user,
-            beer=OuterRef("pk")
-        )[:1].values("rating")
+class CatalogueETagMixin:
+    """Tag GET responses with the versions of the data they're built from.
+
+    A request whose If-None-Match matches is answered with a 304 before the
+    view runs, so no queries are made. Views showing beer stats or the
+    user's stars and ratings set ``etag_user_state``; their tags also change
+    with the user's version and every BEERFEST_STATS_MAX_AGE seconds. REST
+    API views add the format their content negotiation picks, as each
+    format is a different representation.
+    """
+    etag_user_state = False
+
+    def get_etag_format(self, request):
+        """Return the format the response will be rendered in, if chosen by
+        content negotiation, or raise NotAcceptable if there is none."""
+        if not isinstance(self, APIView):
+            return None
+        # As APIView.initial() does before negotiating
+        self.format_kwarg = self.get_format_suffix(**self.kwargs)
+        renderer, _ = self.perform_content_negotiation(
+            self.initialize_request(request))
+        return renderer.format
+
+    def get_etag(self, request):
+        try:
+            fmt = self.get_etag_format(request)
+        except NotAcceptable:
+            return None
+        if frozen.is_frozen():
+            parts = self.get_frozen_etag_parts(request)
+        else:
+            parts = self.get_etag_parts(request)
+        if fmt is not None:
+            parts.append(fmt)
+        return quote_etag("-".join(str(part) for part in parts))
+
+    def get_etag_parts(self, request):
+        parts = [catalogue_version()]
+        if self.etag_user_state:
+            user = getattr(request, "user", None)
+            if user is not None and user.is_authenticated:
+                parts.append(user_state_version(user))
+            else:
+                parts.append("anon")
+            parts.append(stats_version())
+        return parts
+
+    def get_frozen_etag_parts(self, request):
+        # Only the user can change what a frozen page shows
+        parts = ["frozen", frozen.get_festival().version]
+        if self.etag_user_state:
+            user = getattr(request, "user", None)
+            if user is not None and user.is_authenticated:
+                parts.append(user.pk)
+            else:
+                parts.append("anon")
+        return parts
+
+    def dispatch(self, request, *args, **kwargs):
+        if request.method not in ("GET", "HEAD"):
+            return super().dispatch(request, *args, **kwargs)
+
+        etag = self.get_etag(request)
+        if etag is None:
+            # The view answers 406 Not Acceptable
+            return super().dispatch(request, *args, **kwargs)
+        response = get_conditional_response(request, etag=etag)
+        if response is None:
+            response = super().dispatch(request, *args, **kwargs)
+            if response.status_code == 200 and not response.has_header("ETag"):
+                response["ETag"] = etag
+        return response
+
+
+class AnonymousPageCacheMixin:
+    """Serve anonymous GETs from the page cache, if it is turned on.
+
+    Set BEERFEST_ANONYMOUS_PAGE_CACHE to enable it. Pages are cached under
+    ``get_page_cache_key()``, which should include the versions of
+    everything the page shows, and hits and misses are counted under
+    ``page_cache_name``.
+    """
+    page_cache_name = None
+
+    def get_page_cache_key(self, request, *args, **kwargs):
+        raise NotImplementedError
+
+    def dispatch(self, request, *args, **kwargs):
+        user = getattr(request, "user", None)
+        if (
+            request.method != "GET"
+            or not page_cache.is_enabled()
+            or (user is not None and user.is_authenticated)
+        ):
+            return super().dispatch(request, *args, **kwargs)
+
+        key = self.get_page_cache_key(request, *args, **kwargs)
+        response = page_cache.get_page(key)
+        if response is not None:
+            page_cache.count(self.page_cache_name, "hits")
+            return response
+
+        page_cache.count(self.page_cache_name, "misses")
+        response = super().dispatch(request, *args, **kwargs)
+        if getattr(response, "is_rendered", True):
+            self.cache_page(key, request, response)
+        else:
+            # Whether the page used a CSRF token is only known once rendered
+            response.add_post_render_callback(
+                lambda response: self.cache_page(key, request, response))
+        return response
 
-        rated_beers = Beer.objects.filter(
-            beer_rating__user=self.request.user
-        ).distinct().select_related("bar", "brewery")
-        rated_beers = rated_beers.annotate(rating=Subquery(rating))
-        context_data["rated_beers"] = rated_beers
+    def cache_page(self, key, request, response):
+        if page_cache.is_shareable(request, response):
+            page_cache.set_page(key, response)
 
-        return context_data
 
+class FrozenReadOnlyMixin:
+    """Turn a view that writes off while the festival is frozen."""
 
-class BarViewSet(viewsets.ModelViewSet):
+    def dispatch(self, request, *args, **kwargs):
+        if frozen.is_frozen():
+            raise PermissionDenied("The festival is closed")
+        return super().dispatch(request, *args, **kwargs)
+
+
+class NewUserProfileView(
+    LoginRequiredMixin, CatalogueETagMixin, RetrieveAPIView
+):
+    """The user's starred and rated beers, as links.
+
+    Passing ``cursor`` or ``page_size`` pages through the beers in the beer
+    list's order, adding ``next`` and ``previous`` links.
+    """
+    serializer_class = FastUserSerializer
+    permission_classes = [IsAuthenticated]
+    pagination_class = BeerCursorPagination
+    etag_user_state = True
+
+    def get_etag_parts(self, request):
+        # Shows no stats, and every write of the user's stars and ratings
+        # bumps their version, so unlike the beer pages it needn't expire
+        return [catalogue_version(), user_state_version(request.user)]
+
+    def is_paginated(self):
+        params = self.request.query_params
+        return (
+            self.paginator.cursor_query_param in params
+            or self.paginator.page_size_query_param in params
+        )
+
+    def get_object(self):
+        user = self.request.user
+        if not self.is_paginated() and not frozen.is_frozen():
+            return user_rows([user])[0]
+
+        beers = get_profile_beers(user)
+        if self.is_paginated():
+            beers = self.paginate_queryset(beers)
+        return {
+            "id": user.pk, "username": user.username, "email": user.email,
+            "starred_beers": [beer.pk for beer in beers if beer.starred],
+            "rated_beers": [
+                beer.pk for beer in beers if beer.rating is not None],
+        }
+
+    def retrieve(self, request, *args, **kwargs):
+        data = self.get_serializer(self.get_object()).data
+        if self.is_paginated():
+            data["next"] = self.paginator.get_link(self.paginator.next_token)
+            data["previous"] = self.paginator.get_link(
+                self.paginator.previous_token)
+        return Response(data)
+
+
+class CompactRenderersMixin:
+    """Also offer the compact encodings from ``renderers``."""
+
+    def get_renderers(self):
+        return super().get_renderers() + [
+            renderer() for renderer in compact_renderer_classes()
+        ]
+
+
+class IdLookupMixin:
+    """Answer 404 for detail routes with ids no row can have.
+
+    Some databases can't compare a key with an integer that large, and
+    DRF's get_object_or_404() doesn't catch the OverflowError.
+    """
+
+    def get_object(self):
+        try:
+            pk = int(self.kwargs[self.lookup_url_kwarg or self.lookup_field])
+        except ValueError:
+            raise Http404
+        if not is_valid_id(pk):
+            raise Http404
+        return super().get_object()
+
+
+class ValuesReadMixin:
+    """Serve list and retrieve from values() rows with a fast serializer."""
+    fast_serializer_class = None
+
+    def is_fast_action(self):
+        return self.action in ("list", "retrieve")
+
+    def get_queryset(self):
+        qs = super().get_queryset()
+        if self.is_fast_action():
+            fields = requested_fields(
+                self.request, self.fast_serializer_class.field_names)
+            qs = qs.values(*fields or ["id"])
+        return qs
+
+    def get_serializer_class(self):
+        if self.is_fast_action():
+            return self.fast_serializer_class
+        return super().get_serializer_class()
+
+
+class BarViewSet(
+    CatalogueETagMixin, CompactRenderersMixin, IdLookupMixin,
+    ValuesReadMixin, viewsets.ModelViewSet,
+):
     queryset = Bar.objects.all()
     serializer_class = BarSerializer
-    permission_classes = [DjangoModelPermissionsOrAnonReadOnly]
+    fast_serializer_class = FastBarSerializer
+    permission_classes = [
+        ReadOnlyWhenFrozen, DjangoModelPermissionsOrAnonReadOnly]
 
 
-class BreweryViewSet(viewsets.ModelViewSet):
+class BreweryViewSet(
+    CatalogueETagMixin, CompactRenderersMixin, IdLookupMixin,
+    ValuesReadMixin, viewsets.ModelViewSet,
+):
     queryset = Brewery.objects.all()
     serializer_class = BrewerySerializer
-    permission_classes = [DjangoModelPermissionsOrAnonReadOnly]
+    fast_serializer_class = FastBrewerySerializer
+    permission_classes = [
+        ReadOnlyWhenFrozen, DjangoModelPermissionsOrAnonReadOnly]
+
+
+# The columns each of BeerSerializer's fields is read from, besides the
+# keyset's, which are always loaded for pagination
+BEER_FIELD_COLUMNS = {
+    "bar": ["bar__name"],
+    "brewery": ["brewery", "brewery__name", "brewery__location"],
+    "reserved": ["reserved"],
+    "abv": ["abv"],
+    "tasting_notes": ["tasting_notes"],
+    "notes": ["notes"],
+    "num_stars": ["num_stars"],
+    "num_ratings": ["num_ratings"],
+}
+
+
+class BeerViewSet(
+    CompactRenderersMixin, IdLookupMixin, viewsets.ModelViewSet,
+):
+    queryset = Beer.objects.all()
+    serializer_class = BeerSerializer
+    permission_classes = [
+        ReadOnlyWhenFrozen, DjangoModelPermissionsOrAnonReadOnly]
+    pagination_class = BeerCursorPagination
+    search_limit = 50
 
+    def get_queryset(self):
+        user = self.request.user
+        qs = super().get_queryset()
+        self.selected_facets = facets.selected_facets(
+            self.request.query_params, user)
+        qs = facets.filter_beers(qs, self.selected_facets, user)
+        if self.request.method not in SAFE_METHODS:
+            return qs.select_related(
+                "bar", "brewery").with_stats().with_user_state(user)
+        return self.select_fields(qs, user)
+
+    def select_fields(self, qs, user):
+        # Reads only select what the requested fields need
+        fields = requested_fields(self.request, BeerSerializer.Meta.fields)
+        columns = [field for field, _ in BEER_KEYSET.fields]
+        for field in fields:
+            columns.extend(BEER_FIELD_COLUMNS.get(field, []))
+        qs = qs.only(*columns)
+        for related in ["bar", "brewery"]:
+            if related in fields:
+                qs = qs.select_related(related)
+        if "avg_rating" in fields:
+            qs = qs.with_stats()
+        if "starred" in fields or "rating" in fields:
+            qs = qs.with_user_state(user)
+        return qs
+
+    def list(self, request, *args, **kwargs):
+        if frozen.is_frozen() or catalogue.is_enabled():
+            return self.list_records(request)
+        response = super().list(request, *args, **kwargs)
+        response.data["facets"] = facets.facet_counts(
+            self.selected_facets, request.user)
+        return response
+
+    def list_records(self, request):
+        # Served from the in-process catalogue (or the frozen festival) and
+        # the cached user state, without touching the database
+        user = request.user
+        selected = facets.selected_facets(request.query_params, user)
+        state = read_user_state(user) if user.is_authenticated else {}
+        starred_ids = starred_beer_ids(state)
+        records = get_beer_records().filter(
+            facets.record_filter(selected, starred_ids))
+        page = self.paginate_queryset(records)
+        if user.is_authenticated:
+            apply_user_state(page, state)
+        serializer = self.get_serializer(page, many=True)
+        response = self.get_paginated_response(serializer.data)
+        response.data["facets"] = facets.facet_counts(
+            selected, user, starred_ids=starred_ids,
+            index=get_facet_index(),
+        )
+        return response
+
+    def retrieve(self, request, *args, **kwargs):
+        if not frozen.is_frozen():
+            return super().retrieve(request, *args, **kwargs)
+        beer = get_frozen_beer(kwargs["pk"])
+        if request.user.is_authenticated:
+            apply_user_state([beer], read_user_state(request.user))
+        return Response(self.get_serializer(beer).data)
+
+    @action(detail=False)
+    def search(self, request):
+        # Ranked results can't be resumed from a keyset cursor, so only the
+        # best matches are returned
+        query = request.query_params.get("q", "")
+        if frozen.is_frozen():
+            beers = search_records(get_beer_records(), query)
+            beers = beers[:self.search_limit]
+            if request.user.is_authenticated:
+                apply_user_state(beers, read_user_state(request.user))
+        else:
+            beers = search_beers(self.get_queryset(), query)
+            beers = beers[:self.search_limit]
+        serializer = self.get_serializer(beers, many=True)
+        return Response({"results": serializer.data})
 
-class BeerListView(ListView):
+
+class BeerListView(CatalogueETagMixin, AnonymousPageCacheMixin, ListView):
     model = Beer
+    # Named explicitly, as the beers may be catalogue records
+    context_object_name = "beer_list"
+    template_name = "beerfest/beer_list.html"
+    paginate_by = 100
+    page_kwarg = "cursor"
+    keyset = BEER_KEYSET
+    etag_user_state = True
+    page_cache_name = "list"
+
+    def get_page_cache_key(self, request, *args, **kwargs):
+        return page_cache.list_key(request)
+
+    def paginate_queryset(self, queryset, page_size):
+        if self.query:
+            rows = list(queryset[:page_size])
+            page = KeysetPage(rows, None, None)
+            return (None, page, self.add_user_state(rows), False)
+
+        # Seek past the sort tuple in the cursor rather than using OFFSET,
+        # so every page costs the same and beers added between requests
+        # don't shift the pages. There is no Paginator; page_obj is a
+        # KeysetPage with next_token and previous_token.
+        token = self.request.GET.get(self.page_kwarg)
+        try:
+            rows, next_token, previous_token = self.keyset.paginate(
+                queryset, page_size, token)
+        except InvalidToken:
+            raise Http404("Invalid cursor")
+        page = KeysetPage(rows, next_token, previous_token)
+        return (None, page, self.add_user_state(rows), page.has_other_pages())
+
+    def add_user_state(self, rows):
+        user = getattr(self.request, "user", None)
+        if user is not None and user.is_authenticated:
+            apply_user_state(rows, read_user_state(user))
+        return rows
 
     def get_queryset(self):
         user = getattr(self.request, "user", None)
+        self.selected_facets = facets.selected_facets(self.request.GET, user)
+        self.query = self.request.GET.get("q", "").strip()
+        self.starred_ids = None
+        if frozen.is_frozen() or (catalogue.is_enabled() and not self.query):
+            return self.get_records(user)
+
         qs = super().get_queryset().select_related(
             "bar", "brewery"
         )
-        if user is not None and user.is_authenticated:
-            star_beer = StarBeer.objects.filter(
-                user=user.pk,
-                beer=OuterRef("pk")
-            )
-            qs = qs.annotate(starred=Exists(star_beer))
+        qs = facets.filter_beers(qs, self.selected_facets, user)
+        if self.query:
+            qs = search_beers(qs, self.query)
         return qs
 
+    def get_records(self, user):
+        # Served from the in-process catalogue rather than the database;
+        # searches only do so when frozen
+        if user is not None and user.is_authenticated:
+            self.starred_ids = starred_beer_ids(read_user_state(user))
+        records = get_beer_records().filter(
+            facets.record_filter(
+                self.selected_facets, self.starred_ids or set()))
+        if self.query:
+            return search_records(records, self.query)
+        return records
+
+    def get_context_data(self, **kwargs):
+        context_data = super().get_context_data(**kwargs)
+        context_data["query"] = self.query
+
+        # Counts within the search results but ignoring the facet filters,
+        # which facet_counts applies itself
+        matches = None
+        if self.query and frozen.is_frozen():
+            matches = [
+                beer.pk
+                for beer in search_records(get_beer_records(), self.query)
+            ]
+        elif self.query:
+            matches = search_beers(
+                Beer.objects.all(), self.query
+            ).order_by().values_list("pk", flat=True)
+        context_data["facets"] = facets.facet_counts(
+            self.selected_facets, getattr(self.request, "user", None),
+            restrict=matches, starred_ids=self.starred_ids,
+            index=get_facet_index(),
+        )
+        return context_data
+
 
-class BeerDetailView(DetailView):
+class BeerDetailView(CatalogueETagMixin, AnonymousPageCacheMixin,
+                     DetailView):
     model = Beer
+    context_object_name = "beer"
+    etag_user_state = True
+    page_cache_name = "detail"
+
+    def get_page_cache_key(self, request, *args, **kwargs):
+        return page_cache.detail_key(kwargs["pk"])
+
+    def get_queryset(self):
+        # The beer, its bar and brewery, its average rating and the user's
+        # star and rating in one query
+        user = getattr(self.request, "user", AnonymousUser())
+        return super().get_queryset().select_related(
+            "bar", "brewery"
+        ).with_stats().with_user_state(user)
+
+    def get_object(self, queryset=None):
+        if not frozen.is_frozen():
+            return super().get_object(queryset)
+        user = getattr(self.request, "user", None)
+        beer = get_frozen_beer(self.kwargs["pk"])
+        if user is not None and user.is_authenticated:
+            apply_user_state([beer], read_user_state(user))
+        return beer
 
     def get_context_data(self, **kwargs):
         user = getattr(self.request, "user", None)
         context_data = super().get_context_data(**kwargs)
 
-        num_stars = StarBeer.objects.filter(beer=self.object).count()
-        context_data["num_stars"] = num_stars
-
-        ratings = list(
-            BeerRating.objects.filter(
-                beer=self.object
-            ).values_list("rating", flat=True)
-        )
-        num_ratings = len(ratings)
-        if num_ratings > 0:
-            avg_rating = sum(ratings) / len(ratings)
-        else:
-            avg_rating = None
-        context_data["avg_rating"] = avg_rating
-
+        context_data["num_stars"] = self.object.num_stars
+        context_data["avg_rating"] = self.object.avg_rating
         if user is not None and user.is_authenticated:
-            starred = StarBeer.objects.filter(
-                user=user, beer=self.object
-            ).exists()
-            context_data["starred"] = starred
-            try:
-                rating = BeerRating.objects.get(
-                    user=user, beer=self.object
-                ).rating
-            except BeerRating.DoesNotExist:
-                rating = None
-            context_data["rating"] = rating
+            context_data["starred"] = self.object.starred
+            context_data["rating"] = self.object.rating
 
         return context_data
 
 
-class StarBeerView(LoginRequiredMixin, SingleObjectMixin, View):
+class StarBeerView(FrozenReadOnlyMixin, LoginRequiredMixin, View):
     model = StarBeer
     http_method_names = ['delete', 'put']
     raise_exception = True  # raise 403 for unauthenticated users
 
-    def get_object(self):
-        return super().get_object(queryset=Beer.objects.all())
-
     def delete(self, request, *args, **kwargs):
-        beer = self.get_object()
-        try:
-            obj = self.model.objects.get(
-                user=self.request.user, beer=beer
-            )
-        except self.model.DoesNotExist:
-            pass
-        else:
-            obj.delete()
+        if not self.model.objects.unstar(request.user, self.kwargs["pk"]):
+            raise Http404
+        beers_changed(self.kwargs["pk"])
+        user_state_changed(request.user)
         return HttpResponse(status=204)
 
     def put(self, request, *args, **kwargs):
-        beer = self.get_object()
-        self.object = self.model.objects.get_or_create(
-            user=self.request.user, beer=beer
-        )
+        if not self.model.objects.star(request.user, self.kwargs["pk"]):
+            raise Http404
+        beers_changed(self.kwargs["pk"])
+        user_state_changed(request.user)
         return HttpResponse(status=204)
 
 
@@ -164,35 +637,233 @@ class RatingForm(ModelForm):
         fields = ["rating"]
 
 
-class BeerRatingView(LoginRequiredMixin, SingleObjectMixin, View):
+class BeerRatingView(FrozenReadOnlyMixin, LoginRequiredMixin, View):
     model = BeerRating
     http_method_names = ['delete', 'put']
     raise_exception = True  # raise 403 for unauthenticated users
 
-    def get_object(self):
-        return super().get_object(queryset=Beer.objects.all())
-
     def delete(self, request, *args, **kwargs):
-        beer = self.get_object()
-        try:
-            obj = self.model.objects.get(
-                user=self.request.user, beer=beer
-            )
-        except self.model.DoesNotExist:
-            pass
-        else:
-            obj.delete()
+        if not self.model.objects.unrate(request.user, self.kwargs["pk"]):
+            raise Http404
+        beers_changed(self.kwargs["pk"])
+        user_state_changed(request.user)
         return HttpResponse(status=204)
 
     def put(self, request, *args, **kwargs):
-        beer = self.get_object()
         body = json.loads(request.body)
         form = RatingForm(body)
 
         if form.is_valid():
-            self.model.objects.update_or_create(
-                user=request.user, beer=beer, defaults=form.cleaned_data)
-
+            rating = form.cleaned_data["rating"]
+            found = self.model.objects.rate(
+                request.user, self.kwargs["pk"], rating)
+            if not found:
+                raise Http404
+            beers_changed(self.kwargs["pk"])
+            user_state_changed(request.user)
             return HttpResponse(status=204)
         else:
             return HttpResponse(status=400)
+
+
+def beers_changed(*beer_ids):
+    # Once now and again on commit, like signals.catalogue_changed, so
+    # nothing cached from a read made before the change was visible outlives
+    # it when the request runs in a transaction
+    bump_beer_version(*beer_ids)
+    transaction.on_commit(lambda: bump_beer_version(*beer_ids))
+
+
+def stats_delta(field, deltas):
+    whens = [When(pk=pk, then=delta) for pk, delta in deltas.items() if delta]
+    if not whens:
+        return F(field)
+    return F(field) + Case(*whens, default=0)
+
+
+class BeerBatchView(FrozenReadOnlyMixin, LoginRequiredMixin, View):
+    """Apply a list of queued star/unstar/rate/unrate operations at once.
+
+    The body is a JSON list of ``{"beer": <id>, "action": <action>}``
+    objects, with a ``"rating"`` for ``rate``. Operations are applied in
+    order within one transaction, so a later operation on the same beer wins.
+    The response reports the status each operation would have got from
+    StarBeerView or BeerRatingView.
+    """
+    http_method_names = ['post']
+    raise_exception = True  # raise 403 for unauthenticated users
+    max_operations = 500
+
+    def post(self, request, *args, **kwargs):
+        try:
+            operations = json.loads(request.body)
+        except ValueError:
+            return HttpResponse(status=400)
+        if not isinstance(operations, list):
+            return HttpResponse(status=400)
+        if len(operations) > self.max_operations:
+            return HttpResponse(status=400)
+
+        validated = [self.validate(operation) for operation in operations]
+        beer_ids = {
+            result["beer"] for result, _ in validated
+            if result["status"] == 204
+        }
+
+        with transaction.atomic(using=router.db_for_write(Beer)):
+            # Lock the beers before reading the user's stars and ratings of
+            # them, as Beer.star() and friends do, so the counter deltas
+            # worked out in apply() can't be based on stale link rows.
+            existing = lock_beers(beer_ids)
+
+            stars = {}
+            ratings = {}
+            for result, rating in validated:
+                if result["status"] != 204:
+                    continue
+                if result["beer"] not in existing:
+                    result["status"] = 404
+                elif result["action"] in ("star", "unstar"):
+                    stars[result["beer"]] = result["action"] == "star"
+                else:
+                    ratings[result["beer"]] = rating
+
+            if stars or ratings:
+                self.apply(request.user, stars, ratings)
+
+        if stars or ratings:
+            beers_changed(*(set(stars) | set(ratings)))
+            user_state_changed(request.user)
+
+        return JsonResponse({"results": [result for result, _ in validated]})
+
+    def validate(self, operation):
+        if not isinstance(operation, dict):
+            return {"status": 400}, None
+
+        beer = operation.get("beer")
+        action = operation.get("action")
+        result = {"beer": beer, "action": action, "status": 204}
+
+        if not is_valid_id(beer):
+            result["status"] = 400
+        elif action not in ("star", "unstar", "rate", "unrate"):
+            result["status"] = 400
+        elif action == "rate":
+            form = RatingForm({"rating": operation.get("rating")})
+            if form.is_valid():
+                return result, form.cleaned_data["rating"]
+            result["status"] = 400
+            result["errors"] = {
+                field: list(messages)
+                for field, messages in form.errors.items()
+            }
+        return result, None
+
+    def apply(self, user, stars, ratings):
+        """Write the stars and ratings in the transaction locking the beers."""
+        starred = set(
+            StarBeer.objects.select_for_update().filter(
+                user=user, beer__in=stars
+            ).values_list("beer", flat=True)
+        )
+        rated = dict(
+            BeerRating.objects.select_for_update().filter(
+                user=user, beer__in=ratings
+            ).values_list("beer", "rating")
+        )
+
+        to_star = [
+            pk for pk, star in stars.items() if star and pk not in starred
+        ]
+        to_unstar = [
+            pk for pk, star in stars.items() if not star and pk in starred
+        ]
+        to_rate = {
+            pk: rating for pk, rating in ratings.items()
+            if rating is not None and rated.get(pk) != rating
+        }
+        to_unrate = [
+            pk for pk, rating in ratings.items()
+            if rating is None and pk in rated
+        ]
+
+        if to_star:
+            StarBeer.objects.bulk_create(
+                [StarBeer(user=user, beer_id=pk) for pk in to_star],
+                ignore_conflicts=True,
+            )
+        if to_unstar:
+            StarBeer.objects.filter(
+                user=user, beer__in=to_unstar).delete()
+        if to_rate:
+            BeerRating.objects.bulk_create(
+                [
+                    BeerRating(user=user, beer_id=pk, rating=rating)
+                    for pk, rating in to_rate.items()
+                ],
+                update_conflicts=True,
+                unique_fields=["user", "beer"],
+                update_fields=["rating"],
+            )
+        if to_unrate:
+            BeerRating.objects.filter(
+                user=user, beer__in=to_unrate).delete()
+
+        num_stars = dict.fromkeys(to_star, 1)
+        num_stars.update(dict.fromkeys(to_unstar, -1))
+        num_ratings = {pk: 1 for pk in to_rate if pk not in rated}
+        num_ratings.update(dict.fromkeys(to_unrate, -1))
+        rating_sum = {
+            pk: rating - rated.get(pk, 0)
+            for pk, rating in to_rate.items()
+        }
+        rating_sum.update({pk: -rated[pk] for pk in to_unrate})
+
+        changed = set(num_stars) | set(num_ratings) | set(rating_sum)
+        if changed:
+            Beer.objects.filter(pk__in=changed).update(
+                num_stars=stats_delta("num_stars", num_stars),
+                num_ratings=stats_delta("num_ratings", num_ratings),
+                rating_sum=stats_delta("rating_sum", rating_sum),
+            )
+
+
+class ExportView(LoginRequiredMixin, UserPassesTestMixin, View):
+    http_method_names = ['get']
+    raise_exception = True  # raise 403 for unauthenticated users
+    chunk_size = 2000
+
+    def test_func(self):
+        return self.request.user.is_staff
+
+    def get(self, request, *args, **kwargs):
+        dataset = self.kwargs["dataset"]
+        fmt = self.kwargs["format"]
+        if dataset not in export.DATASETS or fmt not in export.FORMATS:
+            raise Http404
+
+        response = StreamingHttpResponse(
+            export.export(dataset, fmt, self.chunk_size),
+            content_type=export.FORMATS[fmt][0],
+        )
+        response["Content-Disposition"] = (
+            f'attachment; filename="{dataset}.{fmt}"')
+        return response
+
+
+class CatalogueSnapshotView(View):
+    """Point clients at the current static catalogue snapshot."""
+    http_method_names = ['get']
+
+    def get(self, request, *args, **kwargs):
+        directory = snapshot.get_directory()
+        current = directory and snapshot.current_snapshot(directory)
+        if not current:
+            raise Http404
+        response = JsonResponse({
+            "hash": current["hash"],
+            "url": snapshot.get_url(current["name"]),
+        })
+        response["Cache-Control"] = "no-cache"
+        return response
@@ -13,20 +13,27 @@ setuptools.setup(
     long_description_content_type="text/x-rst",
     url="https://github.com/remarkablerocket/beerfest",
     packages=setuptools.find_packages(),
+    python_requires=">=3.8",
     install_requires=[
-        "django>=2.1",
+        "django>=4.1",
         "djangorestframework>=3.10",
     ],
+    extras_require={
+        "brotli": ["brotli"],
+        "msgpack": ["msgpack"],
+    },
     classifiers=[
         "Development Status :: 3 - Alpha",
         "Framework :: Django",
-        "Framework :: Django :: 2.1",
+        "Framework :: Django :: 4.2",
         "Inteded Audience :: Developers",
         "License :: OSI Approved :: MIT License",
         "Natural Language :: English",
         "Operating System :: OS Independent",
         "Programming Language :: Python :: 3",
-        "Programming Language :: Python :: 3.6",
+        "Programming Language :: Python :: 3.8",
+        "Programming Language :: Python :: 3.9",
+        "Programming Language :: Python :: 3.10",
         "Topic :: Internet :: WWW/HTTP",
         "Topic :: Internet :: WWW/HTTP :: Dynamic Content",
     ],
@@ -0,0 +1,43 @@
+import threading
+
+from django.db import connections
+from django.test import TransactionTestCase, override_settings
+
+
+class ConcurrentDatabaseRouter:
+    """Send every query to the file-backed ``concurrent`` database."""
+
+    def db_for_read(self, model, **hints):
+        return "concurrent"
+
+    def db_for_write(self, model, **hints):
+        return "concurrent"
+
+
+@override_settings(DATABASE_ROUTERS=[ConcurrentDatabaseRouter()])
+class ConcurrentTestCase(TransactionTestCase):
+    """Run code in several threads, each with its own connection."""
+    databases = {"default", "concurrent"}
+
+    def run_concurrently(self, target, count=16):
+        """Call ``target(n)`` in ``count`` threads at once; return errors."""
+        barrier = threading.Barrier(count)
+        errors = []
+
+        def run(n):
+            try:
+                barrier.wait()
+                target(n)
+            except Exception as error:
+                errors.append(error)
+            finally:
+                connections.close_all()
+
+        threads = [
+            threading.Thread(target=run, args=(n,)) for n in range(count)
+        ]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        return errors
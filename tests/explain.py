@@ -0,0 +1,38 @@
+import re
+
+from django.db import connection
+
+
+SQLITE_SCAN = re.compile(r"\bSCAN (?:TABLE )?(\S+)(?: AS \S+)?$", re.MULTILINE)
+POSTGRES_SCAN = re.compile(r"\bSeq Scan on (\S+)")
+
+
+class QueryPlanMixin:
+    """Assertions about the plans the database chooses for querysets.
+
+    Supports SQLite and PostgreSQL. On PostgreSQL sequential scans are
+    discouraged while explaining, as the planner prefers them for the tiny
+    tables used in tests.
+    """
+
+    def explain(self, queryset):
+        if connection.vendor == "postgresql":
+            with connection.cursor() as cursor:
+                cursor.execute("SET enable_seqscan = off")
+                try:
+                    return queryset.explain()
+                finally:
+                    cursor.execute("RESET enable_seqscan")
+        return queryset.explain()
+
+    def full_table_scans(self, plan):
+        if connection.vendor == "postgresql":
+            return POSTGRES_SCAN.findall(plan)
+        return SQLITE_SCAN.findall(plan)
+
+    def assertNoFullTableScan(self, queryset):
+        plan = self.explain(queryset)
+        scans = self.full_table_scans(plan)
+        if scans:
+            self.fail(
+                "Full table scan of {}:\n{}".format(", ".join(scans), plan))
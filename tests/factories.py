@@ -1,4 +1,5 @@
 from django.contrib.auth.models import User
+from django.db.models import F
 
 from beerfest import models
 
@@ -17,9 +18,13 @@ def create_brewery(name="Test Brew Co", location="Testville", nbeers=0):
 
     if nbeers > 0:
         bar = create_bar()
-
-    for n in range(nbeers):
-        create_beer(name=f"Test Beer {n}", brewery=brewery, bar=bar)
+        models.Beer.objects.bulk_create([
+            models.Beer(
+                name=f"Test Beer {n}", brewery=brewery,
+                brewery_name=brewery.name, bar=bar,
+            )
+            for n in range(nbeers)
+        ])
 
     return brewery
 
@@ -63,7 +68,11 @@ def star_beer(user=None, beer=None):
     if beer is None:
         beer = create_beer()
 
-    return models.StarBeer.objects.create(user=user, beer=beer)
+    star = models.StarBeer.objects.create(user=user, beer=beer)
+    # Mirror the star view so the denormalised stats stay in sync
+    models.Beer.objects.filter(pk=beer.pk).update(num_stars=F("num_stars") + 1)
+    beer.refresh_from_db(fields=["num_stars"])
+    return star
 
 
 def rate_beer(user=None, beer=None, rating=3):
@@ -73,5 +82,12 @@ def rate_beer(user=None, beer=None, rating=3):
     if beer is None:
         beer = create_beer()
 
-    return models.BeerRating.objects.create(user=user, beer=beer,
-                                            rating=rating)
+    beer_rating = models.BeerRating.objects.create(user=user, beer=beer,
+                                                   rating=rating)
+    # Mirror the rating view so the denormalised stats stay in sync
+    models.Beer.objects.filter(pk=beer.pk).update(
+        num_ratings=F("num_ratings") + 1,
+        rating_sum=F("rating_sum") + rating,
+    )
+    beer.refresh_from_db(fields=["num_ratings", "rating_sum"])
+    return beer_rating
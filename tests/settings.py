@@ -1,5 +1,7 @@
 #!/usr/bin/python
 # -*- coding: utf-8 -*-
+import os
+import tempfile
 
 DEBUG = True
 USE_TZ = True
@@ -10,7 +12,21 @@ DATABASES = {
     "default": {
         "ENGINE": "django.db.backends.sqlite3",
         "NAME": ":memory:",
-    }
+    },
+    # A file database for tests where several connections write at once,
+    # which an in-memory database can't be shared between
+    "concurrent": {
+        "ENGINE": "django.db.backends.sqlite3",
+        "NAME": os.path.join(tempfile.gettempdir(), "beerfest_concurrent"),
+        "OPTIONS": {"timeout": 5},
+        "TEST": {
+            "NAME": os.path.join(
+                tempfile.gettempdir(), "test_beerfest_concurrent"),
+            "DEPENDENCIES": [],
+            # The data migrations only run against the default database
+            "MIGRATE": False,
+        },
+    },
 }
 
 ROOT_URLCONF = "tests.urls"
@@ -0,0 +1,104 @@
+from django.core.cache import cache
+from django.test import TestCase
+
+from beerfest import catalogue, facets
+from beerfest.models import Beer
+from beerfest.pagination import BEER_KEYSET, InvalidToken
+from tests import factories
+
+
+class TestCatalogue(TestCase):
+    def setUp(self):
+        cache.clear()
+        catalogue._catalogue = None
+        bar1 = factories.create_bar()
+        bar2 = factories.create_bar("Test Bar 2")
+        brewery1 = factories.create_brewery()
+        brewery2 = factories.create_brewery("Another Brew Co")
+        factories.create_beer(bar=bar1, brewery=brewery1, name="Mild")
+        factories.create_beer(
+            bar=bar1, brewery=brewery1, name="IPA", number=2)
+        factories.create_beer(
+            bar=bar1, brewery=brewery2, name="Stout", number=1)
+        factories.create_beer(
+            bar=bar2, brewery=brewery1, name="Porter", abv="4.5")
+        factories.create_beer(
+            bar=bar2, brewery=brewery1, name="Bitter", abv="3.8")
+
+    def pages(self, records, page_size, token=None):
+        """Yield each page's names and the tokens either side of it."""
+        while True:
+            rows, next_token, previous_token = BEER_KEYSET.paginate(
+                records, page_size, token)
+            yield [row.name for row in rows], next_token, previous_token
+            if next_token is None:
+                return
+            token = next_token
+
+    def test_is_built_once_per_version(self):
+        with self.assertNumQueries(1):
+            built = catalogue.get_catalogue()
+        with self.assertNumQueries(0):
+            self.assertIs(catalogue.get_catalogue(), built)
+
+    def test_is_rebuilt_when_catalogue_changes(self):
+        built = catalogue.get_catalogue()
+        Beer.objects.filter(name="Mild").get().delete()
+
+        rebuilt = catalogue.get_catalogue()
+
+        self.assertIsNot(rebuilt, built)
+        self.assertNotIn("Mild", [beer.name for beer in rebuilt.beers])
+
+    def test_order_matches_database(self):
+        records = catalogue.get_catalogue().beers
+
+        self.assertEqual(
+            [beer.name for beer in records],
+            list(Beer.objects.values_list("name", flat=True)),
+        )
+
+    def test_pages_match_database_keyset(self):
+        records = catalogue.get_catalogue().beers
+
+        self.assertEqual(
+            list(self.pages(records, 2)),
+            list(self.pages(Beer.objects.all(), 2)),
+        )
+
+    def test_previous_page(self):
+        records = catalogue.get_catalogue().beers
+        _, next_token, _ = BEER_KEYSET.paginate(records, 2)
+        _, _, previous_token = BEER_KEYSET.paginate(records, 2, next_token)
+
+        rows, next_token, previous_token = BEER_KEYSET.paginate(
+            records, 2, previous_token)
+
+        self.assertEqual([row.name for row in rows], ["Stout", "IPA"])
+        self.assertIsNotNone(next_token)
+        self.assertIsNone(previous_token)
+
+    def test_invalid_position_raises_invalid_token(self):
+        records = catalogue.get_catalogue().beers
+        token = BEER_KEYSET.encode(["bar", "brewery", None, "name", "id"])
+
+        with self.assertRaises(InvalidToken):
+            BEER_KEYSET.paginate(records, 2, token)
+
+    def test_pages_are_copies(self):
+        records = catalogue.get_catalogue().beers
+        rows, _, _ = BEER_KEYSET.paginate(records, 2)
+        rows[0].starred = True
+
+        self.assertIsNone(catalogue.get_catalogue().get(rows[0].id).starred)
+
+    def test_filter_matches_filter_beers(self):
+        selected = {"bar": {2}, "abv": {"session"}}
+        records = catalogue.get_catalogue().beers.filter(
+            facets.record_filter(selected))
+
+        self.assertEqual(
+            [beer.id for beer in records],
+            [beer.id for beer in facets.filter_beers(
+                Beer.objects.all(), selected)],
+        )
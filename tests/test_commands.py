@@ -0,0 +1,351 @@
+import json
+import os
+import tempfile
+from decimal import Decimal
+from io import StringIO
+
+from django.core.management import call_command
+from django.core.cache import cache
+from django.core.management.base import CommandError
+from django.test import TestCase, override_settings
+
+from beerfest import frozen, page_cache, snapshot
+from beerfest.models import Bar, Brewery, Beer, StarBeer
+from beerfest.versions import catalogue_version
+from tests import factories
+
+
+class TestRecountBeerStatsCommand(TestCase):
+    def setUp(self):
+        self.user = factories.create_user()
+        self.beer = factories.create_beer()
+        factories.star_beer(user=self.user, beer=self.beer)
+        factories.rate_beer(user=self.user, beer=self.beer, rating=4)
+
+    def call_command(self, *args):
+        out = StringIO()
+        call_command("recount_beer_stats", *args, stdout=out)
+        return out.getvalue()
+
+    def test_no_drift(self):
+        output = self.call_command()
+        self.assertIn("No drift found", output)
+
+    def test_fixes_drift(self):
+        StarBeer.objects.all().delete()
+
+        output = self.call_command()
+        self.beer.refresh_from_db()
+
+        self.assertIn("Beer 1: stars 1 != 0", output)
+        self.assertIn("Recounted 1 beer(s)", output)
+        self.assertEqual(self.beer.num_stars, 0)
+        self.assertEqual(self.beer.num_ratings, 1)
+        self.assertEqual(self.beer.rating_sum, 4)
+
+    def test_check_reports_drift_without_fixing(self):
+        Beer.objects.update(rating_sum=10)
+
+        with self.assertRaisesMessage(CommandError, "1 beer(s)"):
+            self.call_command("--check")
+
+        self.beer.refresh_from_db()
+        self.assertEqual(self.beer.rating_sum, 10)
+
+
+class TestImportFestivalCommand(TestCase):
+    csv_header = (
+        "bar,brewery,brewery_location,name,number,reserved,abv,"
+        "tasting_notes,notes\n"
+    )
+
+    def write_file(self, suffix, content):
+        fd, path = tempfile.mkstemp(suffix=suffix)
+        with os.fdopen(fd, "w") as f:
+            f.write(content)
+        self.addCleanup(os.remove, path)
+        return path
+
+    def call_command(self, *args):
+        out = StringIO()
+        call_command("import_festival", *args, stdout=out)
+        return out.getvalue()
+
+    def test_imports_csv(self):
+        path = self.write_file(".csv", self.csv_header + (
+            "Main Bar,Test Brew Co,Testville,Test IPA,1,yes,4.5,Hoppy,\n"
+            "Main Bar,Test Brew Co,Testville,Test Mild,,,,,N/A\n"
+            "Cider Bar,Other Brew Co,Test Town,Test Stout,2,no,6.0,,\n"
+        ))
+
+        output = self.call_command(path)
+
+        self.assertIn("Imported 3 rows", output)
+        self.assertCountEqual(
+            Bar.objects.values_list("name", flat=True),
+            ["Main Bar", "Cider Bar"],
+        )
+        self.assertEqual(
+            Brewery.objects.get(name="Other Brew Co").location, "Test Town")
+        ipa = Beer.objects.get(name="Test IPA")
+        self.assertEqual(ipa.bar.name, "Main Bar")
+        self.assertEqual(ipa.brewery_name, "Test Brew Co")
+        self.assertEqual(ipa.number, 1)
+        self.assertTrue(ipa.reserved)
+        self.assertEqual(ipa.abv, Decimal("4.5"))
+        self.assertEqual(ipa.tasting_notes, "Hoppy")
+        mild = Beer.objects.get(name="Test Mild")
+        self.assertIsNone(mild.number)
+        self.assertIsNone(mild.abv)
+        self.assertFalse(mild.reserved)
+        self.assertEqual(mild.notes, "N/A")
+
+    def test_builds_snapshot_before_exiting(self):
+        tmp = tempfile.TemporaryDirectory()
+        self.addCleanup(tmp.cleanup)
+        path = self.write_file(".csv", self.csv_header + (
+            "Main Bar,Test Brew Co,Testville,Test IPA,1,yes,4.5,Hoppy,\n"
+        ))
+
+        with override_settings(
+            BEERFEST_SNAPSHOT_DIR=tmp.name,
+            BEERFEST_SNAPSHOT_AUTO_BUILD=True,
+        ):
+            self.call_command(path)
+
+        self.assertIsNotNone(snapshot.current_snapshot(tmp.name))
+
+    def test_imports_ndjson_in_batches(self):
+        rows = [
+            {"bar": "Main Bar", "brewery": "Test Brew Co",
+             "name": f"Test Beer {n}", "number": n, "abv": 4.2}
+            for n in range(5)
+        ]
+        path = self.write_file(
+            ".ndjson", "\n".join(json.dumps(row) for row in rows))
+
+        output = self.call_command(path, "--batch-size", "2")
+
+        self.assertIn("Processed 2 rows", output)
+        self.assertIn("Processed 4 rows", output)
+        self.assertIn("Processed 5 rows", output)
+        self.assertEqual(Beer.objects.count(), 5)
+        self.assertEqual(Beer.objects.get(number=3).abv, Decimal("4.2"))
+
+    def test_existing_beers_ignored_by_default(self):
+        beer = factories.create_beer(
+            name="Test IPA", number=1, abv="4.0",
+            bar=factories.create_bar("Main Bar"))
+        path = self.write_file(".csv", self.csv_header + (
+            "Main Bar,Test Brew Co,Testville,Test IPA,1,,5.0,,\n"
+            "Main Bar,Test Brew Co,Testville,Test IPA,1,,5.5,,\n"
+            "Main Bar,Test Brew Co,Testville,Test IPA,,,5.0,,\n"
+        ))
+
+        self.call_command(path)
+        self.call_command(path)
+
+        beer.refresh_from_db()
+        self.assertEqual(beer.abv, Decimal("4.0"))
+        self.assertEqual(Beer.objects.count(), 2)
+
+    def test_update_existing_beers(self):
+        beer = factories.create_beer(
+            name="Test IPA", number=1, abv="4.0",
+            bar=factories.create_bar("Main Bar"))
+        unnumbered = factories.create_beer(
+            name="Test Mild", bar=factories.create_bar("Main Bar"))
+        path = self.write_file(".csv", self.csv_header + (
+            "Main Bar,Test Brew Co,Testville,Test IPA,1,,5.0,,\n"
+            "Main Bar,Test Brew Co,Testville,Test Mild,,yes,3.5,,\n"
+        ))
+
+        self.call_command(path, "--update")
+
+        beer.refresh_from_db()
+        unnumbered.refresh_from_db()
+        self.assertEqual(beer.abv, Decimal("5.0"))
+        self.assertTrue(unnumbered.reserved)
+        self.assertEqual(unnumbered.abv, Decimal("3.5"))
+        self.assertEqual(Beer.objects.count(), 2)
+
+    def test_invalid_row_raises_error(self):
+        path = self.write_file(".csv", self.csv_header + (
+            "Main Bar,Test Brew Co,Testville,Test IPA,1,,100,,\n"
+        ))
+
+        with self.assertRaisesMessage(CommandError, "Row 1: invalid abv"):
+            self.call_command(path)
+
+    def test_invalid_json_raises_error(self):
+        path = self.write_file(".ndjson", (
+            '{"bar": "Main Bar", "brewery": "Test Brew Co", "name": "IPA"}\n'
+            '{"bar": "Main Bar", "brewery":\n'
+        ))
+
+        with self.assertRaisesMessage(CommandError, "Row 2: invalid JSON"):
+            self.call_command(path)
+
+    def test_ndjson_row_must_be_an_object(self):
+        path = self.write_file(".ndjson", '["Main Bar"]\n')
+
+        with self.assertRaisesMessage(
+                CommandError, "Row 1: expected an object"):
+            self.call_command(path)
+
+    def test_failed_import_bumps_version_of_committed_batches(self):
+        version = catalogue_version()
+        path = self.write_file(".csv", self.csv_header + (
+            "Main Bar,Test Brew Co,Testville,Test IPA,1,,4.5,,\n"
+            "Main Bar,Test Brew Co,Testville,Test Mild,2,,100,,\n"
+        ))
+
+        with self.assertRaisesMessage(CommandError, "Row 2: invalid abv"):
+            self.call_command(path, "--batch-size", "1")
+
+        self.assertTrue(Beer.objects.filter(name="Test IPA").exists())
+        self.assertNotEqual(catalogue_version(), version)
+
+    def test_unknown_format_raises_error(self):
+        path = self.write_file(".txt", "")
+
+        with self.assertRaisesMessage(CommandError, "--format"):
+            self.call_command(path)
+
+
+class TestExportFestivalCommand(TestCase):
+    def setUp(self):
+        self.user = factories.create_user()
+        self.beer = factories.create_beer(abv="4.5", number=3)
+        factories.star_beer(user=self.user, beer=self.beer)
+        factories.rate_beer(user=self.user, beer=self.beer, rating=4)
+
+    def call_command(self, *args):
+        out = StringIO()
+        call_command("export_festival", *args, stdout=out)
+        return out.getvalue()
+
+    def test_exports_beers_as_csv(self):
+        output = self.call_command("beers")
+
+        self.assertEqual(output, (
+            "id,bar,brewery,name,number,reserved,abv,tasting_notes,notes,"
+            "num_stars,num_ratings,avg_rating\r\n"
+            "1,Test Bar,Test Brew Co,Test IPA,3,False,4.5,,,1,1,4.0\r\n"
+        ))
+
+    def test_exports_ratings_as_ndjson(self):
+        output = self.call_command("ratings", "--format", "ndjson")
+
+        self.assertEqual(
+            [json.loads(line) for line in output.splitlines()],
+            [{"beer_id": 1, "user_id": 1, "rating": 4}],
+        )
+
+    def test_exports_to_file(self):
+        fd, path = tempfile.mkstemp(suffix=".ndjson")
+        os.close(fd)
+        self.addCleanup(os.remove, path)
+
+        self.call_command("beers", "--format", "ndjson", "--output", path)
+
+        with open(path) as f:
+            beer = json.loads(f.readline())
+        self.assertEqual(beer["abv"], "4.5")
+        self.assertEqual(beer["avg_rating"], 4.0)
+
+
+class TestPageCacheStatsCommand(TestCase):
+    def setUp(self):
+        cache.clear()
+
+    def test_shows_and_resets_counters(self):
+        page_cache.count("list", "hits")
+        page_cache.count("list", "hits")
+        page_cache.count("list", "misses")
+        out = StringIO()
+
+        call_command("page_cache_stats", "--reset", stdout=out)
+
+        self.assertEqual(out.getvalue(), (
+            "list: 2 hits, 1 misses (hit ratio 66.7%)\n"
+            "detail: 0 hits, 0 misses (hit ratio n/a)\n"
+            "Counters reset\n"
+        ))
+        self.assertEqual(
+            page_cache.counters(["list"]),
+            {"list": {"hits": 0, "misses": 0}},
+        )
+
+
+class TestBuildCatalogueSnapshotCommand(TestCase):
+    def setUp(self):
+        tmp = tempfile.TemporaryDirectory()
+        self.addCleanup(tmp.cleanup)
+        self.directory = tmp.name
+        factories.create_beer()
+
+    def call_command(self, *args):
+        out = StringIO()
+        call_command("build_catalogue_snapshot", *args, stdout=out)
+        return out.getvalue()
+
+    def test_builds_snapshot(self):
+        output = self.call_command("--directory", self.directory)
+        digest = snapshot.current_snapshot(self.directory)["hash"]
+
+        self.assertIn(f"Wrote snapshot {digest}", output)
+        self.assertIn(
+            f"Snapshot {digest} is up to date",
+            self.call_command("--directory", self.directory),
+        )
+
+    def test_requires_directory(self):
+        with self.assertRaises(CommandError):
+            self.call_command()
+
+
+class TestFreezeFestivalCommand(TestCase):
+    def setUp(self):
+        tmp = tempfile.TemporaryDirectory()
+        self.addCleanup(tmp.cleanup)
+        self.directory = tmp.name
+        self.beer = factories.create_beer()
+        factories.star_beer(user=factories.create_user(), beer=self.beer)
+
+    def test_freezes_festival(self):
+        out = StringIO()
+        call_command("freeze_festival", "--directory", self.directory,
+                     stdout=out)
+
+        self.assertIn("Froze 1 beers and 1 users'", out.getvalue())
+        self.assertEqual(
+            len(frozen.Table(self.directory, frozen.BEERS)), 1)
+
+    def test_requires_directory(self):
+        with self.assertRaises(CommandError):
+            call_command("freeze_festival", stdout=StringIO())
+
+
+class TestBenchmarkSerializersCommand(TestCase):
+    def setUp(self):
+        user = factories.create_user()
+        beer = factories.create_beer()
+        factories.star_beer(user, beer)
+        factories.rate_beer(user, beer)
+
+    def test_reports_throughput(self):
+        out = StringIO()
+
+        call_command("benchmark_serializers", "--repeat", "1", stdout=out)
+
+        lines = out.getvalue().splitlines()
+        self.assertEqual(
+            [line.split(":")[0] for line in lines],
+            ["bars", "breweries", "users"],
+        )
+        self.assertTrue(lines[2].startswith("users: 1 rows, "))
+
+    def test_repeat_must_be_positive(self):
+        with self.assertRaisesMessage(CommandError, "--repeat"):
+            call_command("benchmark_serializers", "--repeat", "0")
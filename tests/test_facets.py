@@ -0,0 +1,153 @@
+from decimal import Decimal
+
+from django.contrib.auth.models import AnonymousUser
+from django.core.cache import cache
+from django.http import QueryDict
+from django.test import TestCase
+
+from beerfest import facets
+from beerfest.models import Beer
+from tests import factories
+
+
+def counts(facet_counts, name):
+    return {facet["value"]: facet["count"] for facet in facet_counts[name]}
+
+
+class TestFacets(TestCase):
+    def setUp(self):
+        cache.clear()
+        self.user = factories.create_user()
+        self.bar1 = factories.create_bar()
+        self.bar2 = factories.create_bar("Test Bar 2")
+        self.brewery1 = factories.create_brewery()
+        self.brewery2 = factories.create_brewery("Another Brew Co")
+        self.mild = factories.create_beer(
+            bar=self.bar1, brewery=self.brewery1, name="Mild", abv="3.6")
+        self.ipa = factories.create_beer(
+            bar=self.bar1, brewery=self.brewery2, name="IPA", abv="5.6",
+            reserved=True,
+        )
+        self.stout = factories.create_beer(
+            bar=self.bar2, brewery=self.brewery2, name="Stout", abv="9.0")
+        self.porter = factories.create_beer(
+            bar=self.bar2, brewery=self.brewery1, name="Porter")
+
+    def test_abv_band(self):
+        self.assertEqual(facets.abv_band(None), "unknown")
+        self.assertEqual(facets.abv_band(Decimal("3.9")), "session")
+        self.assertEqual(facets.abv_band(Decimal("4.0")), "standard")
+        self.assertEqual(facets.abv_band(Decimal("5.5")), "strong")
+        self.assertEqual(facets.abv_band(Decimal("12.0")), "extra-strong")
+
+    def test_selected_facets_ignores_invalid_values(self):
+        params = QueryDict(
+            "bar=1&bar=x&abv=strong&abv=huge&reserved=maybe&starred=1")
+
+        self.assertEqual(
+            facets.selected_facets(params, self.user),
+            {"bar": {1}, "abv": {"strong"}, "starred": {True}},
+        )
+        self.assertEqual(
+            facets.selected_facets(params, AnonymousUser()),
+            {"bar": {1}, "abv": {"strong"}},
+        )
+
+    def test_selected_facets_ignores_ids_out_of_range(self):
+        params = QueryDict(
+            "bar=2&bar=99999999999999999999999&bar=0&brewery=-1")
+
+        self.assertEqual(
+            facets.selected_facets(params), {"bar": {2}})
+
+    def test_filter_beers(self):
+        selected = {
+            "brewery": {self.brewery2.pk}, "abv": {"strong", "unknown"},
+        }
+
+        self.assertEqual(
+            list(facets.filter_beers(Beer.objects.all(), selected)),
+            [self.ipa],
+        )
+
+    def test_counts_without_selection(self):
+        result = facets.facet_counts({})
+
+        self.assertEqual(
+            counts(result, "bar"), {self.bar1.pk: 2, self.bar2.pk: 2})
+        self.assertEqual(counts(result, "abv"), {
+            "session": 1, "standard": 0, "strong": 1, "extra-strong": 1,
+            "unknown": 1,
+        })
+        self.assertEqual(counts(result, "reserved"), {True: 1, False: 3})
+        self.assertEqual(
+            [facet["label"] for facet in result["brewery"]],
+            ["Another Brew Co", "Test Brew Co"],
+        )
+
+    def test_counts_ignore_own_facet_selection(self):
+        result = facets.facet_counts({"bar": {self.bar1.pk}})
+
+        self.assertEqual(
+            counts(result, "bar"), {self.bar1.pk: 2, self.bar2.pk: 2})
+        self.assertEqual(
+            counts(result, "brewery"),
+            {self.brewery1.pk: 1, self.brewery2.pk: 1},
+        )
+        self.assertTrue(result["bar"][0]["selected"])
+        self.assertFalse(result["bar"][1]["selected"])
+
+    def test_counts_match_filtered_beers(self):
+        selected = {"bar": {self.bar2.pk}, "reserved": {False}}
+        result = facets.facet_counts(selected)
+        queryset = facets.filter_beers(Beer.objects.all(), selected)
+
+        for band, count in counts(result, "abv").items():
+            self.assertEqual(
+                sum(facets.abv_band(beer.abv) == band for beer in queryset),
+                count,
+            )
+
+    def test_starred_counts(self):
+        factories.star_beer(user=self.user, beer=self.stout)
+
+        result = facets.facet_counts(
+            {"bar": {self.bar2.pk}}, user=self.user)
+
+        self.assertEqual(counts(result, "starred"), {True: 1, False: 1})
+        self.assertNotIn("starred", facets.facet_counts({}, AnonymousUser()))
+
+    def test_counts_within_restricted_beers(self):
+        result = facets.facet_counts({}, restrict=[self.mild.pk, self.ipa.pk])
+
+        self.assertEqual(
+            counts(result, "bar"), {self.bar1.pk: 2, self.bar2.pk: 0})
+
+    def test_index_is_cached(self):
+        facets.get_index()
+
+        with self.assertNumQueries(0):
+            facets.facet_counts({"bar": {self.bar1.pk}})
+
+    def test_index_is_refreshed_when_beers_change(self):
+        facets.get_index()
+        self.porter.abv = Decimal("4.5")
+        self.porter.save()
+        self.mild.delete()
+
+        result = facets.facet_counts({})
+
+        self.assertEqual(counts(result, "abv")["standard"], 1)
+        self.assertEqual(counts(result, "abv")["session"], 0)
+
+    def test_index_is_refreshed_when_breweries_change(self):
+        facets.get_index()
+        self.brewery1.name = "Renamed Brew Co"
+        self.brewery1.save()
+
+        result = facets.facet_counts({})
+
+        self.assertEqual(
+            [facet["label"] for facet in result["brewery"]],
+            ["Another Brew Co", "Renamed Brew Co"],
+        )
@@ -0,0 +1,83 @@
+import tempfile
+from decimal import Decimal
+
+from django.test import TestCase, override_settings
+
+from beerfest import frozen
+from beerfest.models import Beer
+from tests import factories
+
+
+class TestFrozenFestival(TestCase):
+    def setUp(self):
+        tmp = tempfile.TemporaryDirectory()
+        self.addCleanup(tmp.cleanup)
+        self.directory = tmp.name
+        frozen._festival = None
+        self.user = factories.create_user()
+        bar = factories.create_bar()
+        brewery = factories.create_brewery()
+        self.ipa = factories.create_beer(
+            bar=bar, brewery=brewery, name="IPA", number=2, abv="5.6")
+        self.mild = factories.create_beer(
+            bar=bar, brewery=brewery, name="Mild", number=1)
+        factories.star_beer(user=self.user, beer=self.ipa)
+        factories.rate_beer(user=self.user, beer=self.ipa, rating=4)
+        factories.rate_beer(user=self.user, beer=self.mild, rating=2)
+
+    def freeze(self):
+        with override_settings(BEERFEST_FROZEN_DIR=self.directory):
+            frozen.freeze(self.directory)
+            return frozen.get_festival()
+
+    def test_table_round_trip(self):
+        frozen.write_table(self.directory, "test", [(3, {"a": 1}), (1, [2])])
+        table = frozen.Table(self.directory, "test")
+
+        self.assertEqual(list(table), [{"a": 1}, [2]])
+        self.assertEqual(table.get(1), [2])
+        self.assertIsNone(table.get(2))
+
+    def test_empty_table(self):
+        frozen.write_table(self.directory, "test", [])
+
+        self.assertEqual(list(frozen.Table(self.directory, "test")), [])
+
+    def test_beers_served_without_queries(self):
+        festival = self.freeze()
+        Beer.objects.all().delete()
+
+        with self.assertNumQueries(0):
+            beers = list(festival.get_catalogue().beers)
+            ipa = festival.get_beer(self.ipa.pk)
+
+        self.assertEqual([beer.name for beer in beers], ["Mild", "IPA"])
+        self.assertEqual(ipa.abv, Decimal("5.6"))
+        self.assertEqual(ipa.num_ratings, 1)
+        self.assertEqual(str(ipa), "IPA by Test Brew Co")
+        self.assertIsNone(festival.get_beer(0))
+
+    def test_user_state_and_profile(self):
+        festival = self.freeze()
+
+        self.assertEqual(
+            festival.get_user_state(self.user),
+            {self.ipa.pk: (True, 4), self.mild.pk: (False, 2)},
+        )
+        beers = festival.get_profile_beers(self.user)
+        self.assertEqual(
+            [(beer.name, beer.starred, beer.rating) for beer in beers],
+            [("Mild", False, 2), ("IPA", True, 4)],
+        )
+        other = factories.create_user("Ms Test")
+        self.assertEqual(festival.get_user_state(other), {})
+
+    def test_facet_index(self):
+        index = self.freeze().get_index()
+        counts = {
+            facet["value"]: facet["count"]
+            for facet in index.counts({})["abv"]
+        }
+
+        self.assertEqual(counts["strong"], 1)
+        self.assertEqual(counts["unknown"], 1)
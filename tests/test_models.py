@@ -1,12 +1,15 @@
 from decimal import Decimal, InvalidOperation
 
+from django.contrib.auth.models import AnonymousUser
 from django.core.exceptions import ValidationError
-from django.db import IntegrityError
+from django.db import IntegrityError, connection, transaction
 from django.forms import ModelForm
 from django.test import TestCase
+from django.test.utils import CaptureQueriesContext
 
 from beerfest import models
 from tests import factories
+from tests.concurrency import ConcurrentTestCase
 
 
 class TestBrewery(TestCase):
@@ -203,6 +206,79 @@ class TestBeer(TestCase):
             "Test IPA 3",
         ])
 
+    def test_default_ordering_does_not_join_brewery(self):
+        query = str(models.Beer.objects.all().query)
+
+        self.assertNotIn("beerfest_brewery", query)
+
+    def test_brewery_name_set_on_save(self):
+        beer = factories.create_beer(bar=self.bar, brewery=self.brewery)
+        beer.brewery = factories.create_brewery(name="Test Brew")
+        beer.save()
+        beer.refresh_from_db()
+
+        self.assertEqual(beer.brewery_name, "Test Brew")
+
+    def test_brewery_rename_updates_beers_in_one_query(self):
+        beer = factories.create_beer(bar=self.bar, brewery=self.brewery)
+        factories.create_beer(
+            bar=self.bar, brewery=self.brewery, name="Test Mild")
+        self.brewery.name = "Renamed Brew Co"
+
+        # The brewery UPDATE, then one for its beers
+        with self.assertNumQueries(2):
+            self.brewery.save()
+        beer.refresh_from_db()
+
+        self.assertEqual(beer.brewery_name, "Renamed Brew Co")
+        self.assertEqual(
+            set(models.Beer.objects.values_list("brewery_name", flat=True)),
+            {"Renamed Brew Co"},
+        )
+
+    def test_with_stats(self):
+        beer = factories.create_beer(bar=self.bar, brewery=self.brewery)
+        factories.create_beer(
+            bar=self.bar, brewery=self.brewery, name="Test Mild")
+        factories.rate_beer(user=factories.create_user(), beer=beer, rating=4)
+        factories.rate_beer(
+            user=factories.create_user("Ms Test"), beer=beer, rating=1)
+
+        with self.assertNumQueries(1):
+            stats = {
+                beer.name: (beer.num_ratings, beer.avg_rating)
+                for beer in models.Beer.objects.with_stats()
+            }
+
+        self.assertEqual(
+            stats, {"Test IPA": (2, 2.5), "Test Mild": (0, None)})
+
+    def test_with_user_state(self):
+        beer = factories.create_beer(bar=self.bar, brewery=self.brewery)
+        factories.create_beer(
+            bar=self.bar, brewery=self.brewery, name="Test Mild")
+        user = factories.create_user()
+        other_user = factories.create_user("Ms Test")
+        factories.star_beer(user=user, beer=beer)
+        factories.rate_beer(user=user, beer=beer, rating=4)
+        factories.rate_beer(user=other_user, beer=beer, rating=1)
+
+        with self.assertNumQueries(1):
+            state = {
+                beer.name: (beer.starred, beer.rating)
+                for beer in models.Beer.objects.with_user_state(user)
+            }
+
+        self.assertEqual(
+            state, {"Test IPA": (True, 4), "Test Mild": (False, None)})
+
+    def test_with_user_state_for_anonymous_user(self):
+        factories.create_beer(bar=self.bar, brewery=self.brewery)
+
+        beer = models.Beer.objects.with_user_state(AnonymousUser()).get()
+
+        self.assertFalse(hasattr(beer, "starred"))
+
     def test_access_m2m_fields(self):
         beer = factories.create_beer(bar=self.bar, brewery=self.brewery)
         user = factories.create_user()
@@ -219,6 +295,44 @@ class TestBeer(TestCase):
         self.assertCountEqual(user.starred_beers.all(), [beer])
         self.assertCountEqual(user.rated_beers.all(), [beer])
 
+    def test_stats_default_to_zero(self):
+        beer = models.Beer.objects.create(**self.beer_kwargs)
+
+        self.assertEqual(beer.num_stars, 0)
+        self.assertEqual(beer.num_ratings, 0)
+        self.assertEqual(beer.rating_sum, 0)
+
+    def test_with_drifted_stats(self):
+        beer = factories.create_beer(bar=self.bar, brewery=self.brewery)
+        factories.create_beer(
+            bar=self.bar, brewery=self.brewery, name="Test Mild")
+        user = factories.create_user()
+        models.StarBeer.objects.create(beer=beer, user=user)
+        models.BeerRating.objects.create(beer=beer, user=user, rating=4)
+
+        drifted = models.Beer.objects.with_drifted_stats()
+
+        self.assertCountEqual(drifted, [beer])
+        self.assertEqual(drifted[0].counted_num_stars, 1)
+        self.assertEqual(drifted[0].counted_num_ratings, 1)
+        self.assertEqual(drifted[0].counted_rating_sum, 4)
+
+    def test_recount_stats(self):
+        beer = factories.create_beer(bar=self.bar, brewery=self.brewery)
+        user = factories.create_user()
+        user2 = factories.create_user("Ms Test")
+        models.StarBeer.objects.create(beer=beer, user=user)
+        models.BeerRating.objects.create(beer=beer, user=user, rating=4)
+        models.BeerRating.objects.create(beer=beer, user=user2, rating=1)
+
+        models.Beer.objects.all().recount_stats()
+        beer.refresh_from_db()
+
+        self.assertEqual(beer.num_stars, 1)
+        self.assertEqual(beer.num_ratings, 2)
+        self.assertEqual(beer.rating_sum, 5)
+        self.assertFalse(models.Beer.objects.with_drifted_stats().exists())
+
 
 class TestStarBeer(TestCase):
     def setUp(self):
@@ -230,6 +344,30 @@ class TestStarBeer(TestCase):
         self.beer2 = factories.create_beer(name="Test Mild",
                                            brewery=self.brewery, bar=self.bar)
 
+    def test_star_locks_beer_before_reading_stars(self):
+        with CaptureQueriesContext(connection) as queries:
+            self.assertTrue(
+                models.StarBeer.objects.star(self.user, self.beer1.pk))
+
+        if connection.features.has_select_for_update:
+            self.assertTrue(queries[0]["sql"].startswith("SELECT"))
+            self.assertIn('"beerfest_beer"', queries[0]["sql"])
+            self.assertNotIn("beerfest_starbeer", queries[0]["sql"])
+        else:
+            # The database's write lock is taken by the first statement
+            self.assertTrue(
+                queries[0]["sql"].startswith('UPDATE "beerfest_beer"'))
+
+    def test_star_missing_beer(self):
+        self.assertFalse(models.StarBeer.objects.star(self.user, 0))
+        self.assertFalse(models.StarBeer.objects.exists())
+
+    def test_lock_beers_returns_ids_found(self):
+        with transaction.atomic():
+            found = models.lock_beers([self.beer1.pk, 0])
+
+        self.assertEqual(found, {self.beer1.pk})
+
     def test_create_and_retrieve_starbeer(self):
         models.StarBeer.objects.create(user=self.user, beer=self.beer1)
 
@@ -357,3 +495,32 @@ class TestBeerRating(TestCase):
             "Mx Test rated Test Beer 5 5",
             "Mx Test rated Test Beer 2 2",
         ])
+
+
+class TestConcurrentTaps(ConcurrentTestCase):
+    def setUp(self):
+        self.beer = factories.create_beer()
+        self.users = [factories.create_user(f"user{n}") for n in range(16)]
+
+    def test_concurrent_stars(self):
+        def tap(n):
+            models.StarBeer.objects.star(self.users[n], self.beer.pk)
+            if n % 2:
+                models.StarBeer.objects.unstar(self.users[n], self.beer.pk)
+
+        self.assertEqual(self.run_concurrently(tap), [])
+        self.beer.refresh_from_db()
+        self.assertEqual(self.beer.num_stars, 8)
+        self.assertEqual(models.StarBeer.objects.count(), 8)
+
+    def test_concurrent_ratings(self):
+        def tap(n):
+            models.BeerRating.objects.rate(self.users[n], self.beer.pk, 5)
+            models.BeerRating.objects.rate(self.users[n], self.beer.pk, 2)
+            if n % 2:
+                models.BeerRating.objects.unrate(self.users[n], self.beer.pk)
+
+        self.assertEqual(self.run_concurrently(tap), [])
+        self.beer.refresh_from_db()
+        self.assertEqual(self.beer.num_ratings, 8)
+        self.assertEqual(self.beer.rating_sum, 16)
@@ -0,0 +1,94 @@
+from django.test import TestCase
+
+from beerfest.models import Beer
+from beerfest.pagination import BEER_KEYSET, InvalidToken
+from tests import factories
+
+
+class TestBeerKeyset(TestCase):
+    def setUp(self):
+        bar1 = factories.create_bar()
+        bar2 = factories.create_bar("Test Bar 2")
+        brewery1 = factories.create_brewery()
+        brewery2 = factories.create_brewery("Another Brew Co")
+
+        for bar in [bar1, bar2]:
+            for brewery in [brewery1, brewery2]:
+                for number in [2, None, 1]:
+                    for name in ["Mild", "IPA"]:
+                        factories.create_beer(
+                            bar=bar, brewery=brewery, number=number,
+                            name=name,
+                        )
+
+        self.beers = list(
+            Beer.objects.select_related("brewery").order_by(
+                *Beer._meta.ordering, "id")
+        )
+        self.queryset = Beer.objects.select_related("brewery")
+
+    def walk(self, page_size):
+        pages = []
+        token = None
+        while True:
+            rows, token, previous = BEER_KEYSET.paginate(
+                self.queryset, page_size, token)
+            pages.append((rows, previous))
+            if token is None:
+                return pages
+
+    def test_pages_follow_default_ordering(self):
+        for page_size in [1, 3, 5, 24, 30]:
+            pages = self.walk(page_size)
+            beers = [beer for rows, _ in pages for beer in rows]
+
+            self.assertEqual(beers, self.beers)
+            self.assertEqual(len(pages), -(-len(self.beers) // page_size))
+
+    def test_previous_tokens_return_previous_page(self):
+        pages = self.walk(5)
+
+        for (rows, _), (_, previous) in zip(pages, pages[1:]):
+            previous_rows, _, _ = BEER_KEYSET.paginate(
+                self.queryset, 5, previous)
+            self.assertEqual(previous_rows, rows)
+
+    def test_first_page_has_no_previous_token(self):
+        rows, next_token, previous_token = BEER_KEYSET.paginate(
+            self.queryset, 5)
+
+        self.assertEqual(rows, self.beers[:5])
+        self.assertIsNotNone(next_token)
+        self.assertIsNone(previous_token)
+
+    def test_page_query_does_not_use_offset(self):
+        _, token, _ = BEER_KEYSET.paginate(self.queryset, 5)
+        queryset = self.queryset.filter(
+            BEER_KEYSET.after(BEER_KEYSET.decode(token)[0]))
+
+        self.assertNotIn("OFFSET", str(queryset[:5].query))
+
+    def test_invalid_tokens(self):
+        for token in ["!!!", "bm90IGpzb24", "WzAsWzFdXQ", "WzAsMV0"]:
+            with self.assertRaises(InvalidToken):
+                BEER_KEYSET.decode(token)
+
+    def test_tokens_with_invalid_values(self):
+        positions = [
+            ["x", "a", 1, "b", 1],
+            [None, "a", 1, "b", 1],
+            [1, "a", 1, "b", None],
+            [10 ** 30, "a", 1, "b", 1],
+            [1, "a", 10 ** 30, "b", 1],
+            [1, "a", 1, "b", 10 ** 30],
+            [1, "a", 1, "b", 0],
+        ]
+        for position in positions:
+            token = BEER_KEYSET.encode(position)
+            with self.assertRaises(InvalidToken):
+                BEER_KEYSET.decode(token)
+
+    def test_token_values_are_converted_to_field_types(self):
+        token = BEER_KEYSET.encode(["1", "a", None, "b", "2"])
+        self.assertEqual(
+            BEER_KEYSET.decode(token), ([1, "a", None, "b", 2], False))
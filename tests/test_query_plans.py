@@ -0,0 +1,60 @@
+from django.test import TestCase, RequestFactory
+
+from beerfest import views
+from beerfest.models import Beer, BeerRating
+from tests import factories
+from tests.explain import QueryPlanMixin
+
+
+class QueryPlanTest(QueryPlanMixin, TestCase):
+    def setUp(self):
+        self.factory = RequestFactory()
+        self.user = factories.create_user()
+        bar = factories.create_bar()
+        brewery = factories.create_brewery()
+        self.beer1 = factories.create_beer(
+            bar=bar, brewery=brewery, name="IPA", number=1)
+        self.beer2 = factories.create_beer(
+            bar=bar, brewery=brewery, name="Mild")
+        factories.star_beer(user=self.user, beer=self.beer1)
+        factories.rate_beer(user=self.user, beer=self.beer2, rating=4)
+
+    def setup_view(self, view_class, **kwargs):
+        request = self.factory.get("")
+        request.user = self.user
+        view = view_class()
+        view.request = request
+        view.args = ()
+        view.kwargs = kwargs
+        return view
+
+    def test_helper_detects_full_table_scan(self):
+        with self.assertRaisesMessage(AssertionError, "Full table scan"):
+            self.assertNoFullTableScan(Beer.objects.filter(notes="N/A"))
+
+    def test_beer_list_page(self):
+        view = self.setup_view(views.BeerListView)
+        keyset = view.keyset
+        queryset = view.get_queryset().order_by(
+            *keyset.order_by()
+        ).filter(keyset.after(keyset.position(self.beer1)))
+
+        self.assertNoFullTableScan(queryset[:view.paginate_by])
+
+    def test_beer_detail(self):
+        view = self.setup_view(views.BeerDetailView, pk=self.beer1.pk)
+        queryset = view.get_queryset().filter(pk=self.beer1.pk)
+
+        self.assertNoFullTableScan(queryset)
+
+    def test_user_profile(self):
+        view = self.setup_view(views.UserProfileView)
+        queryset = view.get_beers().order_by(*view.keyset.order_by())
+
+        self.assertNoFullTableScan(queryset[:view.paginate_by])
+
+    def test_beer_rating_aggregates(self):
+        self.assertNoFullTableScan(
+            BeerRating.objects.filter(beer=self.beer2).values_list("rating"))
+        self.assertNoFullTableScan(
+            Beer.objects.with_counted_stats().filter(pk=self.beer2.pk))
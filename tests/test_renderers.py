@@ -0,0 +1,43 @@
+import json
+from decimal import Decimal
+from unittest import skipIf
+
+from django.test import SimpleTestCase
+
+from beerfest.renderers import (
+    ColumnarJSONRenderer, MessagePackRenderer, msgpack, to_columns
+)
+
+
+class TestColumnarJSONRenderer(SimpleTestCase):
+    def render(self, data):
+        return json.loads(ColumnarJSONRenderer().render(data))
+
+    def test_to_columns(self):
+        self.assertEqual(
+            to_columns([{"id": 1, "name": "IPA"}, {"id": 2, "name": "Mild"}]),
+            {"columns": ["id", "name"], "rows": [[1, "IPA"], [2, "Mild"]]},
+        )
+        self.assertEqual(to_columns([]), {"columns": [], "rows": []})
+
+    def test_renders_lists_as_columns(self):
+        self.assertEqual(
+            self.render([{"id": 1}]), {"columns": ["id"], "rows": [[1]]})
+
+    def test_renders_page_results_as_columns(self):
+        self.assertEqual(
+            self.render({"next": None, "results": [{"id": 1}]}),
+            {"next": None, "results": {"columns": ["id"], "rows": [[1]]}},
+        )
+
+    def test_renders_objects_unchanged(self):
+        self.assertEqual(self.render({"id": 1}), {"id": 1})
+
+
+@skipIf(msgpack is None, "msgpack is not installed")
+class TestMessagePackRenderer(SimpleTestCase):
+    def test_renders_data(self):
+        content = MessagePackRenderer().render(
+            {"id": 1, "abv": Decimal("4.5")})
+
+        self.assertEqual(msgpack.unpackb(content), {"id": 1, "abv": 4.5})
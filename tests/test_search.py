@@ -0,0 +1,83 @@
+from django.db import connection
+from django.test import TestCase
+from django.test.utils import CaptureQueriesContext
+
+from beerfest.models import Beer
+from beerfest.search import search
+from tests import factories
+
+
+class TestSearch(TestCase):
+    def setUp(self):
+        self.bar = factories.create_bar()
+        self.brewery = factories.create_brewery("Hopsmith")
+        self.other_brewery = factories.create_brewery("Maltings")
+        self.ipa = factories.create_beer(
+            bar=self.bar, brewery=self.brewery, name="Citra IPA",
+            tasting_notes="Grapefruit and pine",
+        )
+        self.stout = factories.create_beer(
+            bar=self.bar, brewery=self.other_brewery, name="Oatmeal Stout",
+            tasting_notes="Coffee, chocolate",
+        )
+        self.porter = factories.create_beer(
+            bar=self.bar, brewery=self.other_brewery, name="Porter",
+            notes="Brewed with citra hops",
+        )
+
+    def search(self, query):
+        return list(search(Beer.objects.all(), query))
+
+    def test_matches_name(self):
+        self.assertEqual(self.search("stout"), [self.stout])
+
+    def test_matches_brewery_name(self):
+        self.assertEqual(self.search("hopsmith"), [self.ipa])
+
+    def test_matches_tasting_notes(self):
+        self.assertEqual(self.search("chocolate"), [self.stout])
+
+    def test_matches_term_prefixes(self):
+        self.assertEqual(self.search("grapef"), [self.ipa])
+
+    def test_requires_every_term(self):
+        self.assertEqual(self.search("maltings porter"), [self.porter])
+
+    def test_ignores_punctuation(self):
+        self.assertEqual(self.search('"stout" -* ^'), [self.stout])
+
+    def test_empty_query_matches_nothing(self):
+        self.assertEqual(self.search(" -- "), [])
+
+    def test_ranks_name_above_notes(self):
+        results = search(Beer.objects.all(), "citra")
+
+        self.assertEqual(list(results), [self.ipa, self.porter])
+        self.assertGreater(results[0].search_rank, results[1].search_rank)
+
+    def test_matches_once_per_search(self):
+        # Not once per matching beer, as a correlated subquery would
+        with CaptureQueriesContext(connection) as queries:
+            self.search("citra")
+
+        self.assertEqual(len(queries), 1)
+        self.assertEqual(queries[0]["sql"].count("MATCH"), 1)
+
+    def test_index_follows_beer_changes(self):
+        self.stout.name = "Oatmeal Porter"
+        self.stout.save()
+        self.porter.delete()
+        mild = factories.create_beer(
+            bar=self.bar, brewery=self.brewery, name="Dark Mild")
+
+        self.assertEqual(self.search("stout"), [])
+        self.assertEqual(self.search("porter"), [self.stout])
+        self.assertEqual(self.search("mild"), [mild])
+
+    def test_index_follows_brewery_rename(self):
+        self.other_brewery.name = "Kilnworks"
+        self.other_brewery.save()
+
+        self.assertEqual(self.search("maltings"), [])
+        self.assertCountEqual(
+            self.search("kilnworks"), [self.stout, self.porter])
@@ -4,8 +4,10 @@ from django.urls import reverse
 from rest_framework.request import Request
 from rest_framework.test import APIRequestFactory
 
+from beerfest.models import Bar, Brewery
 from beerfest.serializers import (
-    BarSerializer, BrewerySerializer, UserSerializer
+    BarSerializer, BrewerySerializer, BeerSerializer, FastBarSerializer,
+    FastBrewerySerializer, FastUserSerializer, UserSerializer, user_rows,
 )
 
 from tests import factories
@@ -48,6 +50,44 @@ class TestBrewerySerializer(TestCase):
         self.assertEqual(self.serializer.data["location"], "Testville")
 
 
+class TestBeerSerializer(TestCase):
+
+    def setUp(self):
+        self.beer = factories.create_beer(abv="4.5")
+        self.serializer = BeerSerializer(instance=self.beer)
+
+    def test_contains_expected_fields(self):
+        self.assertCountEqual(self.serializer.data.keys(), [
+            "id", "bar", "brewery", "name", "number", "reserved", "abv",
+            "tasting_notes", "notes", "num_stars", "num_ratings",
+            "avg_rating", "starred", "rating",
+        ])
+
+    def test_nested_bar_and_brewery(self):
+        self.assertEqual(
+            self.serializer.data["bar"], {"id": 1, "name": "Test Bar"})
+        self.assertEqual(self.serializer.data["brewery"], {
+            "id": 1, "name": "Test Brew Co", "location": "Testville"
+        })
+
+    def test_avg_rating_field_content(self):
+        self.assertIsNone(self.serializer.data["avg_rating"])
+
+        factories.rate_beer(factories.create_user(), self.beer, rating=4)
+        factories.rate_beer(factories.create_user("T Est"), self.beer, 1)
+        serializer = BeerSerializer(instance=self.beer)
+
+        self.assertEqual(serializer.data["avg_rating"], 2.5)
+
+    def test_user_state_fields_use_annotations(self):
+        self.beer.starred = True
+        self.beer.rating = 3
+        serializer = BeerSerializer(instance=self.beer)
+
+        self.assertIs(serializer.data["starred"], True)
+        self.assertEqual(serializer.data["rating"], 3)
+
+
 class TestUserSerializer(TestCase):
 
     def context(self, user_id=1):
@@ -119,3 +159,92 @@ class TestUserSerializer(TestCase):
             self.serializer2.data["rated_beers"],
             []
         )
+
+
+class TestFastSerializers(TestCase):
+
+    def setUp(self):
+        self.request = Request(APIRequestFactory().get('/users/1/'))
+        self.user = factories.create_user()
+        self.user2 = factories.create_user(username="T Est")
+        bar = factories.create_bar()
+        brewery = factories.create_brewery()
+        self.beer1 = factories.create_beer(
+            bar=bar, brewery=brewery, name="Test1")
+        self.beer2 = factories.create_beer(
+            bar=bar, brewery=brewery, name="Test2")
+        factories.star_beer(self.user, self.beer2)
+        factories.rate_beer(self.user, self.beer1)
+        factories.rate_beer(self.user, self.beer2)
+
+    def test_bar_matches_model_serializer(self):
+        rows = Bar.objects.values(*FastBarSerializer.field_names)
+
+        self.assertEqual(
+            FastBarSerializer(rows, many=True).data,
+            BarSerializer(Bar.objects.all(), many=True).data,
+        )
+
+    def test_brewery_matches_model_serializer(self):
+        row = Brewery.objects.values(
+            *FastBrewerySerializer.field_names).get()
+
+        self.assertEqual(
+            FastBrewerySerializer(row).data,
+            BrewerySerializer(Brewery.objects.get()).data,
+        )
+
+    def test_user_rows(self):
+        with self.assertNumQueries(2):
+            rows = user_rows([self.user, self.user2])
+
+        self.assertEqual(rows[0]["starred_beers"], [self.beer2.pk])
+        self.assertEqual(
+            rows[0]["rated_beers"], [self.beer1.pk, self.beer2.pk])
+        self.assertEqual(rows[1]["rated_beers"], [])
+
+    def test_user_matches_model_serializer(self):
+        context = {"request": self.request}
+        rows = user_rows([self.user, self.user2])
+
+        self.assertEqual(
+            FastUserSerializer(rows, many=True, context=context).data,
+            UserSerializer(
+                [self.user, self.user2], many=True, context=context).data,
+        )
+
+
+class TestSparseFieldsets(TestCase):
+
+    def setUp(self):
+        self.beer = factories.create_beer()
+
+    def context(self, method="get", **params):
+        request = getattr(APIRequestFactory(), method)('/', params)
+        return {'request': Request(request)}
+
+    def test_fields_picks_top_level_fields(self):
+        serializer = BeerSerializer(
+            self.beer, context=self.context(fields="id,bar"))
+
+        self.assertEqual(
+            serializer.data, {"id": 1, "bar": {"id": 1, "name": "Test Bar"}})
+
+    def test_exclude_drops_fields(self):
+        serializer = BrewerySerializer(
+            self.beer.brewery, context=self.context(exclude="location"))
+
+        self.assertEqual(serializer.data, {"id": 1, "name": "Test Brew Co"})
+
+    def test_writes_keep_all_fields(self):
+        serializer = BarSerializer(
+            self.beer.bar, context=self.context("post", fields="id"))
+
+        self.assertEqual(serializer.data, {"id": 1, "name": "Test Bar"})
+
+    def test_fast_serializer_fields(self):
+        rows = Bar.objects.values("id", "name")
+        serializer = FastBarSerializer(
+            rows, many=True, context=self.context(fields="name"))
+
+        self.assertEqual(serializer.data, [{"name": "Test Bar"}])
@@ -0,0 +1,136 @@
+import gzip
+import json
+import os
+import tempfile
+from unittest import mock
+
+from django.test import TestCase, override_settings
+
+from beerfest import snapshot
+from tests import factories
+
+
+class TestSnapshot(TestCase):
+    def setUp(self):
+        tmp = tempfile.TemporaryDirectory()
+        self.addCleanup(tmp.cleanup)
+        self.directory = tmp.name
+        self.beer = factories.create_beer(name="IPA", abv="4.5")
+
+    def test_builds_snapshot_files(self):
+        digest, created = snapshot.build_snapshot(self.directory)
+        name = f"catalogue.{digest}.json"
+
+        self.assertTrue(created)
+        with open(os.path.join(self.directory, name), "rb") as f:
+            content = f.read()
+        with open(os.path.join(self.directory, name + ".gz"), "rb") as f:
+            self.assertEqual(gzip.decompress(f.read()), content)
+        beers = json.loads(content)["beers"]
+        self.assertEqual(beers[0]["name"], "IPA")
+        self.assertEqual(beers[0]["abv"], "4.5")
+        self.assertEqual(
+            snapshot.current_snapshot(self.directory),
+            {"hash": digest, "name": name},
+        )
+
+    def test_unchanged_catalogue_reuses_snapshot(self):
+        digest, _ = snapshot.build_snapshot(self.directory)
+
+        self.assertEqual(
+            snapshot.build_snapshot(self.directory), (digest, False))
+
+    def test_changed_catalogue_gets_new_snapshot(self):
+        digest, _ = snapshot.build_snapshot(self.directory)
+        self.beer.name = "Session IPA"
+        self.beer.save()
+
+        new_digest, created = snapshot.build_snapshot(self.directory)
+
+        self.assertTrue(created)
+        self.assertNotEqual(new_digest, digest)
+        self.assertEqual(
+            snapshot.current_snapshot(self.directory)["hash"], new_digest)
+
+    def test_prunes_old_snapshots(self):
+        for n in range(3):
+            self.beer.name = f"IPA {n}"
+            self.beer.save()
+            digest, _ = snapshot.build_snapshot(self.directory, keep=2)
+            path = os.path.join(self.directory, f"catalogue.{digest}.json")
+            os.utime(path, (n, n))
+
+        self.assertEqual(len(snapshot.snapshot_names(self.directory)), 2)
+
+    def test_schedule_build_is_opt_in(self):
+        with mock.patch("threading.Timer") as timer:
+            snapshot.schedule_build()
+
+        timer.assert_not_called()
+
+    def test_schedule_build_starts_one_timer(self):
+        with override_settings(
+            BEERFEST_SNAPSHOT_DIR=self.directory,
+            BEERFEST_SNAPSHOT_AUTO_BUILD=True,
+        ), mock.patch("threading.Timer") as timer:
+            self.addCleanup(setattr, snapshot, "_timer", None)
+            snapshot.schedule_build()
+            snapshot.schedule_build()
+
+        timer.assert_called_once_with(10, snapshot.run_scheduled_build)
+        timer.return_value.start.assert_called_once_with()
+
+    def test_scheduled_build_runs_at_exit(self):
+        with override_settings(
+            BEERFEST_SNAPSHOT_DIR=self.directory,
+            BEERFEST_SNAPSHOT_AUTO_BUILD=True,
+        ), mock.patch("threading.Timer") as timer:
+            self.addCleanup(setattr, snapshot, "_timer", None)
+            snapshot.schedule_build()
+            snapshot.flush_scheduled_build()
+            # Only once
+            snapshot.flush_scheduled_build()
+
+        timer.return_value.cancel.assert_called_once_with()
+        self.assertEqual(len(snapshot.snapshot_names(self.directory)), 1)
+
+    def test_build_now_replaces_scheduled_build(self):
+        with override_settings(
+            BEERFEST_SNAPSHOT_DIR=self.directory,
+            BEERFEST_SNAPSHOT_AUTO_BUILD=True,
+        ), mock.patch("threading.Timer") as timer:
+            self.addCleanup(setattr, snapshot, "_timer", None)
+            snapshot.schedule_build()
+            snapshot.build_now()
+
+        timer.return_value.cancel.assert_called_once_with()
+        self.assertIsNotNone(snapshot.current_snapshot(self.directory))
+        self.assertFalse(snapshot.cancel_scheduled_build())
+
+
+class TestCatalogueSnapshotView(TestCase):
+    def setUp(self):
+        tmp = tempfile.TemporaryDirectory()
+        self.addCleanup(tmp.cleanup)
+        self.directory = tmp.name
+
+    def test_returns_current_snapshot(self):
+        factories.create_beer()
+        digest, _ = snapshot.build_snapshot(self.directory)
+
+        with self.settings(
+            BEERFEST_SNAPSHOT_DIR=self.directory,
+            BEERFEST_SNAPSHOT_URL="https://cdn.example.com/",
+        ), self.assertNumQueries(0):
+            response = self.client.get("/catalogue/snapshot/")
+
+        self.assertEqual(response.json(), {
+            "hash": digest,
+            "url": f"https://cdn.example.com/catalogue.{digest}.json",
+        })
+
+    def test_404_without_snapshot(self):
+        with self.settings(BEERFEST_SNAPSHOT_DIR=self.directory):
+            response = self.client.get("/catalogue/snapshot/")
+
+        self.assertEqual(response.status_code, 404)
@@ -1,11 +1,14 @@
 from decimal import Decimal
 
+from django.contrib.auth.models import AnonymousUser
+from django.core.cache import cache
 from django.db.models.expressions import Exists, OuterRef, Subquery
 from django.template import Context, Template
-from django.test import TestCase, RequestFactory
+from django.test import TestCase, RequestFactory, override_settings
 
 from tests import factories
 
+from beerfest import user_state
 from beerfest.models import Beer, StarBeer, BeerRating
 from beerfest.templatetags import beer_tags
 
@@ -123,13 +126,39 @@ class UserStarredBeerTemplateTagTest(UserBeerTemplateTagBaseTest):
         self.assertEqual(rendered, "STARRED")
 
     def test_returns_False_if_user_has_not_starred_beer(self):
-        starred = beer_tags.user_starred_beer(self.beer2.id, self.user.id)
+        starred = beer_tags.user_starred_beer(
+            Context(), self.user.id, self.beer2.id)
         self.assertFalse(starred)
 
     def test_returns_True_if_user_has_starred_beer(self):
-        starred = beer_tags.user_starred_beer(self.beer1.id, self.user.id)
+        starred = beer_tags.user_starred_beer(
+            Context(), self.user.id, self.beer1.id)
         self.assertTrue(starred)
 
+    def test_returns_False_for_anonymous_user(self):
+        with self.assertNumQueries(0):
+            starred = beer_tags.user_starred_beer(
+                Context(), None, self.beer1.id)
+        self.assertFalse(starred)
+
+    def test_queries_once_per_render(self):
+        beers = [self.beer1, self.beer2] + [
+            factories.create_beer(name=f"Beer {n}") for n in range(5)
+        ]
+        template = Template(
+            "{% load beer_tags %}"
+            "{% for beer in beers %}"
+            "{% user_starred_beer user.id beer.id as starred %}"
+            "{% if starred %}*{% else %}-{% endif %}"
+            "{% endfor %}"
+        )
+
+        with self.assertNumQueries(1):
+            rendered = template.render(
+                Context({"beers": beers, "user": self.user}))
+
+        self.assertEqual(rendered, "*------")
+
 
 class DisplayBeerTableTemplateTagTest(UserBeerTemplateTagBaseTest):
     def test_renders_expected_table(self):
@@ -212,3 +241,92 @@ class DisplayBeerTableWithStarsAndRatingsTemplateTagTest(
         ).render(Context({"beer_list": beer_list, "user": self.user}))
 
         self.assertEqual(rendered, expected)
+
+
+class SharedBeerTableTemplateTagTest(UserBeerTemplateTagBaseTest):
+    def setUp(self):
+        cache.clear()
+        super().setUp()
+
+    def render(self, beer_list, user):
+        return Template(
+            "{% load beer_tags %}"
+            "{% shared_beer_table beer_list True %}"
+        ).render(Context({"beer_list": beer_list, "user": user}))
+
+    def test_renders_table_without_user_state(self):
+        beer_list = user_state.apply_user_state(
+            list(Beer.objects.all()), user_state.get_user_state(self.user))
+
+        rendered = self.render(beer_list, self.user)
+
+        self.assertEqual(rendered, (
+            "1 Star PA None N/A | "
+            "2 Try IPA None N/A | "
+            " | "
+            "True | "
+            "False\n"
+        ))
+        self.assertTrue(beer_list[0].starred)
+
+    @override_settings(TEMPLATES=[{
+        "BACKEND": "django.template.backends.django.DjangoTemplates",
+        "OPTIONS": {"loaders": [("django.template.loaders.locmem.Loader", {
+            "beerfest/beer_list_table.html": (
+                "{% load beer_tags %}{% for beer in beer_list %}"
+                "{% user_starred_beer user.id beer.id as starred %}"
+                "{{ beer.name }} {{ starred }} | {% endfor %}"
+            ),
+        })]},
+    }])
+    def test_table_template_can_check_stars(self):
+        beer_list = list(Beer.objects.all())
+
+        # Rendered for an anonymous user, so no stars are looked up
+        with self.assertNumQueries(0):
+            rendered = self.render(beer_list, self.user)
+
+        self.assertEqual(rendered, "Star PA False | Try IPA False | ")
+
+    def test_table_is_shared_between_users(self):
+        beer_list = list(Beer.objects.all())
+        rendered = self.render(beer_list, self.user)
+        # update() sends no signals, so the catalogue version stays put
+        Beer.objects.filter(pk=self.beer1.pk).update(name="Renamed PA")
+
+        self.assertEqual(self.render(beer_list, AnonymousUser()), rendered)
+
+    def test_table_is_rerendered_when_catalogue_changes(self):
+        self.render(list(Beer.objects.all()), self.user)
+        self.beer1.name = "Renamed PA"
+        self.beer1.save()
+
+        rendered = self.render(list(Beer.objects.all()), self.user)
+
+        self.assertIn("Renamed PA", rendered)
+
+
+class UserBeerStateTemplateTagTest(UserBeerTemplateTagBaseTest):
+    def setUp(self):
+        cache.clear()
+        super().setUp()
+
+    def test_renders_state_as_json(self):
+        rendered = Template(
+            "{% load beer_tags %}"
+            "{% user_beer_state beer_list user as state %}"
+            "{{ state|json_script:'user-beer-state' }}"
+        ).render(Context({
+            "beer_list": Beer.objects.all(), "user": self.user,
+        }))
+
+        self.assertEqual(rendered, (
+            '<script id="user-beer-state" type="application/json">'
+            '{"1": {"starred": true, "rating": 3}}</script>'
+        ))
+
+    def test_returns_nothing_for_anonymous_user(self):
+        with self.assertNumQueries(0):
+            state = beer_tags.user_beer_state([self.beer1], AnonymousUser())
+
+        self.assertEqual(state, {})
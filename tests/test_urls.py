@@ -87,3 +87,56 @@ class TestBeerRatingURL(URLTestBase):
 
     def test_star_beer_route_reverse(self):
         self.assertEqual(reverse("beer-rating", args=(1,)), "/beers/1/rating/")
+
+
+class TestBeerBatchURL(URLTestBase):
+    def test_beer_batch_route_uses_beer_batch_view(self):
+        match = resolve("/beers/batch/")
+        self.assertEqual(match.func.view_class.__name__, "BeerBatchView")
+
+    def test_beer_batch_route_reverse(self):
+        self.assertEqual(reverse("beer-batch"), "/beers/batch/")
+
+
+class TestExportURL(URLTestBase):
+    def test_export_route_uses_export_view(self):
+        match = resolve("/export/beers.csv")
+        self.assertEqual(match.func.view_class.__name__, "ExportView")
+        self.assertEqual(match.kwargs, {"dataset": "beers", "format": "csv"})
+
+    def test_export_route_reverse(self):
+        self.assertEqual(
+            reverse("export", args=("ratings", "ndjson")),
+            "/export/ratings.ndjson",
+        )
+
+
+class TestCatalogueSnapshotURL(URLTestBase):
+    def test_snapshot_route_uses_snapshot_view(self):
+        match = resolve("/catalogue/snapshot/")
+        self.assertEqual(
+            match.func.view_class.__name__, "CatalogueSnapshotView")
+
+    def test_snapshot_route_reverse(self):
+        self.assertEqual(reverse("catalogue-snapshot"), "/catalogue/snapshot/")
+
+
+class TestBeerAPIURLs(URLTestBase):
+    def test_beer_api_list_route_uses_correct_view(self):
+        self.assertEqual(
+            resolve("/api/beers/").func.__name__, "BeerViewSet")
+
+    def test_beer_api_list_route_reverse(self):
+        self.assertEqual(reverse("api-beer-list"), "/api/beers/")
+
+    def test_beer_api_detail_route_uses_correct_view(self):
+        match = resolve("/api/beers/1/")
+        self.assertEqual(match.func.__name__, "BeerViewSet")
+        self.assertEqual(match.kwargs, {"pk": "1"})
+
+    def test_beer_api_detail_route_reverse(self):
+        self.assertEqual(
+            reverse("api-beer-detail", args=(1,)), "/api/beers/1/")
+
+    def test_beer_api_search_route_reverse(self):
+        self.assertEqual(reverse("api-beer-search"), "/api/beers/search/")
@@ -0,0 +1,102 @@
+from django.core.cache import cache
+from django.test import TestCase
+
+from beerfest import user_state
+from beerfest.models import BeerRating, StarBeer
+from tests import factories
+
+
+class TestUserState(TestCase):
+    def setUp(self):
+        cache.clear()
+        self.user = factories.create_user()
+        bar = factories.create_bar()
+        brewery = factories.create_brewery()
+        self.beer1 = factories.create_beer(
+            bar=bar, brewery=brewery, name="IPA")
+        self.beer2 = factories.create_beer(
+            bar=bar, brewery=brewery, name="Mild")
+        factories.star_beer(user=self.user, beer=self.beer1)
+        factories.rate_beer(user=self.user, beer=self.beer1, rating=4)
+        factories.rate_beer(user=self.user, beer=self.beer2, rating=2)
+
+    def test_loads_and_caches_state(self):
+        expected = {self.beer1.pk: (True, 4), self.beer2.pk: (False, 2)}
+
+        with self.assertNumQueries(2):
+            self.assertEqual(user_state.get_user_state(self.user), expected)
+        with self.assertNumQueries(0):
+            self.assertEqual(user_state.get_user_state(self.user), expected)
+
+    def test_reloaded_after_change(self):
+        user_state.get_user_state(self.user)
+        StarBeer.objects.create(user=self.user, beer=self.beer2)
+
+        user_state.user_state_changed(self.user)
+
+        self.assertEqual(
+            user_state.get_user_state(self.user),
+            {self.beer1.pk: (True, 4), self.beer2.pk: (True, 2)},
+        )
+
+    def test_reloaded_after_rows_are_saved_or_deleted(self):
+        user_state.get_user_state(self.user)
+        StarBeer.objects.create(user=self.user, beer=self.beer2)
+        BeerRating.objects.get(user=self.user, beer=self.beer1).delete()
+
+        self.assertEqual(
+            user_state.get_user_state(self.user),
+            {self.beer1.pk: (True, None), self.beer2.pk: (True, 2)},
+        )
+
+    def test_state_loaded_during_a_write_is_not_used_after_it(self):
+        # Loaded under the old version while the write was committing
+        version = user_state.user_state_version(self.user)
+        stale = user_state.load_user_state(self.user.pk)
+        StarBeer.objects.create(user=self.user, beer=self.beer2)
+        user_state.bump_user_state_version(self.user.pk)
+        cache.set(user_state.cache_key(self.user.pk), (version, stale))
+
+        self.assertEqual(
+            user_state.get_user_state(self.user)[self.beer2.pk], (True, 2))
+
+    def test_apply_user_state(self):
+        beers = user_state.apply_user_state(
+            [self.beer1, self.beer2], {self.beer1.pk: (True, 4)})
+
+        self.assertEqual(
+            [(beer.starred, beer.rating) for beer in beers],
+            [(True, 4), (False, None)],
+        )
+
+    def test_version_changes_now_and_on_commit(self):
+        version = user_state.user_state_version(self.user)
+
+        with self.captureOnCommitCallbacks(execute=True):
+            user_state.user_state_changed(self.user)
+            changed = user_state.user_state_version(self.user)
+
+        self.assertGreater(changed, version)
+        self.assertGreater(user_state.user_state_version(self.user), changed)
+
+    def test_every_change_gets_its_own_version(self):
+        # As when two writers commit at once; neither can reuse the other's
+        # version for a different state
+        versions = {user_state.user_state_version(self.user)}
+        with self.captureOnCommitCallbacks(execute=True):
+            user_state.user_state_changed(self.user)
+            versions.add(user_state.user_state_version(self.user))
+            user_state.user_state_changed(self.user)
+            versions.add(user_state.user_state_version(self.user))
+        versions.add(user_state.user_state_version(self.user))
+
+        self.assertEqual(len(versions), 4)
+
+    def test_version_survives_state_eviction(self):
+        user_state.get_user_state(self.user)
+        version = user_state.user_state_version(self.user)
+
+        cache.delete(user_state.cache_key(self.user.pk))
+        user_state.get_user_state(self.user)
+
+        self.assertEqual(user_state.user_state_version(self.user), version)
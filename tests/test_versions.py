@@ -0,0 +1,37 @@
+from django.core.cache import cache
+from django.test import TestCase
+
+from beerfest import versions
+from tests import factories
+
+
+class TestCatalogueVersion(TestCase):
+    def setUp(self):
+        cache.clear()
+
+    def test_version_is_stable_until_bumped(self):
+        version = versions.catalogue_version()
+
+        self.assertEqual(versions.catalogue_version(), version)
+        self.assertEqual(versions.bump_catalogue_version(), version + 1)
+        self.assertEqual(versions.catalogue_version(), version + 1)
+
+    def test_bump_after_eviction_starts_a_new_version(self):
+        cache.set(versions.CATALOGUE_VERSION_KEY, 1)
+        version = versions.bump_catalogue_version()
+        cache.clear()
+
+        self.assertGreater(versions.bump_catalogue_version(), version)
+
+    def test_catalogue_changes_bump_version(self):
+        version = versions.catalogue_version()
+        brewery = factories.create_brewery()
+        self.assertGreater(versions.catalogue_version(), version)
+
+        version = versions.catalogue_version()
+        factories.create_beer(brewery=brewery)
+        self.assertGreater(versions.catalogue_version(), version)
+
+        version = versions.catalogue_version()
+        brewery.delete()
+        self.assertGreater(versions.catalogue_version(), version)
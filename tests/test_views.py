@@ -1,20 +1,39 @@
+import json
+import tempfile
+from unittest import mock
+from urllib.parse import parse_qs, urlsplit
+
 from django.contrib.auth.models import AnonymousUser, Permission
 from django.contrib.contenttypes.models import ContentType
+from django.core.cache import cache
 from django.core.exceptions import PermissionDenied
+from django.db import connection
 from django.http import Http404
-from django.test import TestCase, RequestFactory
+from django.test import Client, TestCase, RequestFactory, override_settings
+from django.test.utils import CaptureQueriesContext
 from django.urls import reverse
 
 from rest_framework import status
 from rest_framework.test import APITestCase
 
-from beerfest import views
-from beerfest.models import Bar, Brewery, StarBeer, BeerRating
+from beerfest import catalogue, frozen, page_cache, user_state, views
+from beerfest.models import Bar, Brewery, Beer, StarBeer, BeerRating
+from beerfest.renderers import ColumnarJSONRenderer
+from beerfest.versions import beer_version
 from tests import factories
+from tests.concurrency import ConcurrentTestCase
+
+TAMPERED_CURSORS = [
+    # A string for the bar id
+    "WzAsWyJ4IiwiYSIsMSwiYiIsMV1d",
+    # A bar id too large for the database
+    "WzAsWzEwMDAwMDAwMDAwMDAwMDAwMDAwMDAwMDAwMDAwMDAsImEiLDEsImIiLDFdXQ",
+]
 
 
 class BaseViewTest(TestCase):
     def setUp(self):
+        cache.clear()
         self.login_url = "/accounts/login/"
         self.factory = RequestFactory()
         self.user = factories.create_user()
@@ -69,7 +88,7 @@ class TestUserProfileView(BaseViewTest):
         self.assertIn("starred_beers", context_data)
         self.assertCountEqual(context_data["starred_beers"], starred_beers)
 
-        rated_list = list(rated_beers.values_list("name", "rating"))
+        rated_list = [(beer.name, beer.rating) for beer in rated_beers]
         self.assertCountEqual(rated_list, [("IPA", 2), ("Bitter", 4)])
 
     def test_response_context_data_contains_expected_beers_after(self):
@@ -86,9 +105,72 @@ class TestUserProfileView(BaseViewTest):
             response.context_data["starred_beers"], starred_beers)
 
         rated_beers = response.context_data["rated_beers"]
-        rated_list = list(rated_beers.values_list("name", "rating"))
+        rated_list = [(beer.name, beer.rating) for beer in rated_beers]
         self.assertCountEqual(rated_list, [("IPA", 2), ("Bitter", 4)])
 
+    def test_profile_beers_take_one_query(self):
+        self.create_test_data()
+        request = self.factory.get("")
+        request.user = self.user
+        view = self.setup_view(request)
+        view.object = None
+
+        with self.assertNumQueries(1):
+            context_data = view.get_context_data()
+            beers = [
+                (beer.name, beer.bar.name, beer.brewery.name, beer.starred,
+                 beer.rating)
+                for beer in context_data["beer_list"]
+            ]
+
+        self.assertEqual(beers, [
+            ("Bitter", "Test Bar", "Test Brew Co", False, 4),
+            ("IPA", "Test Bar", "Test Brew Co", True, 2),
+            ("Mild", "Test Bar", "Test Brew Co", True, None),
+        ])
+
+    def test_profile_beers_are_paginated_by_cursor(self):
+        self.create_test_data()
+        request = self.factory.get("")
+        request.user = self.user
+        view = self.setup_view(request)
+        view.object = None
+        view.paginate_by = 2
+
+        context_data = view.get_context_data()
+        page = context_data["page_obj"]
+        self.assertEqual(
+            context_data["beer_list"], [self.beer3, self.beer2])
+        self.assertTrue(context_data["is_paginated"])
+
+        request = self.factory.get("", {"cursor": page.next_token})
+        request.user = self.user
+        view = self.setup_view(request)
+        view.object = None
+        view.paginate_by = 2
+        context_data = view.get_context_data()
+
+        self.assertEqual(context_data["beer_list"], [self.beer1])
+        self.assertEqual(context_data["starred_beers"], [self.beer1])
+        self.assertEqual(context_data["rated_beers"], [])
+        self.assertFalse(context_data["page_obj"].has_next())
+
+    def test_invalid_cursor_raises_404(self):
+        request = self.factory.get("", {"cursor": "nonsense"})
+        request.user = self.user
+        view = self.setup_view(request)
+        view.object = None
+
+        with self.assertRaises(Http404):
+            view.get_context_data()
+
+    def test_tampered_cursor_returns_404(self):
+        self.client.force_login(self.user)
+        for cursor in TAMPERED_CURSORS:
+            response = self.client.get(
+                "/accounts/profile/", {"cursor": cursor})
+            self.assertEqual(response.status_code, 404)
+
     def test_user_object_variable_is_logged_in_user(self):
         request = self.factory.get("")
         request.user = self.user
@@ -144,12 +226,106 @@ class TestUserProfileView(BaseViewTest):
         self.assertEqual(user, self.user)
         self.assertCountEqual(beer_list, starred_beers)
 
-        rated_list = list(rated_beers.values_list("name", "rating"))
+        rated_list = [(beer.name, beer.rating) for beer in rated_beers]
         self.assertCountEqual(rated_list, [("IPA", 2), ("Bitter", 4)])
 
 
+class TestNewUserProfileView(BaseViewTest):
+    def setUp(self):
+        super().setUp()
+        bar = factories.create_bar()
+        brewery = factories.create_brewery()
+        self.mild = factories.create_beer(
+            bar=bar, brewery=brewery, name="Mild")
+        self.ipa = factories.create_beer(
+            bar=bar, brewery=brewery, name="IPA")
+        self.bitter = factories.create_beer(
+            bar=bar, brewery=brewery, name="Bitter")
+        factories.star_beer(user=self.user, beer=self.mild)
+        factories.star_beer(user=self.user, beer=self.ipa)
+        factories.rate_beer(user=self.user, beer=self.ipa, rating=2)
+        factories.rate_beer(user=self.user, beer=self.bitter, rating=4)
+
+    def get(self, data=None, **extra):
+        request = self.factory.get("/api/profile/", data, **extra)
+        request.user = self.user
+        return views.NewUserProfileView.as_view()(request)
+
+    def beer_urls(self, *beers):
+        return [f"http://testserver/beers/{beer.pk}/" for beer in beers]
+
+    def test_links_starred_and_rated_beers(self):
+        user_state.get_user_state(self.user)
+
+        with self.assertNumQueries(2):
+            response = self.get()
+
+        self.assertEqual(response.data["username"], "Mx Test")
+        self.assertEqual(
+            response.data["starred_beers"],
+            self.beer_urls(self.ipa, self.mild),
+        )
+        self.assertEqual(
+            response.data["rated_beers"],
+            self.beer_urls(self.bitter, self.ipa),
+        )
+        self.assertNotIn("next", response.data)
+
+    def test_paginated_by_cursor(self):
+        user_state.get_user_state(self.user)
+
+        with self.assertNumQueries(1):
+            response = self.get({"page_size": 2})
+
+        self.assertEqual(
+            response.data["starred_beers"], self.beer_urls(self.ipa))
+        self.assertEqual(
+            response.data["rated_beers"],
+            self.beer_urls(self.bitter, self.ipa),
+        )
+        self.assertIsNone(response.data["previous"])
+
+        query = parse_qs(urlsplit(response.data["next"]).query)
+        response = self.get({"page_size": 2, "cursor": query["cursor"][0]})
+
+        self.assertEqual(
+            response.data["starred_beers"], self.beer_urls(self.mild))
+        self.assertEqual(response.data["rated_beers"], [])
+        self.assertIsNone(response.data["next"])
+        self.assertIsNotNone(response.data["previous"])
+
+    def test_etag_changes_with_user_state(self):
+        etag = self.get()["ETag"]
+
+        with self.assertNumQueries(0):
+            response = self.get(HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 304)
+
+        factories.star_beer(user=self.user, beer=self.bitter)
+        user_state.user_state_changed(self.user)
+        response = self.get(HTTP_IF_NONE_MATCH=etag)
+
+        self.assertEqual(response.status_code, 200)
+        self.assertNotEqual(response["ETag"], etag)
+
+    def test_etag_changes_when_stars_are_edited_directly(self):
+        star = factories.star_beer(user=self.user, beer=self.bitter)
+        etag = self.get()["ETag"]
+
+        # As the admin does, without the views' own version bump
+        star.delete()
+        response = self.get(HTTP_IF_NONE_MATCH=etag)
+
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(
+            response.data["starred_beers"],
+            self.beer_urls(self.ipa, self.mild),
+        )
+
+
 class TestBarViewSet(APITestCase):
     def setUp(self):
+        cache.clear()
         self.user = factories.create_user()
         self.admin = factories.create_user("Test")
         perms = Permission.objects.filter(
@@ -163,6 +339,10 @@ class TestBarViewSet(APITestCase):
         response = self.client.get("/bars/1/")
         self.assertEqual(response.data, {"id": 1, "name": "Test Bar"})
 
+    def test_GET_bar_out_of_range_id(self):
+        response = self.client.get(f"/api/bars/{10 ** 20}/")
+        self.assertEqual(status.HTTP_404_NOT_FOUND, response.status_code)
+
     def test_GET_bar_list(self):
         response = self.client.get("/bars/")
         self.assertEqual(
@@ -170,6 +350,53 @@ class TestBarViewSet(APITestCase):
             [{"id": 1, "name": "Test Bar"}, {"id": 2, "name": "Test Bar 2"}],
         )
 
+    def test_GET_bar_list_sparse_fields(self):
+        response = self.client.get("/bars/", {"fields": "name"})
+
+        self.assertEqual(
+            response.data, [{"name": "Test Bar"}, {"name": "Test Bar 2"}])
+
+    def test_GET_bar_list_as_columns(self):
+        response = self.client.get("/bars/", {"format": "columns"})
+
+        self.assertEqual(json.loads(response.content), {
+            "columns": ["id", "name"],
+            "rows": [[1, "Test Bar"], [2, "Test Bar 2"]],
+        })
+
+    def test_GET_bar_list_not_modified(self):
+        response = self.client.get("/bars/")
+        etag = response["ETag"]
+
+        with self.assertNumQueries(0):
+            response = self.client.get("/bars/", HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(status.HTTP_304_NOT_MODIFIED, response.status_code)
+
+        self.bar2.name = "Renamed Bar"
+        self.bar2.save()
+        response = self.client.get("/bars/", HTTP_IF_NONE_MATCH=etag)
+
+        self.assertEqual(status.HTTP_200_OK, response.status_code)
+        self.assertNotEqual(response["ETag"], etag)
+
+    def test_GET_bar_list_etag_depends_on_format(self):
+        etag = self.client.get("/bars/")["ETag"]
+
+        response = self.client.get(
+            "/bars/", HTTP_IF_NONE_MATCH=etag,
+            HTTP_ACCEPT=ColumnarJSONRenderer.media_type,
+        )
+
+        self.assertEqual(status.HTTP_200_OK, response.status_code)
+        self.assertNotEqual(response["ETag"], etag)
+        self.assertEqual(
+            status.HTTP_304_NOT_MODIFIED,
+            self.client.get(
+                "/bars/", {"format": "columns"},
+                HTTP_IF_NONE_MATCH=response["ETag"],
+            ).status_code,
+        )
+
     def test_PATCH_bar(self):
         self.client.force_authenticate(user=self.admin)
         response = self.client.patch(
@@ -257,6 +484,7 @@ class TestBarViewSet(APITestCase):
 
 class TestBreweryViewSet(APITestCase):
     def setUp(self):
+        cache.clear()
         self.user = factories.create_user()
         self.admin = factories.create_user("Test")
         perms = Permission.objects.filter(
@@ -284,6 +512,14 @@ class TestBreweryViewSet(APITestCase):
             ],
         )
 
+    def test_GET_brewery_not_modified(self):
+        response = self.client.get("/breweries/1/")
+
+        with self.assertNumQueries(0):
+            response = self.client.get(
+                "/breweries/1/", HTTP_IF_NONE_MATCH=response["ETag"])
+        self.assertEqual(status.HTTP_304_NOT_MODIFIED, response.status_code)
+
     def test_PATCH_brewery(self):
         self.client.force_authenticate(user=self.admin)
         response = self.client.patch(
@@ -379,6 +615,242 @@ class TestBreweryViewSet(APITestCase):
         self.assertEqual(status.HTTP_403_FORBIDDEN, response.status_code)
 
 
+class TestBeerViewSet(APITestCase):
+    def setUp(self):
+        cache.clear()
+        self.user = factories.create_user()
+        self.admin = factories.create_user("Test")
+        perms = Permission.objects.filter(
+            content_type=ContentType.objects.get_for_model(Beer)
+        )
+        self.admin.user_permissions.set(list(perms))
+        self.bar = factories.create_bar()
+        self.brewery = factories.create_brewery()
+        self.beer1 = factories.create_beer(
+            bar=self.bar, brewery=self.brewery, name="IPA", number=2)
+        self.beer2 = factories.create_beer(
+            bar=self.bar, brewery=self.brewery, name="Mild")
+        self.beer3 = factories.create_beer(
+            bar=self.bar, brewery=self.brewery, name="Stout", number=1)
+
+    def test_GET_beer(self):
+        response = self.client.get("/api/beers/1/")
+
+        self.assertEqual(response.data["name"], "IPA")
+        self.assertEqual(
+            response.data["bar"], {"id": 1, "name": "Test Bar"})
+        self.assertEqual(
+            response.data["brewery"],
+            {"id": 1, "name": "Test Brew Co", "location": "Testville"},
+        )
+        self.assertIsNone(response.data["starred"])
+
+    def test_GET_beer_list_follows_default_ordering(self):
+        response = self.client.get("/api/beers/")
+
+        self.assertEqual(
+            [beer["name"] for beer in response.data["results"]],
+            ["Stout", "IPA", "Mild"],
+        )
+        self.assertIsNone(response.data["next"])
+        self.assertIsNone(response.data["previous"])
+
+    def test_GET_beer_list_sparse_fields(self):
+        with CaptureQueriesContext(connection) as queries:
+            response = self.client.get(
+                "/api/beers/", {"fields": "id,name,bar"})
+
+        self.assertEqual(response.data["results"][0], {
+            "id": self.beer3.pk, "name": "Stout",
+            "bar": {"id": 1, "name": "Test Bar"},
+        })
+        self.assertNotIn("tasting_notes", queries[0]["sql"])
+        self.assertNotIn("location", queries[0]["sql"])
+
+    def test_GET_beer_out_of_range_id(self):
+        for pk in [10 ** 20, 0]:
+            response = self.client.get(f"/api/beers/{pk}/")
+            self.assertEqual(status.HTTP_404_NOT_FOUND, response.status_code)
+
+    def test_GET_beer_exclude_fields(self):
+        response = self.client.get(
+            f"/api/beers/{self.beer1.pk}/",
+            {"exclude": "tasting_notes,notes"},
+        )
+
+        self.assertEqual(response.data["name"], "IPA")
+        self.assertNotIn("notes", response.data)
+        self.assertIn("avg_rating", response.data)
+
+    def test_GET_beer_list_as_columns(self):
+        response = self.client.get(
+            "/api/beers/", {"format": "columns", "fields": "id,name"})
+
+        self.assertEqual(json.loads(response.content)["results"], {
+            "columns": ["id", "name"],
+            "rows": [
+                [self.beer3.pk, "Stout"], [self.beer1.pk, "IPA"],
+                [self.beer2.pk, "Mild"],
+            ],
+        })
+
+    def test_GET_beer_list_uses_one_query(self):
+        # Once the facet index is cached
+        self.client.get("/api/beers/")
+        with self.assertNumQueries(1):
+            self.client.get("/api/beers/")
+
+    def test_GET_beer_list_with_user_state_uses_two_queries(self):
+        self.client.force_authenticate(user=self.user)
+        self.client.get("/api/beers/")
+
+        # The beers with the user's state and stats, then the starred facet
+        with self.assertNumQueries(2):
+            response = self.client.get("/api/beers/")
+        self.assertFalse(response.data["results"][0]["starred"])
+
+    @override_settings(BEERFEST_IN_PROCESS_CATALOGUE=True)
+    def test_GET_beer_list_from_catalogue(self):
+        catalogue._catalogue = None
+        factories.star_beer(user=self.user, beer=self.beer2)
+        self.client.force_authenticate(user=self.user)
+        expected = self.client.get("/api/beers/", {"page_size": 2}).data
+
+        with self.assertNumQueries(0):
+            response = self.client.get("/api/beers/", {"page_size": 2})
+        self.assertEqual(response.data["results"], expected["results"])
+
+        response = self.client.get(response.data["next"])
+        self.assertEqual(
+            [beer["name"] for beer in response.data["results"]], ["Mild"])
+        self.assertTrue(response.data["results"][0]["starred"])
+
+        response = self.client.get("/api/beers/", {"starred": "1"})
+        starred = response.data["facets"]["starred"]
+        self.assertEqual(
+            [beer["name"] for beer in response.data["results"]], ["Mild"])
+        self.assertEqual(
+            [(facet["value"], facet["count"]) for facet in starred],
+            [(True, 1), (False, 2)],
+        )
+
+    def test_GET_beer_list_pages(self):
+        response = self.client.get("/api/beers/", {"page_size": 2})
+        self.assertEqual(
+            [beer["name"] for beer in response.data["results"]],
+            ["Stout", "IPA"],
+        )
+
+        response = self.client.get(response.data["next"])
+        self.assertEqual(
+            [beer["name"] for beer in response.data["results"]], ["Mild"])
+        self.assertIsNone(response.data["next"])
+
+        response = self.client.get(response.data["previous"])
+        self.assertEqual(
+            [beer["name"] for beer in response.data["results"]],
+            ["Stout", "IPA"],
+        )
+
+    def test_GET_beer_list_invalid_cursor(self):
+        response = self.client.get("/api/beers/", {"cursor": "nonsense"})
+        self.assertEqual(status.HTTP_404_NOT_FOUND, response.status_code)
+
+    def test_GET_beer_list_tampered_cursor(self):
+        for cursor in TAMPERED_CURSORS:
+            response = self.client.get("/api/beers/", {"cursor": cursor})
+            self.assertEqual(status.HTTP_404_NOT_FOUND, response.status_code)
+
+    def test_GET_beer_list_annotates_user_state(self):
+        factories.star_beer(user=self.user, beer=self.beer1)
+        factories.rate_beer(user=self.user, beer=self.beer1, rating=4)
+        self.client.force_authenticate(user=self.user)
+
+        response = self.client.get("/api/beers/")
+        results = {beer["name"]: beer for beer in response.data["results"]}
+
+        self.assertTrue(results["IPA"]["starred"])
+        self.assertEqual(results["IPA"]["rating"], 4)
+        self.assertEqual(results["IPA"]["avg_rating"], 4.0)
+        self.assertFalse(results["Mild"]["starred"])
+        self.assertIsNone(results["Mild"]["rating"])
+
+    def test_GET_beer_list_filters_by_facets(self):
+        bar2 = factories.create_bar("Test Bar 2")
+        factories.create_beer(bar=bar2, brewery=self.brewery, name="Porter")
+
+        response = self.client.get(
+            "/api/beers/", {"bar": self.bar.pk, "abv": "unknown"})
+        bars = {
+            facet["value"]: facet["count"]
+            for facet in response.data["facets"]["bar"]
+        }
+
+        self.assertEqual(
+            [beer["name"] for beer in response.data["results"]],
+            ["Stout", "IPA", "Mild"],
+        )
+        self.assertEqual(bars, {self.bar.pk: 3, bar2.pk: 1})
+        self.assertNotIn("starred", response.data["facets"])
+
+    def test_GET_beer_list_ignores_facet_ids_out_of_range(self):
+        response = self.client.get(
+            "/api/beers/", {"brewery": "99999999999999999999999"})
+
+        self.assertEqual(status.HTTP_200_OK, response.status_code)
+        self.assertEqual(len(response.data["results"]), 3)
+
+    def test_GET_beer_list_filters_by_starred(self):
+        factories.star_beer(user=self.user, beer=self.beer2)
+        self.client.force_authenticate(user=self.user)
+
+        response = self.client.get("/api/beers/", {"starred": "1"})
+        starred = response.data["facets"]["starred"]
+
+        self.assertEqual(
+            [beer["name"] for beer in response.data["results"]], ["Mild"])
+        self.assertEqual(
+            [(facet["value"], facet["count"]) for facet in starred],
+            [(True, 1), (False, 2)],
+        )
+
+    def test_GET_beer_search(self):
+        factories.create_beer(
+            bar=self.bar, brewery=self.brewery, name="Milk Stout")
+
+        response = self.client.get("/api/beers/search/", {"q": "stout"})
+
+        self.assertEqual(status.HTTP_200_OK, response.status_code)
+        self.assertCountEqual(
+            [beer["name"] for beer in response.data["results"]],
+            ["Stout", "Milk Stout"],
+        )
+
+    def test_GET_beer_search_without_query(self):
+        response = self.client.get("/api/beers/search/")
+
+        self.assertEqual(status.HTTP_200_OK, response.status_code)
+        self.assertEqual(response.data["results"], [])
+
+    def test_POST_beer(self):
+        self.client.force_authenticate(user=self.admin)
+        response = self.client.post("/api/beers/", data={
+            "bar_id": 1, "brewery_id": 1, "name": "Porter", "number": 3,
+        })
+
+        self.assertEqual(status.HTTP_201_CREATED, response.status_code)
+        self.assertEqual(Beer.objects.get(name="Porter").number, 3)
+
+    def test_POST_beer_unauthorised(self):
+        self.client.force_authenticate(user=self.user)
+        response = self.client.post("/api/beers/", data={
+            "bar_id": 1, "brewery_id": 1, "name": "Porter", "number": 3,
+        })
+
+        self.assertEqual(status.HTTP_403_FORBIDDEN, response.status_code)
+        self.assertFalse(Beer.objects.filter(name="Porter").exists())
+
+
 class TestBeerListView(BaseViewTest):
     view_class = views.BeerListView
 
@@ -436,18 +908,32 @@ class TestBeerListView(BaseViewTest):
         self.assertTemplateUsed(response, "beerfest/beer_list.html")
         self.assertCountEqual(beer_list, beers)
 
-    def test_get_queryset_annotates_starred_status_if_user_logged_in(self):
+    def test_beer_list_has_starred_status_if_user_logged_in(self):
         self.create_beers()
         factories.star_beer(user=self.user, beer=self.beer1)
+        factories.rate_beer(user=self.user, beer=self.beer2, rating=3)
 
         request = self.factory.get("")
         request.user = self.user
         view = self.setup_view(request)
-        qs = view.get_queryset()
+        beer_list = view.get(request).context_data["beer_list"]
+
+        self.assertEqual(
+            [(beer.starred, beer.rating) for beer in beer_list],
+            [(True, None), (False, 3), (False, None)],
+        )
 
-        self.assertEqual(qs[0].starred, True)
-        self.assertEqual(qs[1].starred, False)
-        self.assertEqual(qs[2].starred, False)
+    def test_beer_list_reads_user_state_from_cache(self):
+        self.create_beers()
+        request = self.factory.get("")
+        request.user = self.user
+        view = self.setup_view(request)
+        view.get(request)
+
+        # The beers and the facet index's starred beers only
+        view = self.setup_view(request)
+        with self.assertNumQueries(2):
+            view.get(request)
 
     def test_GETs_annotated_beer_list_context_variable(self):
         self.create_beers()
@@ -466,80 +952,297 @@ class TestBeerListView(BaseViewTest):
         self.assertEqual(beer_list[1].starred, False)
         self.assertEqual(beer_list[2].starred, False)
 
-    def test_beer_annotations_do_not_cause_duplicates(self):
-        # Some types of DB queries result in duplicates - eg repeating a beer
-        # for each value of starred. Test that we haven't formed such a query.
+    def test_beer_list_is_paginated_by_cursor(self):
         self.create_beers()
-        factories.star_beer(user=self.user, beer=self.beer1)
-        factories.star_beer(user=self.user, beer=self.beer2)
-
-        user2 = factories.create_user("A Test")
-        factories.star_beer(user=user2, beer=self.beer1)
-        factories.star_beer(user=user2, beer=self.beer3)
+        bar2 = factories.create_bar("Test Bar 2")
+        beer4 = factories.create_beer(bar=bar2, name="Porter", number=1)
+        beer5 = factories.create_beer(bar=bar2, name="Bitter")
 
         request = self.factory.get("")
-        request.user = self.user
         view = self.setup_view(request)
-        qs = view.get_queryset()
+        view.paginate_by = 2
+        response = view.get(request)
+        page = response.context_data["page_obj"]
 
-        self.assertEqual(len(qs), 3)
+        self.assertEqual(
+            list(response.context_data["beer_list"]), [self.beer1, self.beer2])
+        self.assertTrue(response.context_data["is_paginated"])
+        self.assertFalse(page.has_previous())
 
-        request.user = user2
+        request = self.factory.get("", {"cursor": page.next_token})
         view = self.setup_view(request)
-        qs = view.get_queryset()
+        view.paginate_by = 2
+        response = view.get(request)
+        page = response.context_data["page_obj"]
 
-        self.assertEqual(len(qs), 3)
+        self.assertEqual(
+            list(response.context_data["beer_list"]), [self.beer3, beer4])
 
+        request = self.factory.get("", {"cursor": page.next_token})
+        view = self.setup_view(request)
+        view.paginate_by = 2
+        response = view.get(request)
+        page = response.context_data["page_obj"]
 
-class TestBeerDetailView(BaseViewTest):
-    view_class = views.BeerDetailView
+        self.assertEqual(list(response.context_data["beer_list"]), [beer5])
+        self.assertFalse(page.has_next())
 
-    def create_beers(self):
-        bar = factories.create_bar()
-        brewery = factories.create_brewery()
-        beer1 = factories.create_beer(bar=bar, brewery=brewery, name="IPA")
-        beer2 = factories.create_beer(bar=bar, brewery=brewery, name="Mild")
+        request = self.factory.get("", {"cursor": page.previous_token})
+        view = self.setup_view(request)
+        view.paginate_by = 2
+        response = view.get(request)
 
-        return (beer1, beer2)
+        self.assertEqual(
+            list(response.context_data["beer_list"]), [self.beer3, beer4])
 
-    def test_GETs_correct_beer_context_variable(self):
-        beer1, beer2 = self.create_beers()
-        request = self.factory.get("")
-        view = self.setup_view(request, pk=2)
+    @override_settings(BEERFEST_IN_PROCESS_CATALOGUE=True)
+    def test_beer_list_from_catalogue(self):
+        catalogue._catalogue = None
+        self.create_beers()
+        factories.star_beer(user=self.user, beer=self.beer2)
+        request = self.factory.get("", {"starred": "1"})
+        request.user = self.user
+        self.setup_view(request).get(request)
 
-        response = view.get(request)
+        view = self.setup_view(request)
+        with self.assertNumQueries(0):
+            response = view.get(request)
+        beer_list = response.context_data["beer_list"]
 
-        self.assertIn("beer", response.context_data)
-        self.assertEqual(response.context_data["beer"], beer2)
+        self.assertEqual([beer.pk for beer in beer_list], [self.beer2.pk])
+        self.assertTrue(beer_list[0].starred)
+        self.assertEqual(
+            response.context_data["facets"]["starred"][0]["count"], 1)
+        self.assertTemplateUsed(
+            self.client.get("/beers/"), "beerfest/beer_list.html")
 
-    def test_get_object_returns_beer_for_given_pk(self):
-        beer1, beer2 = self.create_beers()
-        request = self.factory.get("")
+    @override_settings(BEERFEST_IN_PROCESS_CATALOGUE=True)
+    def test_beer_list_from_catalogue_follows_changes(self):
+        catalogue._catalogue = None
+        self.create_beers()
+        self.client.get("/beers/")
 
-        view = self.setup_view(request, pk=1)
-        context_object1 = view.get_object()
+        self.beer2.delete()
+        beer_list = self.client.get("/beers/").context["beer_list"]
 
-        view = self.setup_view(request, pk=2)
-        context_object2 = view.get_object()
+        self.assertEqual(
+            [beer.pk for beer in beer_list], [self.beer1.pk, self.beer3.pk])
 
-        self.assertEqual(context_object1, beer1)
-        self.assertEqual(context_object2, beer2)
+    def test_facets_filter_beer_list(self):
+        self.create_beers()
+        self.beer2.reserved = True
+        self.beer2.save()
 
-    def test_get_context_data_returns_context_with_starred_status(self):
-        beer1, beer2 = self.create_beers()
-        factories.star_beer(user=self.user, beer=beer2)
-        request = self.factory.get("")
-        request.user = self.user
+        request = self.factory.get("", {"reserved": "yes"})
+        view = self.setup_view(request)
+        response = view.get(request)
+        reserved = response.context_data["facets"]["reserved"]
 
-        view = self.setup_view(request, pk=1)
-        view.object = beer1
+        self.assertEqual(
+            list(response.context_data["beer_list"]), [self.beer2])
+        self.assertEqual(reserved[0], {
+            "value": True, "label": "Reserved", "count": 1, "selected": True,
+        })
+        self.assertEqual(reserved[1]["count"], 2)
+
+    def test_facet_ids_out_of_range_are_ignored(self):
+        self.create_beers()
+
+        response = self.client.get(
+            "/beers/", {"bar": "99999999999999999999999"})
+
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(len(response.context["beer_list"]), 3)
+
+    def test_facet_counts_are_limited_to_search_results(self):
+        self.create_beers()
+
+        request = self.factory.get("", {"q": "stout"})
+        view = self.setup_view(request)
+        response = view.get(request)
+        abv = response.context_data["facets"]["abv"]
+
+        self.assertEqual(
+            {facet["value"]: facet["count"] for facet in abv}["unknown"], 1)
+
+    def test_beer_list_not_modified(self):
+        self.create_beers()
+        etag = self.client.get("/beers/")["ETag"]
+
+        with self.assertNumQueries(0):
+            response = self.client.get("/beers/", HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 304)
+
+        self.beer1.name = "Renamed IPA"
+        self.beer1.save()
+        response = self.client.get("/beers/", HTTP_IF_NONE_MATCH=etag)
+
+        self.assertEqual(response.status_code, 200)
+
+    def test_beer_list_etag_changes_with_user_state(self):
+        self.create_beers()
+        self.client.force_login(self.user)
+        etag = self.client.get("/beers/")["ETag"]
+
+        # Only the session and user are loaded
+        with self.assertNumQueries(2):
+            response = self.client.get("/beers/", HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 304)
+
+        self.client.put(f"/beers/{self.beer1.pk}/star/")
+        response = self.client.get("/beers/", HTTP_IF_NONE_MATCH=etag)
+
+        self.assertEqual(response.status_code, 200)
+        self.assertTrue(response.context["beer_list"][0].starred)
+
+    @override_settings(BEERFEST_ANONYMOUS_PAGE_CACHE=True)
+    def test_beer_list_page_cached_for_anonymous_users(self):
+        self.create_beers()
+        response = self.client.get("/beers/")
+
+        with self.assertNumQueries(0):
+            cached = self.client.get("/beers/")
+        self.assertEqual(cached.content, response.content)
+
+        self.beer1.name = "Renamed IPA"
+        self.beer1.save()
+        self.client.get("/beers/")
+
+        self.assertEqual(
+            page_cache.counters(["list"]),
+            {"list": {"hits": 1, "misses": 2}},
+        )
+
+    @override_settings(BEERFEST_ANONYMOUS_PAGE_CACHE=True)
+    def test_beer_list_page_not_cached_for_logged_in_users(self):
+        self.create_beers()
+        self.client.force_login(self.user)
+        self.client.get("/beers/")
+        response = self.client.get("/beers/")
+
+        self.assertIsNotNone(response.context)
+        self.assertEqual(
+            page_cache.counters(["list"]),
+            {"list": {"hits": 0, "misses": 0}},
+        )
+
+    def test_search_query_filters_beer_list(self):
+        self.create_beers()
+
+        request = self.factory.get("", {"q": "stout"})
+        view = self.setup_view(request)
+        response = view.get(request)
+
+        self.assertEqual(
+            list(response.context_data["beer_list"]), [self.beer3])
+        self.assertEqual(response.context_data["query"], "stout")
+        self.assertFalse(response.context_data["is_paginated"])
+
+    def test_invalid_cursor_raises_404(self):
+        request = self.factory.get("", {"cursor": "nonsense"})
+        view = self.setup_view(request)
+
+        with self.assertRaises(Http404):
+            view.get(request)
+
+    def test_tampered_cursor_returns_404(self):
+        self.create_beers()
+        for cursor in TAMPERED_CURSORS:
+            response = self.client.get("/beers/", {"cursor": cursor})
+            self.assertEqual(response.status_code, 404)
+
+    def test_beer_annotations_do_not_cause_duplicates(self):
+        # Some types of DB queries result in duplicates - eg repeating a beer
+        # for each value of starred. Test that we haven't formed such a query.
+        self.create_beers()
+        factories.star_beer(user=self.user, beer=self.beer1)
+        factories.star_beer(user=self.user, beer=self.beer2)
+
+        user2 = factories.create_user("A Test")
+        factories.star_beer(user=user2, beer=self.beer1)
+        factories.star_beer(user=user2, beer=self.beer3)
+
+        request = self.factory.get("")
+        request.user = self.user
+        view = self.setup_view(request)
+        qs = view.get_queryset()
+
+        self.assertEqual(len(qs), 3)
+
+        request.user = user2
+        view = self.setup_view(request)
+        qs = view.get_queryset()
+
+        self.assertEqual(len(qs), 3)
+
+
+class TestBeerDetailView(BaseViewTest):
+    view_class = views.BeerDetailView
+
+    def create_beers(self):
+        bar = factories.create_bar()
+        brewery = factories.create_brewery()
+        beer1 = factories.create_beer(bar=bar, brewery=brewery, name="IPA")
+        beer2 = factories.create_beer(bar=bar, brewery=brewery, name="Mild")
+
+        return (beer1, beer2)
+
+    def test_GETs_correct_beer_context_variable(self):
+        beer1, beer2 = self.create_beers()
+        request = self.factory.get("")
+        view = self.setup_view(request, pk=2)
+
+        response = view.get(request)
+
+        self.assertIn("beer", response.context_data)
+        self.assertEqual(response.context_data["beer"], beer2)
+
+    def test_get_object_returns_beer_for_given_pk(self):
+        beer1, beer2 = self.create_beers()
+        request = self.factory.get("")
+
+        view = self.setup_view(request, pk=1)
+        context_object1 = view.get_object()
+
+        view = self.setup_view(request, pk=2)
+        context_object2 = view.get_object()
+
+        self.assertEqual(context_object1, beer1)
+        self.assertEqual(context_object2, beer2)
+
+    def test_beer_detail_uses_one_query(self):
+        beer1, _ = self.create_beers()
+        factories.star_beer(user=self.user, beer=beer1)
+        factories.rate_beer(user=self.user, beer=beer1, rating=4)
+        request = self.factory.get("")
+        request.user = self.user
+
+        with self.assertNumQueries(1):
+            response = self.setup_view(request, pk=beer1.pk).get(request)
+            context_data = response.context_data
+            self.assertEqual(
+                str(context_data["beer"]), "IPA by Test Brew Co")
+            self.assertEqual(context_data["beer"].bar.name, "Test Bar")
+        self.assertTrue(context_data["starred"])
+        self.assertEqual(context_data["rating"], 4)
+        self.assertEqual(context_data["avg_rating"], 4.0)
+        self.assertEqual(context_data["num_stars"], 1)
+
+    def test_get_context_data_returns_context_with_starred_status(self):
+        beer1, beer2 = self.create_beers()
+        factories.star_beer(user=self.user, beer=beer2)
+        request = self.factory.get("")
+        request.user = self.user
+
+        view = self.setup_view(request, pk=1)
+        view.object = view.get_object()
         context_data = view.get_context_data()
 
         self.assertIn("starred", context_data)
         self.assertFalse(context_data["starred"])
 
         view = self.setup_view(request, pk=2)
-        view.object = beer2
+        view.object = view.get_object()
         context_data = view.get_context_data()
 
         self.assertIn("starred", context_data)
@@ -554,14 +1257,14 @@ class TestBeerDetailView(BaseViewTest):
         request.user = self.user
 
         view = self.setup_view(request, pk=1)
-        view.object = beer1
+        view.object = view.get_object()
         context_data = view.get_context_data()
 
         self.assertIn("num_stars", context_data)
         self.assertEqual(context_data["num_stars"], 0)
 
         view = self.setup_view(request, pk=2)
-        view.object = beer2
+        view.object = view.get_object()
         context_data = view.get_context_data()
 
         self.assertIn("num_stars", context_data)
@@ -574,14 +1277,14 @@ class TestBeerDetailView(BaseViewTest):
         request.user = self.user
 
         view = self.setup_view(request, pk=1)
-        view.object = beer1
+        view.object = view.get_object()
         context_data = view.get_context_data()
 
         self.assertIn("rating", context_data)
         self.assertIsNone(context_data["rating"])
 
         view = self.setup_view(request, pk=2)
-        view.object = beer2
+        view.object = view.get_object()
         context_data = view.get_context_data()
 
         self.assertIn("rating", context_data)
@@ -596,19 +1299,70 @@ class TestBeerDetailView(BaseViewTest):
         request.user = self.user
 
         view = self.setup_view(request, pk=1)
-        view.object = beer1
+        view.object = view.get_object()
         context_data = view.get_context_data()
 
         self.assertIn("avg_rating", context_data)
         self.assertIsNone(context_data["avg_rating"])
 
         view = self.setup_view(request, pk=2)
-        view.object = beer2
+        view.object = view.get_object()
         context_data = view.get_context_data()
 
         self.assertIn("avg_rating", context_data)
         self.assertEqual(context_data["avg_rating"], 2.5)
 
+    def test_beer_detail_not_modified(self):
+        beer1, beer2 = self.create_beers()
+        etag = self.client.get(f"/beers/{beer1.pk}/")["ETag"]
+
+        with self.assertNumQueries(0):
+            response = self.client.get(
+                f"/beers/{beer1.pk}/", HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 304)
+
+        with self.settings(BEERFEST_STATS_MAX_AGE=0.000001):
+            response = self.client.get(
+                f"/beers/{beer1.pk}/", HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 200)
+
+    @override_settings(BEERFEST_ANONYMOUS_PAGE_CACHE=True)
+    def test_beer_detail_page_cached_until_beer_is_starred(self):
+        beer1, beer2 = self.create_beers()
+        self.client.get(f"/beers/{beer1.pk}/")
+
+        with self.assertNumQueries(0):
+            self.client.get(f"/beers/{beer1.pk}/")
+
+        self.client.force_login(self.user)
+        self.client.put(f"/beers/{beer1.pk}/star/")
+        self.client.put(f"/beers/{beer2.pk}/star/")
+        self.client.logout()
+        response = self.client.get(f"/beers/{beer1.pk}/")
+
+        self.assertEqual(response.context["num_stars"], 1)
+        self.assertEqual(
+            page_cache.counters(["detail"]),
+            {"detail": {"hits": 1, "misses": 2}},
+        )
+
+    @override_settings(BEERFEST_ANONYMOUS_PAGE_CACHE=True)
+    @mock.patch.object(
+        views.BeerDetailView, "template_name", "beerfest/beer_form.html")
+    def test_beer_detail_page_with_csrf_token_not_cached(self):
+        beer1, _ = self.create_beers()
+        response = self.client.get(f"/beers/{beer1.pk}/")
+        self.assertIn("csrftoken", response.cookies)
+
+        response = Client().get(f"/beers/{beer1.pk}/")
+
+        # The second visitor gets their own token
+        self.assertIn("csrftoken", response.cookies)
+        self.assertEqual(
+            page_cache.counters(["detail"]),
+            {"detail": {"hits": 0, "misses": 2}},
+        )
+
     def test_get_object_and_get_with_invalid_id_raises_404(self):
         request = self.factory.get("")
         view = self.setup_view(request, pk=1)
@@ -667,6 +1421,19 @@ class TestStarBeerView(BaseViewTest):
 
         self.assertTrue(qs.exists())
 
+    def test_star_beer_bumps_version_again_on_commit(self):
+        request = self.factory.put("")
+        request.user = self.user
+        view = self.setup_view(request, pk=2)
+
+        with self.captureOnCommitCallbacks() as callbacks:
+            view.put(request)
+        version = beer_version(2)
+        for callback in callbacks:
+            callback()
+
+        self.assertGreater(beer_version(2), version)
+
     def test_star_beer_anonymous_forbidden(self):
         request = self.factory.put("")
         request.user = AnonymousUser()
@@ -710,6 +1477,59 @@ class TestStarBeerView(BaseViewTest):
         self.assertTrue(qs.exists())
         self.assertEqual(response.status_code, 204)
 
+    def test_star_beer_increments_num_stars(self):
+        request = self.factory.put("")
+        request.user = self.user
+        view = self.setup_view(request, pk=2)
+
+        view.put(request)
+        view.put(request)
+
+        self.assertEqual(Beer.objects.get(pk=2).num_stars, 1)
+
+    def test_star_beer_updates_user_state(self):
+        user_state.get_user_state(self.user)
+        request = self.factory.put("")
+        request.user = self.user
+        view = self.setup_view(request, pk=2)
+        view.put(request)
+
+        # The cached state is reloaded, not patched
+        with self.assertNumQueries(2):
+            self.assertEqual(
+                user_state.get_user_state(self.user),
+                {1: (True, None), 2: (True, None)},
+            )
+
+        request = self.factory.delete("")
+        request.user = self.user
+        view = self.setup_view(request, pk=1)
+        view.delete(request)
+
+        self.assertEqual(
+            user_state.get_user_state(self.user), {2: (True, None)})
+
+    def test_star_beer_query_count(self):
+        request = self.factory.put("")
+        request.user = self.user
+        view = self.setup_view(request, pk=2)
+
+        # Lock the beer where rows can be locked, update its stats, insert
+        # the star
+        with self.assertNumQueries(
+                3 if connection.features.has_select_for_update else 2):
+            view.put(request)
+
+    def test_star_missing_beer_raises_404(self):
+        request = self.factory.put("")
+        request.user = self.user
+        view = self.setup_view(request, pk=3)
+
+        with self.assertRaises(Http404):
+            view.put(request)
+
+        self.assertFalse(StarBeer.objects.filter(beer=3).exists())
+
     def test_unstar_beer(self):
         request = self.factory.delete("")
         request.user = self.user
@@ -753,6 +1573,24 @@ class TestStarBeerView(BaseViewTest):
         self.assertFalse(qs.exists())
         self.assertEqual(response.status_code, 204)
 
+    def test_unstar_beer_decrements_num_stars(self):
+        request = self.factory.delete("")
+        request.user = self.user
+        view = self.setup_view(request, pk=1)
+
+        view.delete(request)
+        view.delete(request)
+
+        self.assertEqual(Beer.objects.get(pk=1).num_stars, 0)
+
+    def test_unstar_missing_beer_raises_404(self):
+        request = self.factory.delete("")
+        request.user = self.user
+        view = self.setup_view(request, pk=3)
+
+        with self.assertRaises(Http404):
+            view.delete(request)
+
     def test_unstar_beer_using_test_client(self):
         # Just a sanity check; almost an integration test
         self.client.force_login(self.user)
@@ -838,6 +1676,64 @@ class TestBeerRatingView(BaseViewTest):
         self.assertEqual(beer_rating.rating, 1)
         self.assertEqual(response.status_code, 204)
 
+    def test_rate_beer_updates_stats(self):
+        request = self.factory.put("", data={"rating": 4},
+                                   content_type="application/json")
+        request.user = self.user
+        view = self.setup_view(request, pk=2)
+
+        view.put(request)
+        beer = Beer.objects.get(pk=2)
+
+        self.assertEqual(beer.num_ratings, 1)
+        self.assertEqual(beer.rating_sum, 4)
+
+    def test_rate_beer_already_rated_updates_rating_sum(self):
+        request = self.factory.put("", data={"rating": 5},
+                                   content_type="application/json")
+        request.user = self.user
+        view = self.setup_view(request, pk=1)
+
+        view.put(request)
+        beer = Beer.objects.get(pk=1)
+
+        self.assertEqual(beer.num_ratings, 1)
+        self.assertEqual(beer.rating_sum, 5)
+
+    def test_rate_beer_updates_user_state(self):
+        factories.star_beer(user=self.user, beer=Beer.objects.get(pk=1))
+        user_state.get_user_state(self.user)
+        request = self.factory.put("", data={"rating": 2},
+                                   content_type="application/json")
+        request.user = self.user
+        view = self.setup_view(request, pk=1)
+        view.put(request)
+
+        with self.assertNumQueries(2):
+            self.assertEqual(
+                user_state.get_user_state(self.user), {1: (True, 2)})
+
+    def test_rate_beer_query_count(self):
+        request = self.factory.put("", data={"rating": 2},
+                                   content_type="application/json")
+        request.user = self.user
+        view = self.setup_view(request, pk=1)
+
+        with self.assertNumQueries(
+                3 if connection.features.has_select_for_update else 2):
+            view.put(request)
+
+    def test_rate_missing_beer_raises_404(self):
+        request = self.factory.put("", data={"rating": 2},
+                                   content_type="application/json")
+        request.user = self.user
+        view = self.setup_view(request, pk=3)
+
+        with self.assertRaises(Http404):
+            view.put(request)
+
+        self.assertFalse(BeerRating.objects.filter(beer=3).exists())
+
     def test_rate_beer_using_test_client(self):
         # Just a sanity check; almost an integration test
         self.client.force_login(self.user)
@@ -892,6 +1788,26 @@ class TestBeerRatingView(BaseViewTest):
         self.assertFalse(qs.exists())
         self.assertEqual(response.status_code, 204)
 
+    def test_unrate_beer_updates_stats(self):
+        request = self.factory.delete("")
+        request.user = self.user
+        view = self.setup_view(request, pk=1)
+
+        view.delete(request)
+        view.delete(request)
+        beer = Beer.objects.get(pk=1)
+
+        self.assertEqual(beer.num_ratings, 0)
+        self.assertEqual(beer.rating_sum, 0)
+
+    def test_unrate_missing_beer_raises_404(self):
+        request = self.factory.delete("")
+        request.user = self.user
+        view = self.setup_view(request, pk=3)
+
+        with self.assertRaises(Http404):
+            view.delete(request)
+
     def test_unrate_beer_using_test_client(self):
         # Just a sanity check; almost an integration test
         self.client.force_login(self.user)
@@ -901,3 +1817,363 @@ class TestBeerRatingView(BaseViewTest):
 
         self.assertFalse(qs.exists())
         self.assertEqual(response.status_code, 204)
+
+
+class TestBeerBatchView(BaseViewTest):
+    def setUp(self):
+        super().setUp()
+        bar = factories.create_bar()
+        brewery = factories.create_brewery()
+
+        self.beer1 = factories.create_beer(
+            bar=bar, brewery=brewery, name="IPA")
+        self.beer2 = factories.create_beer(
+            bar=bar, brewery=brewery, name="Mild")
+
+        factories.star_beer(user=self.user, beer=self.beer1)
+        factories.rate_beer(user=self.user, beer=self.beer1, rating=3)
+
+    def post(self, operations):
+        self.client.force_login(self.user)
+        return self.client.post(
+            "/beers/batch/", data=operations, content_type="application/json"
+        )
+
+    def test_applies_operations(self):
+        response = self.post([
+            {"beer": 1, "action": "unstar"},
+            {"beer": 1, "action": "rate", "rating": 5},
+            {"beer": 2, "action": "star"},
+            {"beer": 2, "action": "rate", "rating": 2},
+        ])
+
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(
+            [result["status"] for result in response.json()["results"]],
+            [204, 204, 204, 204],
+        )
+        self.assertCountEqual(
+            StarBeer.objects.values_list("beer", flat=True), [2])
+        self.assertCountEqual(
+            BeerRating.objects.values_list("beer", "rating"), [(1, 5), (2, 2)])
+
+    def test_updates_stats(self):
+        self.post([
+            {"beer": 1, "action": "unstar"},
+            {"beer": 1, "action": "unrate"},
+            {"beer": 2, "action": "star"},
+            {"beer": 2, "action": "rate", "rating": 2},
+        ])
+
+        beer1 = Beer.objects.get(pk=1)
+        beer2 = Beer.objects.get(pk=2)
+
+        self.assertEqual(
+            (beer1.num_stars, beer1.num_ratings, beer1.rating_sum), (0, 0, 0))
+        self.assertEqual(
+            (beer2.num_stars, beer2.num_ratings, beer2.rating_sum), (1, 1, 2))
+        self.assertFalse(Beer.objects.with_drifted_stats().exists())
+
+    def test_later_operations_win(self):
+        self.post([
+            {"beer": 2, "action": "star"},
+            {"beer": 2, "action": "unstar"},
+            {"beer": 2, "action": "rate", "rating": 1},
+            {"beer": 2, "action": "rate", "rating": 4},
+        ])
+
+        self.assertFalse(StarBeer.objects.filter(beer=2).exists())
+        self.assertEqual(BeerRating.objects.get(beer=2).rating, 4)
+        self.assertEqual(Beer.objects.get(pk=2).rating_sum, 4)
+
+    def test_reports_invalid_and_missing_operations(self):
+        response = self.post([
+            {"beer": 2, "action": "rate", "rating": 0},
+            {"beer": 2, "action": "drink"},
+            {"beer": "2", "action": "star"},
+            {"beer": 3, "action": "star"},
+            "star",
+            {"beer": 2, "action": "star"},
+        ])
+        results = response.json()["results"]
+
+        self.assertEqual(
+            [result["status"] for result in results],
+            [400, 400, 400, 404, 400, 204],
+        )
+        self.assertIn("rating", results[0]["errors"])
+        self.assertFalse(BeerRating.objects.filter(beer=2).exists())
+        self.assertTrue(StarBeer.objects.filter(beer=2).exists())
+
+    def test_runs_constant_number_of_queries(self):
+        operations = [
+            {"beer": beer.pk, "action": action, "rating": 4}
+            for beer in [self.beer1, self.beer2]
+            for action in ["star", "rate"]
+        ]
+        self.client.force_login(self.user)
+
+        # session, user, savepoint, lock beers (a no-op UPDATE and then a
+        # SELECT where rows can't be locked), stars, ratings, insert stars,
+        # upsert ratings, stats update, release savepoint
+        with self.assertNumQueries(
+                10 if connection.features.has_select_for_update else 11):
+            self.client.post(
+                "/beers/batch/", data=operations,
+                content_type="application/json"
+            )
+
+    def test_locks_beers_before_reading_stars_and_ratings(self):
+        operations = [
+            {"beer": 2, "action": "star"},
+            {"beer": 1, "action": "rate", "rating": 4},
+        ]
+        self.client.force_login(self.user)
+
+        with CaptureQueriesContext(connection) as queries:
+            self.client.post(
+                "/beers/batch/", data=operations,
+                content_type="application/json"
+            )
+
+        tables = [
+            table for query in queries
+            for table in ("beerfest_beer", "beerfest_starbeer",
+                          "beerfest_beerrating")
+            if query["sql"].startswith("SELECT")
+            and 'FROM "%s"' % table in query["sql"]
+        ]
+        self.assertEqual(
+            tables[:3],
+            ["beerfest_beer", "beerfest_starbeer", "beerfest_beerrating"],
+        )
+
+    def test_out_of_range_beer_ids_are_invalid(self):
+        response = self.post([
+            {"beer": 10 ** 30, "action": "star"},
+            {"beer": -1, "action": "star"},
+            {"beer": 0, "action": "unrate"},
+            {"beer": 2, "action": "star"},
+        ])
+
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(
+            [result["status"] for result in response.json()["results"]],
+            [400, 400, 400, 204],
+        )
+        self.assertTrue(StarBeer.objects.filter(beer=2).exists())
+
+    def test_body_must_be_a_list(self):
+        response = self.post({"beer": 1, "action": "star"})
+        self.assertEqual(response.status_code, 400)
+
+    def test_too_many_operations_returns_400(self):
+        response = self.post(
+            [{"beer": 2, "action": "star"}] * 501
+        )
+        self.assertEqual(response.status_code, 400)
+        self.assertFalse(StarBeer.objects.filter(beer=2).exists())
+
+    def test_anonymous_forbidden(self):
+        response = self.client.post(
+            "/beers/batch/", data=[{"beer": 2, "action": "star"}],
+            content_type="application/json"
+        )
+
+        self.assertEqual(response.status_code, 403)
+        self.assertFalse(StarBeer.objects.filter(beer=2).exists())
+
+
+class TestConcurrentBatches(ConcurrentTestCase):
+    def setUp(self):
+        cache.clear()
+        self.beer1 = factories.create_beer(name="IPA")
+        self.beer2 = factories.create_beer(name="Mild")
+        self.clients = []
+        for n in range(16):
+            client = Client()
+            client.force_login(factories.create_user(f"user{n}"))
+            self.clients.append(client)
+
+    def test_concurrent_batches(self):
+        def post(n):
+            response = self.clients[n].post(
+                "/beers/batch/", content_type="application/json", data=[
+                    {"beer": self.beer1.pk, "action": "star"},
+                    {"beer": self.beer2.pk, "action": "rate", "rating": 4},
+                ],
+            )
+            self.assertEqual(response.status_code, 200)
+
+        self.assertEqual(self.run_concurrently(post), [])
+        self.beer1.refresh_from_db()
+        self.beer2.refresh_from_db()
+        self.assertEqual(self.beer1.num_stars, 16)
+        self.assertEqual(self.beer2.num_ratings, 16)
+        self.assertEqual(self.beer2.rating_sum, 64)
+
+
+class TestFrozenFestival(BaseViewTest):
+    def setUp(self):
+        super().setUp()
+        tmp = tempfile.TemporaryDirectory()
+        self.addCleanup(tmp.cleanup)
+        frozen._festival = None
+        bar = factories.create_bar()
+        brewery = factories.create_brewery()
+        self.ipa = factories.create_beer(
+            bar=bar, brewery=brewery, name="IPA", number=1)
+        self.mild = factories.create_beer(
+            bar=bar, brewery=brewery, name="Mild", number=2)
+        factories.star_beer(user=self.user, beer=self.mild)
+        factories.rate_beer(user=self.user, beer=self.ipa, rating=3)
+        frozen.freeze(tmp.name)
+
+        settings = override_settings(
+            BEERFEST_FROZEN=True, BEERFEST_FROZEN_DIR=tmp.name)
+        settings.enable()
+        self.addCleanup(settings.disable)
+
+    def get(self, view_class, user=None, data=None, **kwargs):
+        request = self.factory.get("", data)
+        request.user = user or AnonymousUser()
+        return view_class.as_view()(request, **kwargs)
+
+    def test_beer_list_served_without_queries(self):
+        with self.assertNumQueries(0):
+            response = self.get(
+                views.BeerListView, self.user, {"starred": "1"})
+        beer_list = response.context_data["beer_list"]
+
+        self.assertEqual([beer.name for beer in beer_list], ["Mild"])
+        self.assertTrue(beer_list[0].starred)
+
+    def test_beer_list_search(self):
+        response = self.get(views.BeerListView, data={"q": "mi"})
+
+        self.assertEqual(
+            [beer.name for beer in response.context_data["beer_list"]],
+            ["Mild"],
+        )
+
+    def test_beer_detail_served_without_queries(self):
+        with self.assertNumQueries(0):
+            response = self.get(
+                views.BeerDetailView, self.user, pk=self.ipa.pk)
+
+        self.assertEqual(response.context_data["beer"].name, "IPA")
+        self.assertEqual(response.context_data["rating"], 3)
+        self.assertEqual(response.context_data["avg_rating"], 3)
+        with self.assertRaises(Http404):
+            self.get(views.BeerDetailView, pk=0)
+        self.assertTemplateUsed(
+            self.client.get(f"/beers/{self.ipa.pk}/"),
+            "beerfest/beer_detail.html",
+        )
+
+    def test_user_profile_served_from_frozen_festival(self):
+        Beer.objects.all().delete()
+
+        response = self.get(views.UserProfileView, self.user)
+
+        self.assertEqual(
+            [beer.name for beer in response.context_data["starred_beers"]],
+            ["Mild"],
+        )
+        self.assertEqual(
+            [(beer.name, beer.rating)
+             for beer in response.context_data["rated_beers"]],
+            [("IPA", 3)],
+        )
+
+    def test_api_served_from_frozen_festival(self):
+        Beer.objects.all().delete()
+
+        response = self.client.get("/api/beers/")
+        self.assertEqual(
+            [beer["name"] for beer in response.data["results"]],
+            ["IPA", "Mild"],
+        )
+        response = self.client.get(f"/api/beers/{self.mild.pk}/")
+        self.assertEqual(response.data["name"], "Mild")
+        response = self.client.get("/api/beers/search/", {"q": "ipa"})
+        self.assertEqual(
+            [beer["name"] for beer in response.data["results"]], ["IPA"])
+
+    def test_beer_list_etag_is_fixed(self):
+        response = self.client.get("/beers/")
+
+        with self.assertNumQueries(0):
+            response = self.client.get(
+                "/beers/", HTTP_IF_NONE_MATCH=response["ETag"])
+        self.assertEqual(response.status_code, 304)
+
+    def test_writes_are_forbidden(self):
+        self.client.force_login(self.user)
+
+        responses = [
+            self.client.put(f"/beers/{self.ipa.pk}/star/"),
+            self.client.delete(f"/beers/{self.ipa.pk}/rating/"),
+            self.client.post(
+                "/beers/batch/",
+                json.dumps([{"beer": self.ipa.pk, "action": "star"}]),
+                content_type="application/json",
+            ),
+            self.client.delete(f"/api/beers/{self.ipa.pk}/"),
+        ]
+
+        for response in responses:
+            self.assertEqual(response.status_code, 403)
+        self.assertEqual(StarBeer.objects.count(), 1)
+        self.assertEqual(BeerRating.objects.count(), 1)
+
+
+class TestExportView(BaseViewTest):
+    def setUp(self):
+        super().setUp()
+        self.staff = factories.create_user("Staff")
+        self.staff.is_staff = True
+        self.staff.save()
+        beer = factories.create_beer()
+        factories.rate_beer(user=self.user, beer=beer, rating=2)
+
+    def test_staff_can_export(self):
+        self.client.force_login(self.staff)
+
+        response = self.client.get("/export/ratings.csv")
+
+        self.assertEqual(response.status_code, 200)
+        self.assertTrue(response.streaming)
+        self.assertEqual(response["Content-Type"], "text/csv")
+        self.assertEqual(
+            response["Content-Disposition"],
+            'attachment; filename="ratings.csv"',
+        )
+        self.assertEqual(
+            b"".join(response.streaming_content),
+            b"beer_id,user_id,rating\r\n1,1,2\r\n",
+        )
+
+    def test_ndjson_content_type(self):
+        self.client.force_login(self.staff)
+
+        response = self.client.get("/export/beers.ndjson")
+
+        self.assertEqual(response["Content-Type"], "application/x-ndjson")
+
+    def test_non_staff_forbidden(self):
+        self.client.force_login(self.user)
+        response = self.client.get("/export/ratings.csv")
+        self.assertEqual(response.status_code, 403)
+
+    def test_anonymous_forbidden(self):
+        response = self.client.get("/export/ratings.csv")
+        self.assertEqual(response.status_code, 403)
+
+    def test_unknown_dataset_or_format_returns_404(self):
+        self.client.force_login(self.staff)
+
+        self.assertEqual(
+            self.client.get("/export/users.csv").status_code, 404)
+        self.assertEqual(
+            self.client.get("/export/beers.xml").status_code, 404)